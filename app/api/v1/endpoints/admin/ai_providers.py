@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException, Body, Depends
 from typing import Dict, Any
 from app.core.config import config_manager
 from app.api import deps
+from app.benchmark.provider_bench import MAX_CONCURRENCY, MAX_REQUESTS, benchmark_jobs
 
 router = APIRouter()
 
@@ -123,6 +124,67 @@ async def test_provider(provider_key: str):
         }
 
 
+@router.post("/benchmark", status_code=202)
+async def benchmark_providers(
+    providers: list[str] = Body(..., embed=True, min_length=1),
+    requests: int = Body(50, embed=True, ge=1, le=MAX_REQUESTS),
+    concurrency: int = Body(5, embed=True, ge=1, le=MAX_CONCURRENCY),
+    stream: bool = Body(True, embed=True)
+):
+    """
+    在后台启动并发基准测试
+
+    以固定并发发送题目提示词，报告延迟分位数、首token耗时、吞吐量、错误率和token用量。
+    需开启 ai.benchmark.enabled；ai.benchmark.simulation_only 开启时只能测试模拟提供商，
+    避免对真实服务商产生大量计费调用。立即返回任务ID，通过 GET /benchmark/{job_id} 获取结果
+
+    Args:
+        providers: 服务商标识符列表（依次测试）
+        requests: 每个服务商的请求数
+        concurrency: 并发数
+        stream: 是否使用流式响应（用于测量首token耗时）
+
+    Returns:
+        基准测试任务状态
+    """
+    ai_config = config_manager.config.ai
+    if not ai_config.benchmark.enabled:
+        raise HTTPException(status_code=403, detail="基准测试未开启（ai.benchmark.enabled）")
+
+    if ai_config.benchmark.simulation_only:
+        real = [
+            key for key in providers
+            if key in ai_config.providers and ai_config.providers[key].type != "simulation"
+        ]
+        if real:
+            raise HTTPException(
+                status_code=403,
+                detail=f"只允许测试模拟提供商（ai.benchmark.simulation_only），不允许: {', '.join(real)}"
+            )
+
+    try:
+        return benchmark_jobs.start(providers, requests, concurrency, stream)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/benchmark/{job_id}")
+async def get_benchmark(job_id: str):
+    """
+    获取基准测试任务状态和报告
+
+    Args:
+        job_id: 任务ID
+
+    Returns:
+        任务状态，status 为 done 时 reports 包含每个服务商的报告
+    """
+    job = benchmark_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"基准测试任务 '{job_id}' 不存在")
+    return job
+
+
 @router.put("/default-provider")
 async def set_default_provider(
     provider_key: str = Body(..., embed=True)
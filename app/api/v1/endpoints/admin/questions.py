@@ -5,6 +5,7 @@ from io import BytesIO
 import pandas as pd
 from app.api import deps
 from app.repositories.question_repository import QuestionRepository
+from app.services.cache_service import CacheService
 from app.models.question import QuestionRead, QuestionCreate, QuestionUpdate
 
 router = APIRouter()
@@ -259,28 +260,39 @@ async def create_question(
 async def update_question(
     question_id: int,
     question_in: QuestionUpdate,
-    question_repo: QuestionRepository = Depends(deps.get_question_repo)
+    question_repo: QuestionRepository = Depends(deps.get_question_repo),
+    cache_service: CacheService = Depends(deps.get_cache_service)
 ):
     """更新题目"""
     question = await question_repo.get(question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
+    old_title = question.question
     update_data = question_in.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(question, key, value)
     
-    return await question_repo.update(question)
+    question = await question_repo.update(question)
+    # 缓存中的答案已过时，删除后下次查询从数据库重新加载（修改了题目时新旧标题都要删除）
+    await cache_service.delete(old_title)
+    if question.question != old_title:
+        await cache_service.delete(question.question)
+    return question
 
 @router.delete("/{question_id}")
 async def delete_question(
     question_id: int,
-    question_repo: QuestionRepository = Depends(deps.get_question_repo)
+    question_repo: QuestionRepository = Depends(deps.get_question_repo),
+    cache_service: CacheService = Depends(deps.get_cache_service)
 ):
     """删除题目"""
-    success = await question_repo.delete(question_id)
-    if not success:
+    question = await question_repo.get(question_id)
+    if not question:
         raise HTTPException(status_code=404, detail="Question not found")
+    title = question.question
+    await question_repo.delete(question_id)
+    await cache_service.delete(title)
     return {"message": "Question deleted successfully"}
 
 
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from app.api import deps
 from app.repositories.question_repository import QuestionRepository
 from sqlmodel import select, func
 import os
 from app.core.config import settings
 from app.models.question import Question
+from app.core.timeseries import query_timeseries
+from app.services.stats_service import get_history
+from app.services.access_stats_service import access_stats_service, get_hot_questions
 
 router = APIRouter()
 
@@ -27,4 +30,50 @@ async def get_stats(
         "log_size_bytes": log_size,
         "ai_provider": settings.ai.default_provider,
         "debug_mode": settings.app.debug
-    }
\ No newline at end of file
+    }
+
+@router.get("/timeseries")
+async def get_timeseries(
+    minutes: int = Query(60, ge=1, le=10080, description="最近的分钟数"),
+    history: bool = Query(False, description="是否从数据库读取历史汇总（合并所有worker）")
+):
+    """
+    获取按分钟聚合的查询流量时间序列
+
+    Args:
+        minutes: 最近的分钟数
+        history: 为True时从 query_stats_minute 表读取，否则读取当前worker的内存数据
+
+    Returns:
+        包含每分钟查询数（按来源）、命中率、p50/p95延迟、AI调用与错误数的列表
+    """
+    if history:
+        points = await get_history(minutes)
+    else:
+        points = query_timeseries.snapshot(minutes)
+
+    return {
+        "interval_seconds": 60,
+        "source": "database" if history else "memory",
+        "points": points
+    }
+
+
+@router.get("/questions")
+async def get_question_access_stats(
+    limit: int = Query(50, ge=1, le=1000, description="返回数量"),
+    order_by: str = Query("hits", pattern="^(hits|recent)$", description="排序: hits 访问次数 / recent 最近访问")
+):
+    """
+    获取题目访问统计（热门题目）
+
+    Args:
+        limit: 返回数量
+        order_by: 排序方式
+
+    Returns:
+        题目列表，包含按来源的命中次数和最后访问时间
+    """
+    # 先写入内存中尚未落库的计数，保证结果是最新的
+    await access_stats_service.flush()
+    return {"items": await get_hot_questions(limit, order_by)}
@@ -6,18 +6,37 @@ from app.core.config import settings
 router = APIRouter()
 
 
-@router.get("/health", response_model=HealthResponse, summary="健康检查")
-async def health_check():
+def health_status() -> HealthResponse:
     """
-    健康检查端点
+    汇总健康状态（根路径 /health 和 /api/v1/health 共用）
 
     Returns:
         HealthResponse: 健康状态信息
     """
-    from app.core.config import settings
+    # Redis不可用时服务仍可用（已降级到内存缓存），状态标记为 degraded
+    status = "healthy"
+    redis_status = None
+    if settings.cache.type.lower() == "redis":
+        from app.core.redis import redis_manager
+        redis_status = redis_manager.status()
+        if not redis_status["healthy"]:
+            status = "degraded"
+
     return HealthResponse(
-        status="healthy",
+        status=status,
         app_name=settings.app.name,
         version=settings.app.version,
-        environment="development" if settings.app.debug else "production"
+        environment="development" if settings.app.debug else "production",
+        redis=redis_status
     )
+
+
+@router.get("/health", response_model=HealthResponse, summary="健康检查")
+async def health_check():
+    """
+    健康检查端点
+
+    Returns:
+        HealthResponse: 健康状态信息
+    """
+    return health_status()
@@ -0,0 +1,47 @@
+"""预取端点 - 提交整张试卷的题目，在后台提前生成答案"""
+from fastapi import APIRouter, HTTPException, Request
+from app.schemas.query import PrefetchRequest, PrefetchResponse
+from app.services.prefetch_service import prefetch_service
+from app.middleware.rate_limit import current_client, get_client_key
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/prefetch", response_model=PrefetchResponse, summary="预取整卷答案")
+async def prefetch_questions(request: PrefetchRequest, http_request: Request):
+    """
+    提交需要预取答案的题目
+
+    立即返回，题目在后台逐个查找缓存和数据库，未命中时调用AI并写入缓存，
+    之后逐题查询即可直接命中缓存。未命中的题目计入提交者的AI额度
+
+    Args:
+        request: 预取请求
+        http_request: HTTP请求（用于识别客户端）
+
+    Returns:
+        PrefetchResponse: 受理结果
+
+    Raises:
+        HTTPException: 题目数超过上限时抛出400
+    """
+    if not prefetch_service.running:
+        return PrefetchResponse(code=0, msg="预取功能未启用")
+
+    if len(request.questions) > settings.prefetch.max_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多预取 {settings.prefetch.max_questions} 道题"
+        )
+
+    # 路径不在 rate_limit.paths 中时中间件不会设置客户端，这里自行识别，AI额度不能被绕过
+    client = current_client.get() or get_client_key(http_request.scope)
+    result = prefetch_service.submit(request.questions, client)
+    logger.info(
+        f"📥 预取请求: 入队 {result['queued']}，跳过 {result['skipped']}，丢弃 {result['dropped']}"
+    )
+    return PrefetchResponse(code=1, msg="已加入预取队列", **result)
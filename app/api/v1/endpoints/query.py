@@ -1,21 +1,45 @@
 """查询端点 - 题库查询API"""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from app.schemas.query import QueryRequest, QueryResponse
 from app.services.query_service import QueryService
 from app.api.deps import get_query_service
+from app.core.config import settings
+from app.core.deadline import Deadline
 from app.utils.helpers import match_option
 from app.core.logger import get_logger
+from app.middleware.timing import stage_timer
+from app.middleware.rate_limit import RateLimitExceeded
 
 logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
 
 router = APIRouter()
 
 
+def resolve_deadline(timeout_ms: Optional[int]) -> Optional[Deadline]:
+    """
+    根据客户端给出的时间预算计算截止时间
+
+    Args:
+        timeout_ms: 客户端时间预算（毫秒），为空时使用 query.default_timeout
+
+    Returns:
+        截止时间（不超过 query.max_timeout）；客户端未指定且未配置默认值时返回None（一直等待AI）
+    """
+    seconds = timeout_ms / 1000 if timeout_ms and timeout_ms > 0 else settings.query.default_timeout
+    if seconds is None:
+        return None
+    return Deadline.after(min(seconds, settings.query.max_timeout))
+
+
 @router.get("/query", response_model=QueryResponse, summary="查询问题答案")
 async def query_question(
     title: str,
     options: str = "",
     type: str = "single",
+    timeout_ms: Optional[int] = Query(None, description="客户端时间预算（毫秒）"),
+    x_timeout_ms: Optional[int] = Header(None, alias="X-Timeout-Ms", description="客户端时间预算（毫秒）"),
     query_service: QueryService = Depends(get_query_service)
 ):
     """
@@ -26,10 +50,15 @@ async def query_question(
     2. 然后从数据库查找
     3. 最后调用AI服务获取
 
+    AI只等待客户端剩余的时间预算，超时后返回 source=pending，
+    AI调用在后台继续完成并写入缓存和数据库，客户端重试即可命中
+
     Args:
         title: 问题标题（必填）
         options: 问题选项
         type: 题目类型 (single/multiple/judgement/fill)
+        timeout_ms: 客户端时间预算（毫秒），也可通过 X-Timeout-Ms 请求头传入
+        x_timeout_ms: X-Timeout-Ms 请求头
         query_service: 查询服务（依赖注入）
 
     Returns:
@@ -38,6 +67,7 @@ async def query_question(
     Raises:
         HTTPException: 请求参数错误时抛出400
     """
+    deadline = resolve_deadline(timeout_ms or x_timeout_ms)
     try:
         # 构建请求对象
         request = QueryRequest(
@@ -47,17 +77,24 @@ async def query_question(
         )
 
         # 执行查询
-        result = await query_service.query(request)
+        result = await query_service.query(request, deadline)
         
         # 智能答案匹配：如果答案不包含字母前缀，尝试从选项中匹配
         if result.data and result.code == 1 and options:
-            matched_answer = match_option(result.data, options)
+            with stage_timer("match"):
+                matched_answer = match_option(result.data, options)
             if matched_answer != result.data:
-                logger.info(f"🎯 智能匹配: '{result.data[:30]}...' -> '{matched_answer}'")
+                sampled_logger.info("智能匹配: '{}' -> '{}'", result.data[:30], matched_answer)
                 result.data = matched_answer
 
         return result
 
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers=e.headers
+        )
     except ValueError as e:
         logger.warning(f"⚠️ 参数验证失败: {e}")
         raise HTTPException(status_code=400, detail=str(e))
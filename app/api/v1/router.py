@@ -1,12 +1,13 @@
 """API路由聚合 - v1版本所有路由"""
 from fastapi import APIRouter
-from app.api.v1.endpoints import query, health
+from app.api.v1.endpoints import query, health, prefetch
 from app.api.v1.endpoints import admin
 
 api_router = APIRouter()
 
 # 注册各模块路由
 api_router.include_router(query.router, tags=["查询"])
+api_router.include_router(prefetch.router, tags=["查询"])
 api_router.include_router(health.router, tags=["系统"])
 
 # 注册管理后台路由
@@ -0,0 +1,406 @@
+"""AI服务商并发基准测试 - 延迟分位数、首token耗时、吞吐量、错误率和token用量"""
+import asyncio
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+import httpx
+from app.core.config import AIProviderConfig, settings
+from app.core.logger import get_logger
+from app.core.timeseries import percentile
+from app.providers.base import build_messages
+from app.providers.retry import classify_error
+from app.providers.simulation import SIMULATION_URL, get_simulation_transport
+from app.providers.streaming import parse_sse_line
+from app.services.prompt_templates import RenderedPrompt, estimate_tokens, prompt_templates
+
+logger = get_logger(__name__)
+
+# 基准测试使用的题目：(题目, 选项, 题型)
+SAMPLE_QUESTIONS = [
+    ("计算机网络中，TCP协议属于OSI参考模型的哪一层？", "A. 网络层 B. 传输层 C. 会话层 D. 应用层", "single"),
+    ("Access数据库的特点是？", "A. 关系模型 B. 层次模型 C. 网状模型 D. 面向对象模型", "single"),
+    ("以下属于面向对象程序设计基本特征的有？", "A. 封装 B. 继承 C. 多态 D. 编译", "multiple"),
+    ("下列排序算法中，平均时间复杂度为O(nlogn)的有？", "A. 快速排序 B. 冒泡排序 C. 归并排序 D. 堆排序", "multiple"),
+    ("HTTP是无状态协议。", "", "judgement"),
+    ("在关系数据库中，主键的值可以为空。", "", "judgement"),
+    ("马克思主义中国化的第一次历史性飞跃的理论成果是______。", "", "fill"),
+    ("光在真空中的传播速度约为______米每秒。", "", "fill"),
+]
+
+# 单次基准测试的上限，避免误操作打满服务商额度
+MAX_REQUESTS = 1000
+MAX_CONCURRENCY = 100
+# 保留的已结束基准测试任务数
+MAX_FINISHED_JOBS = 20
+
+
+class CallResult(NamedTuple):
+    """单次调用结果"""
+    ok: bool
+    latency: float
+    ttft: Optional[float]
+    prompt_tokens: int
+    completion_tokens: int
+    error: Optional[str] = None
+
+
+def build_prompts(requests: int) -> List[RenderedPrompt]:
+    """
+    按题目类型模板渲染基准测试提示词（循环使用 SAMPLE_QUESTIONS）
+
+    Args:
+        requests: 请求数
+
+    Returns:
+        提示词列表
+    """
+    return [
+        prompt_templates.get(question_type).render(title, options)
+        for title, options, question_type in (SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)] for i in range(requests))
+    ]
+
+
+def _usage_tokens(usage: Optional[dict], prompt: RenderedPrompt, content: str) -> tuple:
+    """服务商返回的token用量，没有返回时按文本估算"""
+    if usage:
+        return (
+            usage.get("prompt_tokens", usage.get("promptTokenCount", 0)),
+            usage.get("completion_tokens", usage.get("candidatesTokenCount", 0)),
+        )
+    return prompt.prompt_tokens, estimate_tokens(content)
+
+
+async def _call_openai_compatible(
+    client: httpx.AsyncClient,
+    config: AIProviderConfig,
+    prompt: RenderedPrompt,
+    stream: bool,
+    start: float,
+) -> CallResult:
+    """调用一次OpenAI兼容接口，流式时记录首token耗时"""
+    payload = {
+        "model": config.model,
+        "messages": build_messages(prompt.user, prompt.system),
+        "stream": stream,
+        "max_tokens": min(prompt.max_tokens or config.max_tokens, config.max_tokens),
+        "temperature": config.temperature,
+    }
+    headers = {"Authorization": f"Bearer {config.api_key}", "Content-Type": "application/json"}
+
+    if not stream:
+        response = await client.post(config.api_url, json=payload, headers=headers)
+        response.raise_for_status()
+        latency = time.perf_counter() - start
+        result = response.json()
+        message = result["choices"][0]["message"]
+        content = message.get("content") or message.get("reasoning_content") or ""
+        prompt_tokens, completion_tokens = _usage_tokens(result.get("usage"), prompt, content)
+        return CallResult(bool(content), latency, latency, prompt_tokens, completion_tokens,
+                          None if content else "empty_response")
+
+    ttft = None
+    parts = []
+    usage = None
+    async with client.stream("POST", config.api_url, json=payload, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            event = parse_sse_line(line)
+            if not event:
+                continue
+            usage = event.get("usage") or usage
+            if not event.get("choices"):
+                continue
+            delta = event["choices"][0].get("delta") or {}
+            text = delta.get("content") or delta.get("reasoning_content")
+            if text:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(text)
+    latency = time.perf_counter() - start
+    content = "".join(parts)
+    prompt_tokens, completion_tokens = _usage_tokens(usage, prompt, content)
+    return CallResult(bool(content), latency, ttft, prompt_tokens, completion_tokens,
+                      None if content else "empty_response")
+
+
+async def _call_google(
+    client: httpx.AsyncClient,
+    config: AIProviderConfig,
+    prompt: RenderedPrompt,
+    start: float,
+) -> CallResult:
+    """调用一次Google Gemini接口（非流式，首token耗时即总耗时）"""
+    payload = {
+        "contents": [{"parts": [{"text": prompt.user}]}],
+        "systemInstruction": {"parts": [{"text": prompt.system}]},
+        "generationConfig": {
+            "temperature": config.temperature,
+            "maxOutputTokens": min(prompt.max_tokens or config.max_tokens, config.max_tokens),
+        },
+    }
+    response = await client.post(f"{config.api_url}?key={config.api_key}", json=payload)
+    response.raise_for_status()
+    latency = time.perf_counter() - start
+    result = response.json()
+    content = result["candidates"][0]["content"]["parts"][0]["text"] if result.get("candidates") else ""
+    prompt_tokens, completion_tokens = _usage_tokens(result.get("usageMetadata"), prompt, content)
+    return CallResult(bool(content), latency, latency, prompt_tokens, completion_tokens,
+                      None if content else "empty_response")
+
+
+def summarize(
+    provider_key: str,
+    config: AIProviderConfig,
+    results: List[CallResult],
+    concurrency: int,
+    stream: bool,
+    duration: float,
+) -> Dict:
+    """
+    汇总一个服务商的基准测试结果
+
+    Args:
+        provider_key: 服务商标识符
+        config: 服务商配置
+        results: 每次调用的结果
+        concurrency: 并发数
+        stream: 是否流式
+        duration: 总耗时（秒）
+
+    Returns:
+        报告字典，延迟单位为毫秒
+    """
+    ok = [r for r in results if r.ok]
+    latencies = sorted(r.latency * 1000 for r in ok)
+    ttfts = sorted(r.ttft * 1000 for r in ok if r.ttft is not None)
+    prompt_tokens = sum(r.prompt_tokens for r in ok)
+    completion_tokens = sum(r.completion_tokens for r in ok)
+
+    def distribution(values: List[float]) -> Dict[str, float]:
+        return {
+            "p50": round(percentile(values, 50), 2),
+            "p90": round(percentile(values, 90), 2),
+            "p99": round(percentile(values, 99), 2),
+            "mean": round(sum(values) / len(values), 2) if values else 0.0,
+            "max": round(values[-1], 2) if values else 0.0,
+        }
+
+    return {
+        "provider": provider_key,
+        "name": config.name,
+        "model": config.model,
+        "requests": len(results),
+        "concurrency": concurrency,
+        "stream": stream,
+        "duration": round(duration, 3),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "errors_by_type": dict(Counter(r.error for r in results if not r.ok)),
+        "throughput": round(len(ok) / duration, 2) if duration else 0.0,
+        "latency_ms": distribution(latencies),
+        "ttft_ms": distribution(ttfts),
+        "tokens": {
+            "prompt": prompt_tokens,
+            "completion": completion_tokens,
+            "completion_per_second": round(completion_tokens / duration, 2) if duration else 0.0,
+        },
+    }
+
+
+async def benchmark_provider(
+    provider_key: str,
+    requests: int = 50,
+    concurrency: int = 5,
+    stream: bool = True,
+    timeout: Optional[float] = None,
+) -> Dict:
+    """
+    以固定并发对一个服务商发送 requests 个题目提示词
+
+    直接发送HTTP请求，不经过重试和并发限制器，测量的是服务商本身的表现
+
+    Args:
+        provider_key: 服务商标识符（settings.ai.providers 中的键）
+        requests: 请求总数
+        concurrency: 并发数
+        stream: 是否使用流式响应（用于测量首token耗时）
+        timeout: 单次请求超时（秒），默认 ai.timeout
+
+    Returns:
+        报告字典
+
+    Raises:
+        ValueError: 服务商不存在、未启用或参数超出范围
+    """
+    config = settings.ai.providers.get(provider_key)
+    if config is None:
+        raise ValueError(f"服务商 '{provider_key}' 不存在")
+    if not config.enabled:
+        raise ValueError(f"服务商 '{provider_key}' 未启用")
+    if not 1 <= requests <= MAX_REQUESTS or not 1 <= concurrency <= MAX_CONCURRENCY:
+        raise ValueError(f"请求数需在 1~{MAX_REQUESTS} 之间，并发数需在 1~{MAX_CONCURRENCY} 之间")
+
+    is_google = provider_key == "google"
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    # 模拟提供商由本地传输层响应，不访问网络
+    transport = None
+    if config.type == "simulation":
+        transport = get_simulation_transport(provider_key)
+        config = config.model_copy(update={"api_url": config.api_url or SIMULATION_URL})
+
+    async with httpx.AsyncClient(
+        timeout=timeout or settings.ai.timeout, limits=limits, transport=transport
+    ) as client:
+
+        async def run_one(prompt: RenderedPrompt) -> CallResult:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    if is_google:
+                        return await _call_google(client, config, prompt, start)
+                    return await _call_openai_compatible(client, config, prompt, stream, start)
+                except Exception as e:
+                    return CallResult(False, time.perf_counter() - start, None, 0, 0, classify_error(e))
+
+        logger.info(f"📊 开始基准测试 {provider_key}: {requests} 个请求，并发 {concurrency}")
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_one(prompt) for prompt in build_prompts(requests)))
+        duration = time.perf_counter() - start
+
+    report = summarize(provider_key, config, list(results), concurrency, stream and not is_google, duration)
+    logger.info(
+        f"📊 {provider_key} 基准测试完成: p50 {report['latency_ms']['p50']}ms, "
+        f"p99 {report['latency_ms']['p99']}ms, 错误率 {report['error_rate']:.1%}"
+    )
+    return report
+
+
+async def run_benchmark(
+    providers: List[str],
+    requests: int = 50,
+    concurrency: int = 5,
+    stream: bool = True,
+    timeout: Optional[float] = None,
+) -> List[Dict]:
+    """
+    依次对多个服务商运行基准测试（逐个进行，互不干扰）
+
+    Args:
+        providers: 服务商标识符列表
+        requests: 每个服务商的请求数
+        concurrency: 并发数
+        stream: 是否使用流式响应
+        timeout: 单次请求超时（秒）
+
+    Returns:
+        每个服务商的报告；参数错误的服务商报告中只包含 provider 和 error
+    """
+    reports = []
+    for provider_key in providers:
+        try:
+            reports.append(await benchmark_provider(provider_key, requests, concurrency, stream, timeout))
+        except ValueError as e:
+            reports.append({"provider": provider_key, "error": str(e)})
+    return reports
+
+
+class BenchmarkJobs:
+    """
+    管理后台发起的后台基准测试任务
+
+    基准测试可能持续数分钟，接口立即返回任务ID，结果通过任务ID轮询获取。
+    同一时间只运行一个任务；任务保存在当前worker进程内存中，多worker部署时需轮询同一进程
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        """是否有正在运行的任务"""
+        return self._task is not None and not self._task.done()
+
+    def start(self, providers: List[str], requests: int, concurrency: int, stream: bool) -> Dict:
+        """
+        在后台启动一次基准测试
+
+        Args:
+            providers: 服务商标识符列表
+            requests: 每个服务商的请求数
+            concurrency: 并发数
+            stream: 是否使用流式响应
+
+        Returns:
+            任务状态字典
+
+        Raises:
+            RuntimeError: 已有任务在运行
+        """
+        if self.running:
+            raise RuntimeError("已有基准测试正在运行")
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "status": "running",
+            "providers": providers,
+            "requests": requests,
+            "concurrency": concurrency,
+            "stream": stream,
+            "started_at": time.time(),
+            "finished_at": None,
+            "reports": None,
+            "error": None,
+        }
+        self._jobs[job["id"]] = job
+        while len(self._jobs) > MAX_FINISHED_JOBS + 1:
+            self._jobs.popitem(last=False)
+        self._task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        获取任务状态
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务状态字典，不存在时返回None
+        """
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: Dict) -> None:
+        """运行基准测试并记录结果"""
+        try:
+            job["reports"] = await run_benchmark(
+                job["providers"], job["requests"], job["concurrency"], job["stream"]
+            )
+            job["status"] = "done"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"❌ 基准测试失败: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+
+    async def stop(self) -> None:
+        """取消正在运行的任务（应用关闭时调用）"""
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+# 全局基准测试任务管理
+benchmark_jobs = BenchmarkJobs()
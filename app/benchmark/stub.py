@@ -0,0 +1,128 @@
+"""本地OpenAI兼容桩服务 - 基准测试和压测时代替真实的AI服务商"""
+import asyncio
+import json
+import random
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.providers.simulation import default_answer
+from app.services.prompt_templates import estimate_tokens
+
+# 流式响应每段的字符数
+STREAM_CHUNK_CHARS = 8
+
+
+def create_stub_app(
+    latency: float = 0.2,
+    jitter: float = 0.1,
+    ttft: float = 0.05,
+    error_rate: float = 0.0,
+    model: str = "stub-model",
+) -> FastAPI:
+    """
+    创建OpenAI兼容的桩服务
+
+    支持 POST /v1/chat/completions 的非流式和SSE流式响应，返回usage，
+    按 error_rate 随机返回500
+
+    Args:
+        latency: 平均响应耗时（秒）
+        jitter: 耗时随机波动范围（秒，均匀分布 ±jitter）
+        ttft: 流式响应的首个token耗时（秒）
+        error_rate: 返回500的概率
+        model: 响应中的模型名称
+
+    Returns:
+        FastAPI应用
+    """
+    app = FastAPI(title="AI Stub", docs_url=None, redoc_url=None, openapi_url=None)
+    state = {"requests": 0, "errors": 0}
+    app.state.stats = state
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        state["requests"] += 1
+        user = next((m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in body.get("messages", []))
+        content = json.dumps({"answer": default_answer(user)}, ensure_ascii=False)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content),
+        }
+        total = max(latency + random.uniform(-jitter, jitter), 0.0)
+
+        if random.random() < error_rate:
+            state["errors"] += 1
+            await asyncio.sleep(total)
+            return JSONResponse(status_code=500, content={"error": {"message": "stub injected error"}})
+
+        if not body.get("stream"):
+            await asyncio.sleep(total)
+            return {
+                "id": f"stub-{state['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+            first = min(ttft, total)
+            await asyncio.sleep(first)
+            interval = (total - first) / max(len(chunks) - 1, 1)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(interval)
+                event = {"model": model, "choices": [{"index": 0, "delta": {"content": chunk}}]}
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'model': model, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def free_port() -> int:
+    """获取一个空闲的本地端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def serve_stub(port: Optional[int] = None, **options) -> AsyncIterator[str]:
+    """
+    在当前事件循环中启动桩服务，退出时关闭
+
+    Args:
+        port: 监听端口，为空时自动选择
+        **options: 传给 create_stub_app 的参数
+
+    Yields:
+        chat completions 接口地址
+    """
+    import uvicorn
+
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        create_stub_app(**options), host="127.0.0.1", port=port, log_level="warning", lifespan="off",
+    ))
+    task = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            if task.done():
+                task.result()
+                raise RuntimeError("桩服务启动失败")
+            await asyncio.sleep(0.02)
+        yield f"http://127.0.0.1:{port}/v1/chat/completions"
+    finally:
+        server.should_exit = True
+        await task
@@ -6,23 +6,90 @@ from typing import Optional, Dict, Any
 from pydantic import BaseModel, Field
 
 
+class SimulationConfig(BaseModel):
+    """模拟提供商配置（type 为 simulation 时生效，不访问网络）"""
+    latency_distribution: str = "lognormal"  # 耗时分布: fixed/uniform/normal/lognormal
+    latency_mean: float = 1.0  # 平均耗时（秒）
+    latency_stddev: float = 0.5  # 耗时标准差（秒），uniform 分布时为 ±范围
+    ttft: float = 0.2  # 流式响应的首个token耗时（秒）
+    error_429_rate: float = 0.0  # 返回429的概率
+    error_500_rate: float = 0.0  # 返回500的概率
+    timeout_rate: float = 0.0  # 一直不响应直到请求超时的概率
+    malformed_rate: float = 0.0  # 返回无法解析的响应体的概率
+    retry_after: Optional[int] = None  # 429响应携带的 Retry-After（秒）
+    fixture_file: Optional[str] = None  # 答案夹具（JSON），未收录的题目返回第一个选项或"对"
+    seed: Optional[int] = None  # 随机种子，设置后结果可复现
+
+
 class AIProviderConfig(BaseModel):
     """AI服务提供商配置"""
     name: str
     enabled: bool = True
-    api_key: str
-    api_url: str
+    type: str = "api"  # api 调用服务商接口 / simulation 本地模拟（见 simulation）
+    api_key: str = ""
+    api_url: str = ""
     model: str
     max_tokens: int = 512
     temperature: float = 0.1
+    stream: bool = False  # 使用SSE流式响应，解析出完整答案后立即结束
+    json_mode: bool = False  # 要求模型只输出JSON对象（需服务商支持 response_format）
+    simulation: Optional[SimulationConfig] = None  # 模拟参数，为空时使用默认值
+
+
+class PromptTemplateConfig(BaseModel):
+    """提示词模板配置（按题目类型覆盖内置模板，未填写的字段使用内置值）"""
+    system: Optional[str] = None  # 固定的系统消息，保持不变以便服务商缓存前缀
+    user: Optional[str] = None  # 用户消息模板，可用占位符 {title} {options}
+    max_tokens: Optional[int] = None  # 该题型的输出token上限（不超过提供商的 max_tokens），为空时使用提供商的 max_tokens
+
+
+class AIBatchConfig(BaseModel):
+    """AI请求微批处理配置"""
+    enabled: bool = False
+    window_ms: int = 100  # 收集同一批题目的时间窗口（毫秒）
+    max_size: int = 8  # 每批最多题目数，达到后立即发送
+    max_tokens: int = 4096  # 每批的输出token上限（可超过提供商的 max_tokens），各题预算之和达到后立即发送
+
+
+class AITieringConfig(BaseModel):
+    """AI分级回答配置：先问快速模型，把握不足时再问 default_provider"""
+    enabled: bool = False
+    fast_provider: str = ""  # 快速模型的提供商名称，建议开启该提供商的 json_mode
+    confidence_threshold: float = 0.8  # 快速模型自评置信度低于该值时升级到强模型
+
+
+class AILimiterConfig(BaseModel):
+    """AI提供商自适应并发限制配置（每个worker、每个提供商独立计算）"""
+    enabled: bool = True
+    initial_limit: int = 8  # 初始并发上限
+    min_limit: int = 1
+    max_limit: int = 64
+    latency_target: float = 10.0  # 单次调用超过该耗时（秒）视为过载，收缩并发上限
+    backoff_ratio: float = 0.5  # 遇到429或超时时并发上限的收缩比例
+    max_queue: int = 200  # 排队等待的最大请求数，超出直接拒绝
+    max_queue_wait: float = 10.0  # 最长排队时间（秒）
+
+
+class AIBenchmarkConfig(BaseModel):
+    """管理后台服务商基准测试配置（命令行脚本不受限制）"""
+    enabled: bool = False  # 是否开放管理后台的基准测试接口（对真实服务商会产生大量计费调用）
+    simulation_only: bool = True  # 只允许测试 simulation 类型的模拟提供商
 
 
 class AIConfig(BaseModel):
     """AI配置"""
     default_provider: str = "siliconflow"
-    timeout: int = 30
-    max_retries: int = 3
+    timeout: int = 30  # 单次请求超时（秒）
+    max_retries: int = 3  # 最多尝试次数
+    deadline: Optional[float] = None  # 一次AI调用（含所有重试和等待）的总时间预算（秒），为空时为 timeout * (max_retries + 1)
+    retry_base_delay: float = 0.5  # 重试退避基数（秒），实际等待在 0 ~ 基数*2^n 之间随机
+    retry_max_delay: float = 8.0  # 单次重试等待上限（秒）
     providers: Dict[str, AIProviderConfig] = {}
+    prompts: Dict[str, PromptTemplateConfig] = {}
+    batch: AIBatchConfig = Field(default_factory=AIBatchConfig)
+    tiering: AITieringConfig = Field(default_factory=AITieringConfig)
+    limiter: AILimiterConfig = Field(default_factory=AILimiterConfig)
+    benchmark: AIBenchmarkConfig = Field(default_factory=AIBenchmarkConfig)
 
 
 class AppConfig(BaseModel):
@@ -38,6 +105,13 @@ class ServerConfig(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
 
+    # 生产模式配置（python -m app.launcher --production）
+    mode: str = "development"  # development 单进程 / production 多worker
+    workers: int = 0  # worker数量，0表示自动（按CPU核数，SQLite时为1）
+    keep_alive: int = 15  # HTTP keep-alive 超时（秒）
+    backlog: int = 2048  # 等待accept的最大连接数
+    limit_max_requests: int = 10000  # 每个worker处理多少请求后重启以回收内存，0表示不限制（仅多worker时生效）
+
 
 class DatabaseConfig(BaseModel):
     """数据库配置"""
@@ -57,11 +131,82 @@ class CacheConfig(BaseModel):
     db: int = 0
     password: Optional[str] = None
 
+    # Redis连接池与超时
+    redis_max_connections: int = 50  # 每个worker的最大连接数
+    redis_pool_timeout: float = 1.0  # 连接池耗尽时等待空闲连接的最长时间（秒）
+    redis_connect_timeout: float = 2.0  # 建立连接超时（秒）
+    redis_socket_timeout: float = 1.0  # 单条命令读写超时（秒）
+    redis_health_check_interval: int = 15  # 空闲连接复用前的健康检查间隔（秒）
+
+    # 进程内缓存容量（条目数）
+    max_entries: int = 10000
+
+    # Redis模式下的本地L1缓存：先查进程内缓存再查Redis，通过发布/订阅保持各worker一致
+    l1_enabled: bool = True
+    l1_ttl: int = 60  # L1条目最长存活时间（秒），即使漏掉失效消息也只会在此期间读到旧值
+
+    # 过期策略：ttl 为软过期，之后 stale_ttl 秒内仍返回旧值并由一个后台任务从数据库刷新
+    stale_ttl: int = 600
+    ttl_jitter: float = 0.1  # 软过期时间随机提前的最大比例，避免同时写入的键同时变旧
+    early_refresh_beta: float = 1.0  # 概率提前刷新系数（XFetch），0表示只在软过期后刷新
+    refresh_max_inflight: int = 100  # 同时进行的后台刷新数上限
+
+    # Redis缓存值编码与旧代键回收
+    compress_min_bytes: int = 512  # 超过该长度的答案压缩存储，0表示不压缩
+    reclaim_interval: int = 3600  # 扫描回收旧代缓存键的间隔（秒），0表示不回收
+
+    # 内存缓存模式下的磁盘快照：定期及关闭时保存，启动后在后台加载
+    snapshot_enabled: bool = True
+    snapshot_file: str = "data/cache_snapshot.bin"
+    snapshot_interval: int = 300  # 定时保存间隔（秒），0表示只在关闭时保存
+
+    # 启动预热：从数据库加载题目到缓存
+    warmup_enabled: bool = True
+    warmup_strategy: str = "hot"  # hot 按访问次数（无统计的按最新），recent 按创建时间
+    warmup_limit: int = 1000  # 预热的题目数量
+    warmup_batch_size: int = 200  # 每批加载的题目数量
+
 
 class RateLimitConfig(BaseModel):
     """限流配置"""
     enabled: bool = True
-    per_minute: int = 60
+    per_minute: int = 60  # 每个客户端每分钟的查询次数
+    burst: Optional[int] = None  # 允许的突发请求数（令牌桶容量），默认等于 per_minute
+    ai_per_minute: int = 20  # 每个客户端每分钟需要调用AI的查询次数（缓存/数据库未命中）
+    ai_burst: Optional[int] = None  # AI查询的突发数，默认等于 ai_per_minute
+    backend: str = "auto"  # auto/memory/redis，auto 在Redis缓存模式下使用Redis共享额度
+    key_by: str = "ip"  # ip 或 token（X-API-Key / Bearer / token参数，缺失时退回IP）
+    trust_forwarded: bool = False  # 是否信任 X-Forwarded-For（部署在反向代理后时开启）
+    forwarded_hops: int = 1  # 可信代理的层数，取 X-Forwarded-For 从右数第N个地址（左侧的地址可被客户端伪造）
+    paths: list[str] = ["/api/v1/query", "/api/v1/prefetch"]  # 需要限流的路径前缀
+
+
+class StatsConfig(BaseModel):
+    """流量统计配置"""
+    timeseries_minutes: int = 1440  # 内存中保留的分钟级统计数（环形缓冲区大小）
+    rollup_enabled: bool = False  # 是否定时将分钟级统计汇总写入数据库
+    rollup_interval: int = 300  # 汇总写库间隔（秒）
+
+    # 题目访问统计（内存聚合后批量写库）
+    access_enabled: bool = True
+    access_flush_interval: int = 30  # 写库间隔（秒）
+    access_max_pending: int = 5000  # 待写入题目数达到该值时提前写库
+
+
+class QueryConfig(BaseModel):
+    """查询配置"""
+    default_timeout: Optional[float] = None  # 客户端未指定时的时间预算（秒），为空时一直等待AI返回
+    max_timeout: float = 60.0  # 客户端可指定的最大时间预算（秒）
+    background_completion: bool = True  # 超出时间预算后AI调用继续在后台完成并写入缓存和数据库
+    max_background_tasks: int = 200  # 同时在后台完成的AI调用上限，超出时到期即取消
+
+
+class PrefetchConfig(BaseModel):
+    """整卷预取配置"""
+    enabled: bool = True
+    queue_size: int = 1000  # 等待预取的题目上限，超出的题目直接丢弃
+    workers: int = 2  # 同时预取的题目数（每个worker进程）
+    max_questions: int = 200  # 单次请求最多提交的题目数
 
 
 class LoggingConfig(BaseModel):
@@ -69,6 +214,11 @@ class LoggingConfig(BaseModel):
     level: str = "INFO"
     file: str = "logs/app.log"
     rotation: str = "10 MB"
+    enqueue: bool = True  # 通过后台队列异步写日志，避免阻塞事件循环
+    module_levels: Dict[str, str] = {}  # 按模块前缀设置级别，如 {"app.providers": "WARNING"}
+    sample_rate: float = 1.0  # 热点日志采样比例 (0~1)
+    sample_per_second: int = 20  # 每个调用点每秒最多输出的热点日志条数，0表示不限制
+    slow_request_ms: float = 1000.0  # 超过该耗时（毫秒）或返回5xx的请求总是输出访问日志，其余请求按采样输出
 
 
 class SecurityConfig(BaseModel):
@@ -85,6 +235,9 @@ class Settings(BaseModel):
     ai: AIConfig = Field(default_factory=AIConfig)
     cache: CacheConfig = Field(default_factory=CacheConfig)
     rate_limit: RateLimitConfig = Field(default_factory=RateLimitConfig)
+    stats: StatsConfig = Field(default_factory=StatsConfig)
+    query: QueryConfig = Field(default_factory=QueryConfig)
+    prefetch: PrefetchConfig = Field(default_factory=PrefetchConfig)
     logging: LoggingConfig = Field(default_factory=LoggingConfig)
     security: SecurityConfig = Field(default_factory=SecurityConfig)
 
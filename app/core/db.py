@@ -1,8 +1,12 @@
 """数据库连接管理 - 异步数据库引擎和Session管理"""
+import asyncio
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlmodel import SQLModel
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.metrics import DB_POOL_CHECKOUTS, DB_POOL_CHECKED_OUT
 
 logger = get_logger(__name__)
 
@@ -13,6 +17,20 @@ engine = create_async_engine(
     pool_pre_ping=True,  # 连接健康检查
 )
 
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    """连接池借出连接时记录指标"""
+    DB_POOL_CHECKOUTS.inc()
+    DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_pool_checkin(dbapi_connection, connection_record):
+    """连接归还连接池时记录指标"""
+    DB_POOL_CHECKED_OUT.dec()
+
+
 # 创建异步Session工厂
 async_session_maker = async_sessionmaker(
     engine,
@@ -39,8 +57,17 @@ async def get_session() -> AsyncSession:
 
 async def init_db():
     """初始化数据库表"""
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    # 多worker同时启动时可能并发建表，失败后重新检查（create_all会跳过已存在的表）
+    for attempt in range(3):
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+            break
+        except OperationalError as e:
+            if attempt == 2:
+                raise
+            logger.warning(f"⚠️  数据库建表冲突，重试中: {e.orig}")
+            await asyncio.sleep(0.2 * (attempt + 1))
     logger.info("✅ 数据库表初始化完成")
 
 
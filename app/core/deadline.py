@@ -0,0 +1,70 @@
+"""请求截止时间 - 在查询的各个阶段之间传递客户端的时间预算"""
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+_current_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class Deadline:
+    """
+    请求截止时间
+
+    Args:
+        at: 截止时间点（time.monotonic()）
+    """
+
+    __slots__ = ("at",)
+
+    def __init__(self, at: float):
+        self.at = at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """
+        从现在起 seconds 秒后截止
+
+        Args:
+            seconds: 时间预算（秒）
+
+        Returns:
+            截止时间
+        """
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """剩余时间（秒），已截止时为0"""
+        return max(self.at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        """是否已截止"""
+        return time.monotonic() >= self.at
+
+
+def current_deadline() -> Optional[float]:
+    """
+    获取当前上下文的截止时间点
+
+    Returns:
+        time.monotonic() 时间点，没有设置时返回None
+    """
+    return _current_deadline.get()
+
+
+def set_deadline(deadline: Optional[Deadline]) -> Token:
+    """
+    设置当前上下文的截止时间（之后创建的任务会继承该值）
+
+    Args:
+        deadline: 截止时间，None表示不限制
+
+    Returns:
+        用于 reset_deadline 的令牌
+    """
+    return _current_deadline.set(deadline.at if deadline else None)
+
+
+def reset_deadline(token: Token) -> None:
+    """恢复设置前的截止时间"""
+    _current_deadline.reset(token)
@@ -1,7 +1,10 @@
 """日志系统配置 - 使用loguru进行结构化日志管理"""
 import sys
+import time
+import random
 import logging
 from pathlib import Path
+from typing import Dict, Tuple
 from loguru import logger as loguru_logger
 from app.core.config import settings
 
@@ -25,6 +28,88 @@ class InterceptHandler(logging.Handler):
         )
 
 
+class LogFilter:
+    """
+    日志过滤器 - 按模块设置日志级别，并对热点路径日志进行采样限流
+
+    只有通过 get_logger(name, sampled=True) 获取的logger产生的日志才会被采样，
+    WARNING及以上级别的日志永远不会被丢弃。
+
+    Args:
+        default_level: 默认日志级别
+        module_levels: 模块前缀到日志级别的映射，如 {"app.providers": "WARNING"}
+        sample_rate: 采样日志的保留比例 (0~1)
+        per_second: 每个调用点每秒最多输出的采样日志条数，0表示不限制
+    """
+
+    def __init__(
+        self,
+        default_level: str,
+        module_levels: Dict[str, str],
+        sample_rate: float = 1.0,
+        per_second: int = 0
+    ):
+        self.default_no = loguru_logger.level(default_level.upper()).no
+        # 按前缀长度倒序，保证最长前缀优先匹配
+        self.module_levels = sorted(
+            ((prefix, loguru_logger.level(level.upper()).no) for prefix, level in module_levels.items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self.sample_rate = sample_rate
+        self.per_second = per_second
+        self._level_cache: Dict[str, int] = {}
+        self._windows: Dict[Tuple[str, int], list] = {}
+
+    @property
+    def min_level(self) -> int:
+        """所有规则中的最低级别，作为sink的level参数"""
+        return min([self.default_no] + [no for _, no in self.module_levels])
+
+    def _level_for(self, name: str) -> int:
+        """查找模块对应的日志级别（结果缓存）"""
+        level_no = self._level_cache.get(name)
+        if level_no is None:
+            level_no = self.default_no
+            for prefix, no in self.module_levels:
+                if name == prefix or name.startswith(prefix + "."):
+                    level_no = no
+                    break
+            self._level_cache[name] = level_no
+        return level_no
+
+    def _keep_sampled(self, record) -> bool:
+        """采样与按调用点限流"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.per_second <= 0:
+            return True
+
+        key = (record["name"], record["line"])
+        now = int(time.monotonic())
+        window = self._windows.get(key)
+        if window is None or window[0] != now:
+            self._windows[key] = [now, 1]
+            return True
+        window[1] += 1
+        return window[1] <= self.per_second
+
+    def __call__(self, record) -> bool:
+        if record["level"].no < self._level_for(record["name"] or ""):
+            return False
+
+        extra = record["extra"]
+        if not extra.get("sampled") or record["level"].no >= logging.WARNING:
+            return True
+
+        # 同一条日志会经过多个sink，采样结果只计算一次
+        keep = extra.get("_keep")
+        if keep is None:
+            keep = self._keep_sampled(record)
+            extra["_keep"] = keep
+        return keep
+
+
 def setup_logger():
     """配置loguru日志系统"""
     import logging
@@ -32,10 +117,18 @@ def setup_logger():
     # 移除默认handler
     loguru_logger.remove()
 
+    log_filter = LogFilter(
+        default_level=settings.logging.level,
+        module_levels=settings.logging.module_levels,
+        sample_rate=settings.logging.sample_rate,
+        per_second=settings.logging.sample_per_second,
+    )
+
     # 控制台输出 - 彩色格式
     loguru_logger.add(
         sys.stdout,
-        level=settings.logging.level,
+        level=log_filter.min_level,
+        filter=log_filter,
         format=(
             "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
             "<level>{level: <8}</level> | "
@@ -43,6 +136,7 @@ def setup_logger():
             "<level>{message}</level>"
         ),
         colorize=True,
+        enqueue=settings.logging.enqueue,
     )
 
     # 文件输出 - JSON格式
@@ -51,29 +145,39 @@ def setup_logger():
 
     loguru_logger.add(
         settings.logging.file,
-        level=settings.logging.level,
+        level=log_filter.min_level,
+        filter=log_filter,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {message}",
         rotation=settings.logging.rotation,
         retention="30 days",
         compression="zip",
+        enqueue=settings.logging.enqueue,
     )
 
     # 拦截标准logging
     logging.basicConfig(handlers=[InterceptHandler()], level=0)
 
 
-def get_logger(name: str):
+def get_logger(name: str, sampled: bool = False):
     """
     获取logger实例
 
     Args:
         name: logger名称，通常使用__name__
+        sampled: 是否对该logger的INFO及以下日志进行采样限流（用于每个请求都会输出的热点日志）
 
     Returns:
         绑定名称的logger实例
     """
+    if sampled:
+        return loguru_logger.bind(name=name, sampled=True)
     return loguru_logger.bind(name=name)
 
 
+async def shutdown_logger():
+    """等待异步队列中的日志全部写出"""
+    await loguru_logger.complete()
+
+
 # 应用启动时配置日志
 setup_logger()
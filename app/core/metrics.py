@@ -0,0 +1,232 @@
+"""Prometheus监控指标 - 指标定义与导出
+
+多worker部署时需要在启动worker前设置环境变量 PROMETHEUS_MULTIPROC_DIR
+（launcher 会自动设置），各worker的指标写入该目录下的共享文件，
+/metrics 由任意一个worker聚合所有worker的数据后输出。
+
+缓存命中率可通过以下PromQL计算:
+    sum(rate(qb_cache_requests_total{result=~"hit|stale"}[5m])) / sum(rate(qb_cache_requests_total[5m]))
+"""
+import os
+from typing import Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 是否运行在多进程模式
+MULTIPROCESS_MODE = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# 延迟分桶（秒）：数据库查询为毫秒级，AI调用为秒级
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+AI_BUCKETS = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+
+# ---------- 查询 ----------
+QUERY_TOTAL = Counter(
+    "qb_query_total",
+    "查询次数（按答案来源 cache/database/ai/pending/none）",
+    ["source"],
+)
+CACHE_REQUESTS = Counter(
+    "qb_cache_requests_total",
+    "缓存查询次数（按结果 hit/stale/miss）",
+    ["result"],
+)
+CACHE_REFRESHES = Counter(
+    "qb_cache_refreshes_total",
+    "缓存后台刷新次数（按结果 ok/missing/error）",
+    ["result"],
+)
+QUERY_DEADLINE_EXCEEDED = Counter(
+    "qb_query_deadline_exceeded_total",
+    "等待AI超出客户端时间预算的查询次数（按处理方式 background后台完成/cancelled取消）",
+    ["action"],
+)
+AI_BACKGROUND_COMPLETIONS = Counter(
+    "qb_ai_background_completions_total",
+    "客户端已超时后在后台完成的AI调用数（按结果 ok/empty/error）",
+    ["result"],
+)
+PREFETCH_JOBS = Counter(
+    "qb_prefetch_jobs_total",
+    "预取题目数（按结果 cached/database/ai/failed/quota/dropped）",
+    ["result"],
+)
+PREFETCH_QUEUE_DEPTH = Gauge(
+    "qb_prefetch_queue_depth",
+    "等待预取的题目数",
+    multiprocess_mode="livesum",
+)
+DB_LOOKUP_SECONDS = Histogram(
+    "qb_db_lookup_seconds",
+    "数据库题目查询耗时（秒）",
+    buckets=DB_BUCKETS,
+)
+
+# ---------- AI ----------
+AI_REQUEST_SECONDS = Histogram(
+    "qb_ai_request_seconds",
+    "AI调用耗时（秒，包含重试）",
+    ["provider", "model"],
+    buckets=AI_BUCKETS,
+)
+AI_FIRST_ANSWER_SECONDS = Histogram(
+    "qb_ai_first_answer_seconds",
+    "AI拿到可用答案的耗时（秒，包含重试；mode: full非流式/stream流式读完/early流式提前结束）",
+    ["provider", "mode"],
+    buckets=AI_BUCKETS,
+)
+AI_TEMPLATE_SECONDS = Histogram(
+    "qb_ai_template_seconds",
+    "AI调用耗时（秒，按提示词模板）",
+    ["template"],
+    buckets=AI_BUCKETS,
+)
+AI_ESTIMATED_TOKENS = Counter(
+    "qb_ai_estimated_tokens_total",
+    "AI调用估算token数（按提示词模板和部分 prompt/completion）",
+    ["template", "part"],
+)
+AI_BATCH_SIZE = Histogram(
+    "qb_ai_batch_size",
+    "每次微批AI调用包含的题目数",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+AI_BATCH_FALLBACKS = Counter(
+    "qb_ai_batch_fallbacks_total",
+    "微批结果无法使用、回退为逐题调用的题目数（按原因 error/parse/missing）",
+    ["reason"],
+)
+AI_TIER_ANSWERS = Counter(
+    "qb_ai_tier_answers_total",
+    "分级回答中给出最终答案的层级（fast快速模型/strong强模型/fast_fallback强模型失败时沿用快速模型答案）",
+    ["tier"],
+)
+AI_TIER_ESCALATIONS = Counter(
+    "qb_ai_tier_escalations_total",
+    "分级回答升级到强模型的次数（按原因 empty/low_confidence/no_match）",
+    ["reason"],
+)
+AI_RETRIES = Counter(
+    "qb_ai_retries_total",
+    "AI调用重试次数（按原因）",
+    ["provider", "reason"],
+)
+AI_ERRORS = Counter(
+    "qb_ai_errors_total",
+    "AI调用错误次数（按错误类别）",
+    ["provider", "error"],
+)
+AI_RETRY_EXHAUSTED = Counter(
+    "qb_ai_retry_exhausted_total",
+    "AI调用最终失败次数（按原因 fatal不可重试/attempts次数用尽/deadline时间预算用尽）",
+    ["provider", "reason"],
+)
+AI_IN_FLIGHT = Gauge(
+    "qb_ai_in_flight",
+    "正在进行中的AI调用数",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+AI_CONCURRENCY_LIMIT = Gauge(
+    "qb_ai_concurrency_limit",
+    "AI提供商当前的自适应并发上限",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+AI_QUEUE_DEPTH = Gauge(
+    "qb_ai_queue_depth",
+    "等待AI并发名额的请求数",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+AI_QUEUE_WAIT_SECONDS = Histogram(
+    "qb_ai_queue_wait_seconds",
+    "等待AI并发名额的耗时（秒）",
+    ["provider"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+AI_QUEUE_REJECTED = Counter(
+    "qb_ai_queue_rejected_total",
+    "因排队过长或来不及在截止时间前完成而被拒绝的AI调用数（按原因 queue_full/deadline）",
+    ["provider", "reason"],
+)
+
+# ---------- 数据库连接池 ----------
+DB_POOL_CHECKOUTS = Counter(
+    "qb_db_pool_checkouts_total",
+    "数据库连接池借出连接次数",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "qb_db_pool_checked_out",
+    "当前借出的数据库连接数",
+    multiprocess_mode="livesum",
+)
+
+# ---------- Redis ----------
+REDIS_UP = Gauge(
+    "qb_redis_up",
+    "Redis是否可用（1可用，0不可用）",
+    multiprocess_mode="livemostrecent",
+)
+
+
+def classify_http_error(status_code: int) -> str:
+    """
+    将HTTP状态码归类为指标标签，避免标签基数过高
+
+    Args:
+        status_code: HTTP状态码
+
+    Returns:
+        如 http_429、http_5xx、http_4xx
+    """
+    if status_code == 429:
+        return "http_429"
+    if status_code >= 500:
+        return "http_5xx"
+    return "http_4xx"
+
+
+async def update_redis_health() -> None:
+    """刷新Redis健康状态指标（仅在Redis缓存模式下）"""
+    if settings.cache.type.lower() != "redis":
+        return
+
+    # 使用连接管理器维护的健康状态，不可用时由其后台重连，抓取指标时不再等待超时
+    from app.core.redis import redis_manager
+    REDIS_UP.set(1 if redis_manager.healthy else 0)
+
+
+async def render_metrics() -> Tuple[bytes, str]:
+    """
+    生成Prometheus文本格式的指标数据
+
+    Returns:
+        (指标内容, Content-Type)
+    """
+    await update_redis_health()
+
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """worker退出时清理其存活型(live*)指标"""
+    if MULTIPROCESS_MODE:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,67 +1,183 @@
-"""Redis连接管理 - 异步Redis客户端"""
-from redis.asyncio import Redis
-from typing import Optional
+"""Redis连接管理 - 带连接池、超时和后台重连的异步Redis客户端"""
+import asyncio
+import random
+from datetime import datetime
+from typing import Any, Dict, Optional
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 from app.core.config import settings
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 视为Redis不可用的错误类型（其余错误如命令参数错误不影响健康状态）
+CONNECTION_ERRORS = (RedisConnectionError, RedisTimeoutError, ConnectionError, TimeoutError, OSError)
+
+# 后台重连的退避上限（秒）
+MAX_RECONNECT_BACKOFF = 30.0
+
 
 class RedisManager:
-    """Redis连接管理器"""
+    """
+    Redis连接管理器
+
+    - 使用有上限的连接池，并设置连接和读写超时，Redis变慢时不会拖住请求
+    - 连接失败或命令出现连接类错误时标记为不健康，get_redis() 立即返回None，
+      调用方自动降级到本地缓存；后台任务按指数退避重连，恢复后自动切回Redis
+    """
 
     def __init__(self):
         self._redis: Optional[Redis] = None
+        self._pool: Optional[BlockingConnectionPool] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.healthy = False
+        self.last_error: Optional[str] = None
+        self.changed_at: Optional[datetime] = None
+        self.reconnect_attempts = 0
 
-    async def get_redis(self) -> Redis:
+    async def get_redis(self) -> Optional[Redis]:
         """
         获取Redis客户端实例（单例模式）
 
         Returns:
-            Redis客户端实例
+            Redis客户端实例，Redis不可用（正在后台重连）时返回None
         """
         if self._redis is None:
             await self.connect()
-        return self._redis
+        return self._redis if self.healthy else None
+
+    def _create_pool(self) -> BlockingConnectionPool:
+        """按配置创建连接池（配置了 redis_url 时优先使用）"""
+        cache = settings.cache
+        options = dict(
+            max_connections=cache.redis_max_connections,
+            timeout=cache.redis_pool_timeout,
+            socket_connect_timeout=cache.redis_connect_timeout,
+            socket_timeout=cache.redis_socket_timeout,
+            socket_keepalive=True,
+            health_check_interval=cache.redis_health_check_interval,
+            decode_responses=True,
+        )
+        if cache.redis_url:
+            return BlockingConnectionPool.from_url(cache.redis_url, **options)
+        return BlockingConnectionPool(
+            host=cache.host,
+            port=cache.port,
+            db=cache.db,
+            password=cache.password,
+            **options,
+        )
 
     async def connect(self) -> None:
-        """创建Redis连接"""
+        """创建Redis连接，失败时启动后台重连"""
+        if self._redis is None:
+            self._pool = self._create_pool()
+            self._redis = Redis(connection_pool=self._pool)
         try:
-            self._redis = Redis(
-                host=settings.cache.host,
-                port=settings.cache.port,
-                db=settings.cache.db,
-                password=settings.cache.password,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_keepalive=True,
-            )
-            # 测试连接
             await self._redis.ping()
+            self._set_healthy(True)
             logger.info("✅ Redis连接成功")
         except Exception as e:
             logger.warning(f"⚠️  Redis连接失败: {e}")
-            logger.info("将使用内存缓存替代Redis")
-            self._redis = None
+            logger.info("将使用内存缓存替代Redis，并在后台自动重连")
+            self.report_failure(e)
 
     async def close(self) -> None:
         """关闭Redis连接"""
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+
         if self._redis:
-            await self._redis.close()
+            await self._redis.aclose()
+            await self._pool.disconnect()
             self._redis = None
+            self._pool = None
+            self.healthy = False
             logger.info("✅ Redis连接已关闭")
 
     async def ping(self) -> bool:
         """测试Redis连接是否正常"""
+        if self._redis is None:
+            return False
         try:
-            if self._redis:
-                await self._redis.ping()
-                return True
+            await self._redis.ping()
+            self._set_healthy(True)
+            return True
         except Exception as e:
             logger.warning(f"Redis ping失败: {e}")
-            self._redis = None
+            self.report_failure(e)
         return False
 
+    def report_failure(self, error: BaseException) -> None:
+        """
+        报告Redis命令失败
+
+        连接类错误会把Redis标记为不健康并启动后台重连，之后的调用直接走本地降级，
+        不再逐个请求等待超时
+
+        Args:
+            error: 捕获到的异常
+        """
+        if not isinstance(error, CONNECTION_ERRORS):
+            return
+        self.last_error = str(error) or type(error).__name__
+        if self.healthy:
+            logger.warning(f"⚠️  Redis不可用: {self.last_error}，切换到内存缓存并后台重连")
+        self._set_healthy(False)
+
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    def _set_healthy(self, healthy: bool) -> None:
+        """更新健康状态"""
+        if healthy != self.healthy or self.changed_at is None:
+            self.changed_at = datetime.utcnow()
+        self.healthy = healthy
+        if healthy:
+            self.reconnect_attempts = 0
+
+    async def _reconnect(self) -> None:
+        """按指数退避（带随机抖动）重连，直到成功"""
+        backoff = 1.0
+        while True:
+            await asyncio.sleep(backoff * (0.5 + random.random() / 2))
+            self.reconnect_attempts += 1
+            try:
+                await self._redis.ping()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                backoff = min(backoff * 2, MAX_RECONNECT_BACKOFF)
+                logger.debug("Redis重连失败（第 {} 次）: {}", self.reconnect_attempts, self.last_error)
+                continue
+
+            logger.info(f"✅ Redis已恢复连接（重试 {self.reconnect_attempts} 次）")
+            self._set_healthy(True)
+            return
+
+    def status(self) -> Dict[str, Any]:
+        """
+        获取Redis连接状态
+
+        Returns:
+            状态字典，用于 /health
+        """
+        pool = self._pool
+        return {
+            "healthy": self.healthy,
+            "since": self.changed_at.isoformat() if self.changed_at else None,
+            "last_error": self.last_error,
+            "reconnect_attempts": self.reconnect_attempts,
+            "max_connections": settings.cache.redis_max_connections,
+            "in_use_connections": len(getattr(pool, "_in_use_connections", ())) if pool else 0,
+        }
+
 
 # 全局Redis管理器实例
 redis_manager = RedisManager()
@@ -0,0 +1,172 @@
+"""查询流量时间序列 - 按分钟聚合的固定大小环形缓冲区
+
+每个worker进程维护自己的环形缓冲区，热路径上只做计数和追加操作；
+百分位数在读取时才计算。多worker部署时可开启定时汇总写入数据库，
+从数据库读取时按分钟合并所有worker的数据。
+"""
+import math
+import random
+import time
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+# 每分钟最多保留的延迟样本数（蓄水池采样），用于估算p50/p95
+MAX_LATENCY_SAMPLES = 512
+
+# pending: AI超出客户端时间预算，答案在后台完成
+SOURCES = ("cache", "database", "ai", "pending", "none")
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    计算已排序列表的百分位数（最近秩法）
+
+    Args:
+        sorted_values: 升序排列的数值
+        p: 百分位 (0~100)
+
+    Returns:
+        百分位数值，列表为空时返回0
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class MinuteBucket:
+    """单分钟的聚合数据"""
+
+    __slots__ = ("minute", "sources", "latency_count", "latencies", "ai_calls", "ai_errors", "errors")
+
+    def __init__(self, minute: int):
+        self.minute = minute
+        self.sources: Dict[str, int] = dict.fromkeys(SOURCES, 0)
+        self.latency_count = 0
+        self.latencies: List[float] = []
+        self.ai_calls = 0
+        self.ai_errors = 0
+        self.errors = 0
+
+    def add_latency(self, latency_ms: float) -> None:
+        """蓄水池采样记录延迟，保证内存占用固定"""
+        self.latency_count += 1
+        if len(self.latencies) < MAX_LATENCY_SAMPLES:
+            self.latencies.append(latency_ms)
+        else:
+            slot = random.randrange(self.latency_count)
+            if slot < MAX_LATENCY_SAMPLES:
+                self.latencies[slot] = latency_ms
+
+    def to_dict(self) -> dict:
+        """转换为字典，计算延迟百分位"""
+        latencies = sorted(self.latencies)
+        total = sum(self.sources.values())
+        hits = self.sources["cache"] + self.sources["database"]
+        return {
+            "minute": self.minute * 60,
+            "total": total,
+            "sources": dict(self.sources),
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "ai_calls": self.ai_calls,
+            "ai_errors": self.ai_errors,
+            "errors": self.errors,
+        }
+
+
+class QueryTimeSeries:
+    """
+    按分钟聚合的查询流量环形缓冲区
+
+    Args:
+        size: 保留的分钟数（缓冲区槽位数）
+    """
+
+    def __init__(self, size: int = 1440):
+        self.size = max(1, size)
+        self._buckets: List[Optional[MinuteBucket]] = [None] * self.size
+
+    def _bucket(self, minute: Optional[int] = None) -> MinuteBucket:
+        """获取指定分钟的桶，槽位被旧数据占用时重置"""
+        if minute is None:
+            minute = int(time.time() // 60)
+        slot = minute % self.size
+        bucket = self._buckets[slot]
+        if bucket is None or bucket.minute != minute:
+            bucket = MinuteBucket(minute)
+            self._buckets[slot] = bucket
+        return bucket
+
+    def record_query(self, source: str, latency_ms: float) -> None:
+        """
+        记录一次查询
+
+        Args:
+            source: 答案来源 cache/database/ai/pending/none
+            latency_ms: 查询耗时（毫秒）
+        """
+        bucket = self._bucket()
+        bucket.sources[source] = bucket.sources.get(source, 0) + 1
+        bucket.add_latency(latency_ms)
+
+    def record_ai_call(self, failed: bool = False) -> None:
+        """
+        记录一次AI调用
+
+        Args:
+            failed: 调用是否失败
+        """
+        bucket = self._bucket()
+        bucket.ai_calls += 1
+        if failed:
+            bucket.ai_errors += 1
+
+    def record_error(self) -> None:
+        """记录一次查询异常"""
+        self._bucket().errors += 1
+
+    def snapshot(self, minutes: int = 60, include_current: bool = True) -> List[dict]:
+        """
+        获取最近N分钟的聚合数据（按时间升序，缺失的分钟补零）
+
+        Args:
+            minutes: 分钟数
+            include_current: 是否包含尚未结束的当前分钟
+
+        Returns:
+            每分钟一条的字典列表
+        """
+        current = int(time.time() // 60)
+        end = current if include_current else current - 1
+        start = end - min(minutes, self.size) + 1
+
+        points = []
+        for minute in range(start, end + 1):
+            bucket = self._buckets[minute % self.size]
+            if bucket is None or bucket.minute != minute:
+                bucket = MinuteBucket(minute)
+            points.append(bucket.to_dict())
+        return points
+
+    def completed_buckets(self, since_minute: int) -> List[MinuteBucket]:
+        """
+        获取指定分钟之后已结束的有数据的桶（用于汇总写库）
+
+        Args:
+            since_minute: 起始分钟（不含）
+
+        Returns:
+            按时间升序的桶列表
+        """
+        current = int(time.time() // 60)
+        buckets = [
+            bucket for bucket in self._buckets
+            if bucket is not None and since_minute < bucket.minute < current
+        ]
+        return sorted(buckets, key=lambda b: b.minute)
+
+
+# 全局时间序列实例
+query_timeseries = QueryTimeSeries(settings.stats.timeseries_minutes)
@@ -2,6 +2,10 @@
 import sys
 import os
 import json
+import shutil
+import argparse
+import tempfile
+import importlib.util
 from pathlib import Path
 
 
@@ -94,8 +98,124 @@ def show_ocs_config(config_file):
     print("=" * 70)
 
 
+def resolve_workers(configured: int, database_url: str = "") -> int:
+    """
+    计算worker数量
+
+    优先级: 环境变量 WEB_CONCURRENCY > 配置 server.workers > 自动
+    （自动时按CPU核数；SQLite只允许一个写入者，自动时只启动1个worker）
+
+    Args:
+        configured: 配置中的worker数量，0表示自动
+        database_url: 数据库连接地址
+
+    Returns:
+        worker数量
+    """
+    env_workers = os.getenv("WEB_CONCURRENCY")
+    if env_workers:
+        return max(1, int(env_workers))
+    if configured > 0:
+        return configured
+    if database_url.startswith("sqlite"):
+        return 1
+    return max(1, os.cpu_count() or 1)
+
+
+def check_multi_worker_config(settings, workers: int) -> None:
+    """
+    多worker启动检查：提示无法在worker之间共享状态的配置
+
+    Args:
+        settings: 应用配置
+        workers: worker数量
+    """
+    if workers <= 1:
+        return
+
+    if settings.cache.type.lower() != "redis":
+        print(f"⚠️  当前使用内存缓存，{workers} 个worker各自维护独立缓存：")
+        print("   命中率会下降、内存占用成倍增加，清空缓存也只对单个worker生效。建议配置 Redis 缓存。")
+
+    if settings.database.url.startswith("sqlite"):
+        print(f"⚠️  当前使用SQLite，{workers} 个worker并发写入会竞争同一把写锁，")
+        print("   高并发时可能出现 'database is locked'。建议使用 PostgreSQL，或减少worker数量。")
+
+    backend = settings.rate_limit.backend.lower()
+    if settings.rate_limit.enabled and (backend == "memory" or (backend == "auto" and settings.cache.type.lower() != "redis")):
+        print(f"⚠️  限流使用进程内令牌桶，实际额度为配置值的 {workers} 倍。建议配置 Redis。")
+
+
+def run_production_server(config_file: Path) -> None:
+    """
+    以生产模式启动：多worker、uvloop/httptools、keep-alive与backlog调优、worker定期回收
+
+    Args:
+        config_file: 配置文件路径
+    """
+    from app.core.config import load_config
+
+    settings = load_config(str(config_file))
+    server = settings.server
+    workers = resolve_workers(server.workers, settings.database.url)
+
+    check_multi_worker_config(settings, workers)
+
+    # 多worker时Prometheus指标需要写入共享目录，必须在worker导入应用之前设置
+    if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        metrics_dir = Path(tempfile.gettempdir()) / f"ocs-tiku-metrics-{server.port}"
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(metrics_dir)
+
+    # 达到请求数后退出的worker由uvicorn的多进程管理器重新拉起；单worker时没有管理进程，退出即停止服务
+    limit_max_requests = server.limit_max_requests if workers > 1 else 0
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+    print(f"🚀 生产模式启动: {server.host}:{server.port}")
+    print(f"   workers={workers} loop={loop} http={http} keep_alive={server.keep_alive}s "
+          f"backlog={server.backlog} limit_max_requests={limit_max_requests or '不限'}")
+    print("-" * 70)
+
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=server.host,
+        port=server.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=server.keep_alive,
+        backlog=server.backlog,
+        limit_max_requests=limit_max_requests or None,
+        proxy_headers=True,
+        access_log=False,  # 访问日志由 ServerTimingMiddleware 输出
+        log_level=settings.logging.level.lower(),
+    )
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="OCS题库系统启动器")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="生产模式：多worker启动，读取当前目录下的 config.json"
+    )
+    return parser.parse_args()
+
+
 def main():
     """主函数"""
+    args = parse_args()
+
+    if args.production:
+        run_production_server(Path("config.json"))
+        return
+
     print("\n" + "=" * 70)
     print("🎓 OCS题库系统 v2.0")
     print("=" * 70)
@@ -106,6 +226,18 @@ def main():
     # 显示OCS配置
     show_ocs_config(config_file)
 
+    # 配置为生产模式时以多worker启动
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            mode = json.load(f).get('server', {}).get('mode', 'development')
+    except:
+        mode = 'development'
+    if mode == "production":
+        print("\n🚀 正在启动服务...")
+        print("-" * 70)
+        run_production_server(config_file)
+        return
+
     # 启动FastAPI应用
     print("\n🚀 正在启动服务...")
     print("-" * 70)
@@ -137,4 +269,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包为exe后多worker需要 freeze_support
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
@@ -1,11 +1,16 @@
 """FastAPI应用主入口 - 应用初始化和路由注册"""
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.db import init_db, close_db
-from app.core.logger import get_logger, setup_logger
+from app.core.logger import get_logger, setup_logger, shutdown_logger
+from app.middleware.timing import ServerTimingMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.api.v1.endpoints.health import health_status
+from app.schemas.health import HealthResponse
 
 logger = get_logger(__name__)
 
@@ -27,15 +32,58 @@ async def lifespan(app: FastAPI):
     if settings.cache.type.lower() == "redis":
         from app.core.redis import redis_manager
         await redis_manager.connect()
-        if await redis_manager.ping():
+        if redis_manager.healthy:
             logger.info("✅ Redis缓存已启用")
         else:
-            logger.info("⚠️  Redis连接失败，将使用内存缓存")
+            logger.info("⚠️  Redis连接失败，暂时使用内存缓存，恢复后自动切回Redis")
+
+    # 订阅缓存失效频道，保持本worker的L1缓存与Redis一致
+    from app.repositories.cache_invalidator import cache_invalidator
+    cache_invalidator.start()
+
+    # 后台回收清空缓存后遗留的旧代键
+    from app.repositories.cache_keyspace import cache_keyspace
+    cache_keyspace.start()
+
+    # 启动流量统计汇总（如果启用）
+    from app.services.stats_service import stats_rollup_service
+    stats_rollup_service.start()
+
+    # 启动题目访问统计批量写库
+    from app.services.access_stats_service import access_stats_service
+    access_stats_service.start()
+
+    # 内存缓存模式下在后台加载磁盘快照
+    from app.repositories.cache_snapshot import cache_snapshot
+    cache_snapshot.start()
+
+    # 后台预热缓存，完成前 /ready 返回503
+    from app.services.warmup_service import cache_warmup_service
+    cache_warmup_service.start()
+
+    # 启动整卷预取worker
+    from app.services.prefetch_service import prefetch_service
+    prefetch_service.start()
 
     yield
 
     # 关闭时执行
     logger.info("🛑 应用关闭中...")
+    await cache_warmup_service.stop()
+    await prefetch_service.stop()
+    from app.services.cache_refresh_service import cache_refresh_service
+    await cache_refresh_service.stop()
+    from app.services.answer_task_service import answer_task_service
+    await answer_task_service.stop()
+    from app.services.ai_batcher import ai_batcher
+    await ai_batcher.stop()
+    from app.benchmark.provider_bench import benchmark_jobs
+    await benchmark_jobs.stop()
+    await cache_snapshot.stop()
+    await cache_invalidator.stop()
+    await cache_keyspace.stop()
+    await stats_rollup_service.stop()
+    await access_stats_service.stop()
     await close_db()
 
     # 关闭Redis连接
@@ -44,6 +92,13 @@ async def lifespan(app: FastAPI):
         await redis_manager.close()
     logger.info("✅ 数据库连接已关闭")
 
+    # 清理本worker的存活型监控指标
+    from app.core.metrics import mark_process_dead
+    mark_process_dead()
+
+    # 等待异步日志队列写完
+    await shutdown_logger()
+
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -63,26 +118,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# 按客户端令牌桶限流
+app.add_middleware(RateLimitMiddleware)
+
+# 最外层：统计请求总耗时及各阶段耗时
+app.add_middleware(ServerTimingMiddleware)
+
 
-# 健康检查端点
-@app.get("/health")
+# 健康检查端点（Docker HEALTHCHECK 使用，与 /api/v1/health 返回相同的状态）
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
     健康检查端点
 
     Returns:
-        健康状态信息
+        健康状态信息，Redis不可用时 status 为 degraded
     """
-    return {
-        "status": "healthy",
-        "app_name": settings.app.name,
-        "version": settings.app.version,
-        "environment": "development" if settings.app.debug else "production"
-    }
+    return health_status()
+
+
+# 就绪检查端点（供负载均衡器使用）
+@app.get("/ready")
+async def readiness_check():
+    """
+    就绪检查端点 - 缓存预热完成前返回503
+
+    Returns:
+        就绪状态和预热进度
+    """
+    from app.services.warmup_service import cache_warmup_service
+    status = cache_warmup_service.status()
+    return JSONResponse(
+        status_code=200 if status["ready"] else 503,
+        content={"status": "ready" if status["ready"] else "warming", "warmup": status}
+    )
+
+
+# Prometheus监控指标
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus监控指标端点
+
+    Returns:
+        Prometheus文本格式的指标数据
+    """
+    from app.core.metrics import render_metrics
+    body, content_type = await render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 # 根路径
@@ -100,6 +188,8 @@ async def root():
         "docs": "/docs",
         "redoc": "/redoc",
         "health": "/health",
+        "ready": "/ready",
+        "metrics": "/metrics",
         "api": settings.app.api_v1_prefix
     }
 
@@ -0,0 +1,278 @@
+"""限流中间件 - 基于令牌桶的按客户端限流
+
+- 单worker使用进程内令牌桶；Redis缓存模式下使用Redis + Lua脚本原子扣减，多worker共享额度
+- 普通查询（缓存/数据库命中）与需要调用AI的查询分别限流
+- 超出限制时返回429，并带上 Retry-After 响应头
+"""
+import math
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 当前请求的客户端标识，由中间件设置，供AI额度检查使用
+current_client: ContextVar[Optional[str]] = ContextVar("current_client", default=None)
+
+# 进程内最多保留的令牌桶数量，超过后清理已回满的桶
+MAX_MEMORY_BUCKETS = 10000
+
+# Redis令牌桶脚本：使用Redis服务器时间，保证多worker之间时钟一致
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_ms = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_ms = math.ceil((cost - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, retry_ms}
+"""
+
+
+class RateLimitExceeded(Exception):
+    """
+    超出限流额度
+
+    Args:
+        retry_after: 建议的重试等待时间（秒）
+        scope: 限流范围 (query/ai)
+    """
+
+    def __init__(self, retry_after: float, scope: str):
+        self.retry_after = retry_after
+        self.scope = scope
+        super().__init__(f"请求过于频繁，请在 {math.ceil(retry_after)} 秒后重试")
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """429响应需要携带的响应头"""
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class MemoryTokenBucket:
+    """进程内令牌桶"""
+
+    def __init__(self):
+        self._buckets: Dict[str, List[float]] = {}
+
+    def consume(self, key: str, capacity: float, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        """
+        尝试扣减令牌
+
+        Args:
+            key: 桶标识
+            capacity: 桶容量
+            rate: 每秒补充的令牌数
+            cost: 本次消耗的令牌数
+
+        Returns:
+            (是否允许, 需要等待的秒数)
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_MEMORY_BUCKETS:
+                self._prune(now, capacity, rate)
+            bucket = self._buckets[key] = [capacity, now]
+
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= cost:
+            bucket[0] = tokens - cost
+            return True, 0.0
+        bucket[0] = tokens
+        return False, (cost - tokens) / rate
+
+    def _prune(self, now: float, capacity: float, rate: float) -> None:
+        """清理已经回满的桶（回满的桶与新建的桶等价）"""
+        full_after = capacity / rate
+        stale = [key for key, (_, ts) in self._buckets.items() if now - ts >= full_after]
+        for key in stale:
+            del self._buckets[key]
+
+
+class RateLimiter:
+    """
+    令牌桶限流器 - 根据配置选择进程内或Redis后端
+
+    Redis不可用时自动降级为进程内令牌桶。
+    """
+
+    def __init__(self):
+        self._memory = MemoryTokenBucket()
+        self._script = None
+
+    def _use_redis(self) -> bool:
+        backend = settings.rate_limit.backend.lower()
+        if backend == "auto":
+            return settings.cache.type.lower() == "redis"
+        return backend == "redis"
+
+    async def _consume_redis(self, key: str, capacity: float, rate: float) -> Optional[Tuple[bool, float]]:
+        """使用Redis Lua脚本扣减令牌，Redis不可用时返回None"""
+        from app.core.redis import redis_manager
+
+        try:
+            redis = await redis_manager.get_redis()
+            if redis is None:
+                return None
+            if self._script is None:
+                self._script = redis.register_script(TOKEN_BUCKET_LUA)
+            allowed, retry_ms = await self._script(keys=[key], args=[capacity, rate, 1], client=redis)
+            return bool(int(allowed)), int(retry_ms) / 1000
+        except Exception as e:
+            logger.warning(f"⚠️  Redis限流失败: {e}，降级到进程内限流")
+            redis_manager.report_failure(e)
+            return None
+
+    async def hit(self, scope: str, client: str, per_minute: int, burst: Optional[int] = None) -> None:
+        """
+        消耗一个令牌，额度不足时抛出 RateLimitExceeded
+
+        Args:
+            scope: 限流范围 (query/ai)
+            client: 客户端标识
+            per_minute: 每分钟补充的令牌数
+            burst: 桶容量（允许的突发请求数），默认等于 per_minute
+
+        Raises:
+            RateLimitExceeded: 额度不足时抛出
+        """
+        if per_minute <= 0:
+            return
+
+        capacity = float(burst or per_minute)
+        rate = per_minute / 60
+        key = f"qb:rl:{scope}:{client}"
+
+        result = None
+        if self._use_redis():
+            result = await self._consume_redis(key, capacity, rate)
+        if result is None:
+            result = self._memory.consume(key, capacity, rate)
+
+        allowed, retry_after = result
+        if not allowed:
+            raise RateLimitExceeded(retry_after, scope)
+
+
+# 全局限流器实例
+rate_limiter = RateLimiter()
+
+
+async def check_ai_quota() -> None:
+    """
+    检查当前客户端调用AI的额度（缓存/数据库未命中、即将调用AI时使用）
+
+    Raises:
+        RateLimitExceeded: 额度不足时抛出
+    """
+    client = current_client.get()
+    if not settings.rate_limit.enabled or client is None:
+        return
+    await rate_limiter.hit("ai", client, settings.rate_limit.ai_per_minute, settings.rate_limit.ai_burst)
+
+
+def get_client_key(scope: Scope) -> str:
+    """
+    获取客户端标识：按配置使用令牌或IP
+
+    Args:
+        scope: ASGI scope
+
+    Returns:
+        形如 token:xxx 或 ip:1.2.3.4 的标识
+    """
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+
+    if settings.rate_limit.key_by == "token":
+        token = headers.get("x-api-key")
+        auth = headers.get("authorization", "")
+        if not token and auth.lower().startswith("bearer "):
+            token = auth[7:].strip()
+        if not token:
+            from urllib.parse import parse_qs
+            token = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token", [None])[0]
+        if token:
+            return f"token:{token}"
+
+    if settings.rate_limit.trust_forwarded and headers.get("x-forwarded-for"):
+        # 每层代理把上一跳的地址追加到末尾，只有右侧由可信代理追加的地址是可信的
+        hops = [ip.strip() for ip in headers["x-forwarded-for"].split(",") if ip.strip()]
+        if hops:
+            return "ip:" + hops[max(len(hops) - max(settings.rate_limit.forwarded_hops, 1), 0)]
+
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def rate_limit_response(exc: RateLimitExceeded) -> JSONResponse:
+    """
+    构建429响应
+
+    Args:
+        exc: 限流异常
+
+    Returns:
+        带 Retry-After 头的JSON响应
+    """
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers=exc.headers,
+    )
+
+
+class RateLimitMiddleware:
+    """
+    限流中间件（纯ASGI实现）
+
+    对配置的路径前缀按客户端进行令牌桶限流。
+
+    Args:
+        app: ASGI应用
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.rate_limit.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if not any(path.startswith(prefix) for prefix in settings.rate_limit.paths):
+            await self.app(scope, receive, send)
+            return
+
+        client = get_client_key(scope)
+        try:
+            await rate_limiter.hit("query", client, settings.rate_limit.per_minute, settings.rate_limit.burst)
+        except RateLimitExceeded as e:
+            logger.warning("限流: client={} path={} retry_after={:.1f}s", client, path, e.retry_after)
+            await rate_limit_response(e)(scope, receive, send)
+            return
+
+        token = current_client.set(client)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_client.reset(token)
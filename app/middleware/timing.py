@@ -0,0 +1,114 @@
+"""请求耗时中间件 - 记录各处理阶段耗时，输出Server-Timing响应头和访问日志"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
+
+# 当前请求的阶段耗时（毫秒），由中间件为每个请求创建
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def record_stage(name: str, duration_ms: float) -> None:
+    """
+    记录一个阶段的耗时，同名阶段累加
+
+    Args:
+        name: 阶段名称（如 cache/db/ai）
+        duration_ms: 耗时（毫秒）
+    """
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + duration_ms
+
+
+@contextmanager
+def stage_timer(name: str) -> Iterator[None]:
+    """
+    阶段计时上下文管理器
+
+    Args:
+        name: 阶段名称
+
+    Example:
+        with stage_timer("db"):
+            await repo.find_by_question(title)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, (time.perf_counter() - start) * 1000)
+
+
+def get_stage_timings() -> Dict[str, float]:
+    """获取当前请求已记录的阶段耗时"""
+    return dict(_stage_timings.get() or {})
+
+
+def format_server_timing(timings: Dict[str, float]) -> str:
+    """
+    格式化为Server-Timing头
+
+    Args:
+        timings: 阶段耗时字典
+
+    Returns:
+        如 "cache;dur=0.2, db;dur=3.1, total;dur=5.0"
+    """
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
+
+
+class ServerTimingMiddleware:
+    """
+    请求耗时中间件（纯ASGI实现，开销低）
+
+    - 为每个请求创建阶段耗时记录
+    - 在响应头中输出 Server-Timing
+    - 请求结束后输出一条 key=value 结构的访问日志：慢请求（logging.slow_request_ms）和5xx总是输出，
+      其余请求经过采样
+
+    Args:
+        app: ASGI应用
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _stage_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header_timings = dict(timings)
+                header_timings["total"] = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", format_server_timing(header_timings))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _stage_timings.reset(token)
+            total_ms = (time.perf_counter() - start) * 1000
+            stages = " ".join(f"{name}={duration:.1f}" for name, duration in timings.items())
+            slow = total_ms >= settings.logging.slow_request_ms or status_code >= 500
+            (logger if slow else sampled_logger).info(
+                "access method={} path={} status={} total={:.1f} {}",
+                scope["method"], scope["path"], status_code, total_ms, stages
+            )
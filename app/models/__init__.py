@@ -1,2 +1,3 @@
 from .question import Question
 from .user import User
+from .stats import QueryStatsMinute, QuestionAccessStats
@@ -64,6 +64,7 @@ class QuestionRead(QuestionBase):
 
 class QuestionUpdate(SQLModel):
     """更新Question的请求模型"""
+    question: Optional[str] = Field(default=None, max_length=500)
     answer: Optional[str] = None
     options: Optional[str] = None
     type: Optional[str] = None
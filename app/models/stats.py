@@ -0,0 +1,73 @@
+"""流量统计数据模型 - SQLModel定义"""
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+
+
+class QueryStatsMinute(SQLModel, table=True):
+    """
+    分钟级查询统计汇总表
+
+    每个worker各自写入一行，读取时按 minute 合并。
+
+    Attributes:
+        id: 主键ID
+        minute: 统计分钟（UTC，整分钟）
+        worker: 写入的worker进程号
+        total: 查询总数
+        cache_hits: 缓存命中数
+        database_hits: 数据库命中数
+        ai_answers: AI回答数
+        pending: AI超时后转入后台完成数
+        misses: 未找到答案数
+        p50_ms: 延迟中位数（毫秒）
+        p95_ms: 延迟p95（毫秒）
+        ai_calls: AI调用次数
+        ai_errors: AI调用失败次数
+        errors: 查询异常次数
+    """
+    __tablename__ = "query_stats_minute"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    minute: datetime = Field(description="统计分钟")
+    worker: int = Field(default=0, description="worker进程号")
+    total: int = Field(default=0, description="查询总数")
+    cache_hits: int = Field(default=0, description="缓存命中数")
+    database_hits: int = Field(default=0, description="数据库命中数")
+    ai_answers: int = Field(default=0, description="AI回答数")
+    pending: int = Field(default=0, description="AI超时后转入后台完成数")
+    misses: int = Field(default=0, description="未找到答案数")
+    p50_ms: float = Field(default=0.0, description="延迟中位数（毫秒）")
+    p95_ms: float = Field(default=0.0, description="延迟p95（毫秒）")
+    ai_calls: int = Field(default=0, description="AI调用次数")
+    ai_errors: int = Field(default=0, description="AI调用失败次数")
+    errors: int = Field(default=0, description="查询异常次数")
+
+    __table_args__ = (
+        Index("idx_stats_minute", "minute"),
+    )
+
+
+class QuestionAccessStats(SQLModel, table=True):
+    """
+    题目访问统计表
+
+    由访问统计服务在内存中聚合后定时批量写入，不会每个请求写一次。
+
+    Attributes:
+        question_id: 题目ID（关联 question_answer.id）
+        cache_hits: 缓存命中次数
+        database_hits: 数据库命中次数
+        ai_hits: AI回答次数
+        total_hits: 总命中次数
+        last_hit_at: 最后访问时间
+    """
+    __tablename__ = "question_access_stats"
+
+    question_id: int = Field(primary_key=True, description="题目ID（question_answer.id）")
+    cache_hits: int = Field(default=0, description="缓存命中次数")
+    database_hits: int = Field(default=0, description="数据库命中次数")
+    ai_hits: int = Field(default=0, description="AI回答次数")
+    total_hits: int = Field(default=0, index=True, description="总命中次数")
+    last_hit_at: Optional[datetime] = Field(default=None, description="最后访问时间")
@@ -1,17 +1,41 @@
 """AI服务提供商基类 - 定义AI服务接口"""
 from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+def build_messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    构建OpenAI兼容格式的消息列表
+
+    系统消息放在最前面，同一模板的请求共享相同的前缀
+
+    Args:
+        prompt: 用户消息
+        system: 系统消息
+
+    Returns:
+        消息列表
+    """
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
 
 
 class BaseAIProvider(ABC):
     """AI服务提供商基类"""
 
     @abstractmethod
-    async def call(self, prompt: str) -> str:
+    async def call(
+        self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None, clamp: bool = True
+    ) -> str:
         """
         调用AI服务
 
         Args:
-            prompt: 提示词
+            prompt: 提示词（用户消息）
+            system: 系统消息，为空时只发送用户消息
+            max_tokens: 本次调用的输出token上限，为空时使用提供商配置
+            clamp: 是否把 max_tokens 限制在提供商配置的上限以内（批量请求为多道题预留输出时为False）
 
         Returns:
             AI返回的文本
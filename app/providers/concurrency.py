@@ -0,0 +1,321 @@
+"""AI提供商并发限制 - AIMD自适应并发上限和按截止时间排序的等待队列"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import httpx
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import AI_CONCURRENCY_LIMIT, AI_QUEUE_DEPTH, AI_QUEUE_REJECTED, AI_QUEUE_WAIT_SECONDS
+
+logger = get_logger(__name__)
+
+# 调用耗时的指数滑动平均系数
+LATENCY_ALPHA = 0.2
+
+# 单次调用耗时超过目标时的收缩比例（比429温和）
+SLOW_BACKOFF_RATIO = 0.9
+
+# 排队优先级：数值越小越先获得名额，预取等后台任务排在实时查询之后
+PRIORITY_LIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+
+class AIPriority:
+    """
+    一个AI任务的排队优先级，可以在排队期间提升
+
+    后台发起的AI任务被实时查询加入时提升为 PRIORITY_LIVE，已在排队的调用随之前移。
+    批量请求的优先级取批内各题的最高优先级
+
+    Args:
+        value: PRIORITY_LIVE 或 PRIORITY_BACKGROUND
+        members: 批内各题的优先级，不为空时忽略 value
+    """
+
+    __slots__ = ("_value", "members")
+
+    def __init__(self, value: int = PRIORITY_LIVE, members: Iterable["AIPriority"] = ()):
+        self._value = value
+        self.members = tuple(members)
+
+    @property
+    def value(self) -> int:
+        """当前优先级"""
+        if self.members:
+            return min(member.value for member in self.members)
+        return self._value
+
+    def promote(self) -> bool:
+        """
+        提升为实时优先级，并调整各提供商的排队顺序
+
+        Returns:
+            优先级发生变化时返回True
+        """
+        if self.value == PRIORITY_LIVE:
+            return False
+        self._value = PRIORITY_LIVE
+        for member in self.members:
+            member.promote()
+        for limiter in _limiters.values():
+            limiter.reprioritize()
+        return True
+
+
+_current_priority: ContextVar[Optional[AIPriority]] = ContextVar("ai_priority", default=None)
+
+
+def set_priority(priority: AIPriority) -> Token:
+    """
+    设置当前任务中AI调用的排队优先级
+
+    应在AI任务内部设置（之后创建的子任务共享同一个优先级对象），
+    不要在会发起其他任务的长期运行的上下文中设置，以免其他任务误继承
+
+    Args:
+        priority: 优先级
+
+    Returns:
+        用于恢复的令牌
+    """
+    return _current_priority.set(priority)
+
+
+def current_priority() -> AIPriority:
+    """
+    获取当前任务的排队优先级
+
+    Returns:
+        优先级，没有设置时为实时优先级
+    """
+    return _current_priority.get() or AIPriority()
+
+
+class ProviderOverloaded(Exception):
+    """
+    AI提供商过载，请求未能获得并发名额
+
+    Args:
+        provider: 提供商名称
+        reason: queue_full 排队已满 / deadline 无法在截止时间前完成
+    """
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"AI提供商 {provider} 过载（{reason}）")
+        self.provider = provider
+        self.reason = reason
+
+
+class AdaptiveLimiter:
+    """
+    自适应并发限制器（AIMD）
+
+    - 调用成功且耗时低于 latency_target 时，上限每轮约增加1（加性增）
+    - 遇到429或超时时上限乘以 backoff_ratio，耗时超过目标时乘以0.9（乘性减）；
+      同一轮调用内只收缩一次，避免一批并发的429把上限压到最低
+    - 没有名额时先按优先级、再按截止时间先后排队，预计来不及完成的请求直接拒绝，不再占用提供商额度
+
+    Args:
+        provider: 提供商名称
+    """
+
+    def __init__(self, provider: str):
+        config = settings.ai.limiter
+        self.provider = provider
+        self.limit = float(min(max(config.initial_limit, config.min_limit), config.max_limit))
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self._waiters: List[Tuple[int, float, int, asyncio.Future, AIPriority]] = []
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        AI_CONCURRENCY_LIMIT.labels(provider).set(self.limit)
+
+    @property
+    def capacity(self) -> int:
+        """当前可同时进行的调用数"""
+        return max(int(self.limit), 1)
+
+    def expected_wait(self, position: int) -> float:
+        """
+        估算排在第 position 位（从0开始）的请求需要等待的时间
+
+        Args:
+            position: 排队位置
+
+        Returns:
+            预计等待秒数（还没有耗时数据时为0）
+        """
+        if self.latency is None:
+            return 0.0
+        return (position + 1) * self.latency / self.capacity
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        占用一个并发名额执行一次调用，并按调用结果调整并发上限
+
+        Args:
+            deadline: 调用必须完成的时间点（time.monotonic()），为空时只受 max_queue_wait 限制
+
+        Raises:
+            ProviderOverloaded: 排队已满或无法在截止时间前完成
+        """
+        if not settings.ai.limiter.enabled:
+            yield
+            return
+
+        await self.acquire(deadline)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        except httpx.HTTPStatusError as e:
+            outcome = "throttled" if e.response.status_code == 429 else "error"
+            raise
+        except httpx.TimeoutException:
+            outcome = "throttled"
+            raise
+        finally:
+            self.release(time.perf_counter() - start, outcome)
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        """
+        获取并发名额，没有名额时排队等待
+
+        Args:
+            deadline: 调用必须完成的时间点（time.monotonic()）
+
+        Raises:
+            ProviderOverloaded: 排队已满或无法在截止时间前完成
+        """
+        config = settings.ai.limiter
+        now = time.monotonic()
+        if self.in_flight < self.capacity and not self._waiters:
+            self.in_flight += 1
+            AI_QUEUE_WAIT_SECONDS.labels(self.provider).observe(0)
+            return
+
+        if len(self._waiters) >= config.max_queue:
+            self._reject("queue_full")
+        priority_ref = current_priority()
+        priority = priority_ref.value
+        service_time = self.latency or 0.0
+        if deadline is not None:
+            ahead = sum(1 for waiter in self._waiters if waiter[0] <= priority)
+            if now + self.expected_wait(ahead) + service_time > deadline:
+                self._reject("deadline")
+
+        # 最晚开始时间：既不超过最长排队时间，也要留出完成调用的时间
+        start_by = now + config.max_queue_wait
+        if deadline is not None:
+            start_by = min(start_by, deadline - service_time)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (priority, deadline if deadline is not None else math.inf, next(self._seq), future, priority_ref),
+        )
+        depth = AI_QUEUE_DEPTH.labels(self.provider)
+        depth.inc()
+        try:
+            await asyncio.wait_for(future, timeout=max(start_by - now, 0))
+        except asyncio.TimeoutError:
+            self._reject("deadline")
+        except BaseException:
+            # 名额已分配但调用方被取消时归还名额
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(0.0, "cancelled")
+            raise
+        finally:
+            depth.dec()
+            AI_QUEUE_WAIT_SECONDS.labels(self.provider).observe(time.monotonic() - now)
+
+    def release(self, latency: float, outcome: str) -> None:
+        """
+        归还名额并调整并发上限
+
+        Args:
+            latency: 本次调用耗时（秒）
+            outcome: ok 成功 / throttled 429或超时 / error 其他错误 / cancelled 未实际调用
+        """
+        config = settings.ai.limiter
+        self.in_flight -= 1
+        now = time.monotonic()
+
+        if outcome in ("ok", "throttled"):
+            self.latency = latency if self.latency is None else (
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency
+            )
+
+        if outcome == "throttled":
+            self._decrease(now, config.backoff_ratio)
+        elif outcome == "ok":
+            if latency > config.latency_target:
+                self._decrease(now, SLOW_BACKOFF_RATIO)
+            else:
+                self.limit = min(self.limit + 1 / self.limit, float(config.max_limit))
+                AI_CONCURRENCY_LIMIT.labels(self.provider).set(self.limit)
+
+        self._wake(now)
+
+    def _decrease(self, now: float, ratio: float) -> None:
+        """乘性收缩并发上限（每个调用周期最多一次）"""
+        if now - self._last_decrease < (self.latency or 1.0):
+            return
+        previous = self.limit
+        self.limit = max(self.limit * ratio, float(settings.ai.limiter.min_limit))
+        self._last_decrease = now
+        AI_CONCURRENCY_LIMIT.labels(self.provider).set(self.limit)
+        if int(previous) != int(self.limit):
+            logger.warning(f"⚠️  AI提供商 {self.provider} 并发上限收缩: {previous:.1f} -> {self.limit:.1f}")
+
+    def _wake(self, now: float) -> None:
+        """按优先级和截止时间先后把空出的名额分给排队的请求，来不及完成的直接拒绝"""
+        service_time = self.latency or 0.0
+        while self._waiters and self.in_flight < self.capacity:
+            _, deadline, _, future, _ = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if now + service_time > deadline:
+                AI_QUEUE_REJECTED.labels(self.provider, "deadline").inc()
+                future.set_exception(ProviderOverloaded(self.provider, "deadline"))
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def reprioritize(self) -> None:
+        """按排队请求当前的优先级重新排序（有请求的优先级被提升后调用）"""
+        if any(waiter[0] != waiter[4].value for waiter in self._waiters):
+            self._waiters = [(ref.value, deadline, seq, future, ref) for _, deadline, seq, future, ref in self._waiters]
+            heapq.heapify(self._waiters)
+
+    def _reject(self, reason: str) -> None:
+        """拒绝请求"""
+        AI_QUEUE_REJECTED.labels(self.provider, reason).inc()
+        raise ProviderOverloaded(self.provider, reason)
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def get_limiter(provider: str) -> AdaptiveLimiter:
+    """
+    获取提供商的并发限制器（同一worker内共享）
+
+    Args:
+        provider: 提供商名称
+
+    Returns:
+        并发限制器
+    """
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        limiter = _limiters[provider] = AdaptiveLimiter(provider)
+    return limiter
@@ -1,8 +1,10 @@
 """Mock AI服务提供商 - 用于测试"""
+from typing import Optional
 from app.providers.base import BaseAIProvider
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
 
 
 class MockAIProvider(BaseAIProvider):
@@ -17,17 +19,22 @@ class MockAIProvider(BaseAIProvider):
         self.mock_response = mock_response
         logger.warning("🧪 使用Mock AI提供商（仅用于测试）")
 
-    async def call(self, prompt: str) -> str:
+    async def call(
+        self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None, clamp: bool = True
+    ) -> str:
         """
         模拟AI调用
 
         Args:
             prompt: 提示词（忽略）
+            system: 系统消息（忽略）
+            max_tokens: 输出token上限（忽略）
+            clamp: 是否限制输出token上限（忽略）
 
         Returns:
             模拟的响应
         """
-        logger.info(f"🧪 Mock AI调用: {prompt[:50]}...")
+        sampled_logger.info("Mock AI调用: {}", prompt[:50])
         return f'{{"answer": "{self.mock_response}"}}'
 
     def get_model_name(self) -> str:
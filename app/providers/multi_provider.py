@@ -1,13 +1,18 @@
 """通用AI服务提供商 - 支持多个AI平台"""
-import asyncio
-import json
-from typing import Optional
+import time
+from typing import Awaitable, Callable, Optional
 import httpx
-from app.providers.base import BaseAIProvider
+from app.providers.base import BaseAIProvider, build_messages
+from app.providers.concurrency import ProviderOverloaded, get_limiter
+from app.providers.retry import RetryPolicy, describe_error
+from app.providers.simulation import SIMULATION_URL, get_simulation_transport
+from app.providers.streaming import AnswerDetector, parse_sse_line
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.metrics import AI_ERRORS, AI_FIRST_ANSWER_SECONDS
 
 logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
 
 
 class UniversalAIProvider(BaseAIProvider):
@@ -45,18 +50,32 @@ class UniversalAIProvider(BaseAIProvider):
         self.max_retries = settings.ai.max_retries
         self.max_tokens = provider_config.max_tokens
         self.temperature = provider_config.temperature
+        self.stream = provider_config.stream
+        self.json_mode = provider_config.json_mode
+        # 模拟提供商：请求走完整的调用流程，响应由本地传输层生成
+        self.simulated = provider_config.type == "simulation"
+        self.transport = get_simulation_transport(provider_name) if self.simulated else None
+        if self.simulated and not self.api_url:
+            self.api_url = SIMULATION_URL
+        self.limiter = get_limiter(provider_name)
+        self.retry_policy = RetryPolicy(provider_name)
 
         if not self.config.enabled:
             logger.warning(f"⚠️  AI提供商 {provider_name} 未启用")
         else:
-            logger.info(f"✅ 初始化AI提供商: {self.config.name} ({self.model})")
+            sampled_logger.debug("初始化AI提供商: {} ({})", self.config.name, self.model)
 
-    async def call(self, prompt: str) -> str:
+    async def call(
+        self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None, clamp: bool = True
+    ) -> str:
         """
         异步调用AI服务
 
         Args:
-            prompt: 提示词
+            prompt: 提示词（用户消息）
+            system: 系统消息
+            max_tokens: 本次调用的输出token上限（clamp 为真时不超过提供商配置的 max_tokens）
+            clamp: 是否限制在提供商配置的 max_tokens 以内（批量请求为多道题预留输出时为False）
 
         Returns:
             AI返回的文本
@@ -65,34 +84,43 @@ class UniversalAIProvider(BaseAIProvider):
             logger.error(f"❌ AI提供商 {self.provider_name} 未启用")
             return ""
 
-        if not self.api_key or self.api_key == "" or self.api_key.startswith("YOUR_"):
+        if not self.simulated and (not self.api_key or self.api_key.startswith("YOUR_")):
             logger.error(f"❌ {self.provider_name} API密钥未配置")
             return ""
 
+        if not max_tokens:
+            max_tokens = self.max_tokens
+        elif clamp:
+            max_tokens = min(max_tokens, self.max_tokens)
+
         # Google Gemini使用不同的API格式
         if self.provider_name == "google":
-            return await self._call_google(prompt)
+            return await self._call_google(prompt, system, max_tokens)
 
         # OpenAI兼容格式 (SiliconFlow, Ali Bailian, Zhipu, OpenAI等)
-        return await self._call_openai_compatible(prompt)
+        return await self._call_openai_compatible(prompt, system, max_tokens)
 
-    async def _call_openai_compatible(self, prompt: str) -> str:
+    async def _call_openai_compatible(self, prompt: str, system: Optional[str], max_tokens: int) -> str:
         """
         调用OpenAI兼容格式的API
 
         Args:
-            prompt: 提示词
+            prompt: 用户消息
+            system: 系统消息
+            max_tokens: 输出token上限
 
         Returns:
             AI返回的文本
         """
         payload = {
             "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "stream": False,
-            "max_tokens": self.max_tokens,
+            "messages": build_messages(prompt, system),
+            "stream": self.stream,
+            "max_tokens": max_tokens,
             "temperature": self.temperature
         }
+        if self.json_mode:
+            payload["response_format"] = {"type": "json_object"}
 
         # 如果是火山引擎或其他支持推理的模型，可以考虑在未来加入 reasoning_effort 参数
         # 这里保持通用性，但解析时会检查推理内容
@@ -106,68 +134,109 @@ class UniversalAIProvider(BaseAIProvider):
         if self.provider_name == "ali_bailian":
             headers["Authorization"] = f"Bearer {self.api_key}"
 
-        retry_count = 0
-        last_error = None
-
-        while retry_count < self.max_retries:
-            try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    logger.info(f"📤 调用 {self.config.name} ({self.model}) (尝试 {retry_count + 1}/{self.max_retries})")
-                    response = await client.post(self.api_url, json=payload, headers=headers)
-                    response.raise_for_status()
-
-                    result = response.json()
-                    if "choices" in result and len(result["choices"]) > 0:
-                        choice = result["choices"][0]
-                        message = choice.get("message", {})
-                        
-                        # 提取内容
-                        content = message.get("content", "")
-                        # 提取推理内容 (火山引擎、DeepSeek等支持)
-                        reasoning = message.get("reasoning_content", "")
-                        
-                        if reasoning:
-                            logger.info(f"🧠 {self.config.name} 思考中: {reasoning[:100]}...")
-                        
-                        # 优先返回正式内容，如果内容为空则返回推理内容
-                        answer = content if content else reasoning
-                        
-                        if answer:
-                            logger.info(f"✅ {self.config.name} 调用成功")
-                            return answer
-                        else:
-                            logger.error(f"❌ API返回内容为空: {result}")
-                            return ""
+        start = time.perf_counter()
+
+        async def attempt(timeout: float, deadline: float) -> str:
+            async with self.limiter.slot(deadline), httpx.AsyncClient(timeout=timeout, transport=self.transport) as client:
+                sampled_logger.debug("调用 {} ({})", self.config.name, self.model)
+                if self.stream:
+                    return await self._read_stream(client, payload, headers, start)
+
+                response = await client.post(self.api_url, json=payload, headers=headers)
+                response.raise_for_status()
+
+                result = response.json()
+                if "choices" in result and len(result["choices"]) > 0:
+                    choice = result["choices"][0]
+                    message = choice.get("message", {})
+                    
+                    # 提取内容
+                    content = message.get("content", "")
+                    # 提取推理内容 (火山引擎、DeepSeek等支持)
+                    reasoning = message.get("reasoning_content", "")
+                    
+                    if reasoning:
+                        sampled_logger.debug("{} 思考中: {}", self.config.name, reasoning[:100])
+                    
+                    # 优先返回正式内容，如果内容为空则返回推理内容
+                    answer = content if content else reasoning
+                    
+                    if answer:
+                        sampled_logger.info("{} 调用成功", self.config.name)
+                        AI_FIRST_ANSWER_SECONDS.labels(self.provider_name, "full").observe(
+                            time.perf_counter() - start
+                        )
+                        return answer
                     else:
-                        logger.error(f"❌ API响应格式异常: {result}")
+                        logger.error(f"❌ API返回内容为空: {result}")
+                        AI_ERRORS.labels(self.provider_name, "empty_response").inc()
                         return ""
+                else:
+                    logger.error(f"❌ API响应格式异常: {result}")
+                    AI_ERRORS.labels(self.provider_name, "bad_response").inc()
+                    return ""
 
-            except httpx.TimeoutException:
-                last_error = "API请求超时"
-                logger.warning(f"⏱️  {last_error}")
-            except httpx.HTTPStatusError as e:
-                last_error = f"HTTP错误: {e.response.status_code}"
-                logger.warning(f"❌ {last_error}")
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"❌ API调用失败: {e}")
-
-            retry_count += 1
-            if retry_count < self.max_retries:
-                # 指数退避
-                wait_time = min(2 ** retry_count, 10)
-                logger.info(f"⏳ {wait_time}秒后重试...")
-                await asyncio.sleep(wait_time)
-
-        logger.error(f"❌ {self.config.name} 调用失败，已达最大重试次数")
-        return ""
+        return await self._run_with_retry(attempt)
+
+    async def _read_stream(self, client: httpx.AsyncClient, payload: dict, headers: dict, start: float) -> str:
+        """
+        读取SSE流式响应
+
+        逐段累积正文，一旦出现完整的JSON answer字段或推理结束后的 "答案：..." 行，
+        立即关闭连接并返回，不再等待模型输出剩余的解释文字
 
-    async def _call_google(self, prompt: str) -> str:
+        Args:
+            client: HTTP客户端
+            payload: 请求体（stream=True）
+            headers: 请求头
+            start: 本次调用的开始时间（perf_counter）
+
+        Returns:
+            AI返回的文本（提前结束时为答案片段）
+        """
+        detector = AnswerDetector()
+        reasoning_parts = []
+
+        async with client.stream("POST", self.api_url, json=payload, headers=headers) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                event = parse_sse_line(line)
+                if not event or not event.get("choices"):
+                    continue
+                delta = event["choices"][0].get("delta") or {}
+
+                reasoning = delta.get("reasoning_content")
+                if reasoning:
+                    reasoning_parts.append(reasoning)
+
+                answer = detector.feed(delta.get("content") or "")
+                if answer:
+                    # 退出 stream 上下文即关闭连接，服务端停止生成
+                    AI_FIRST_ANSWER_SECONDS.labels(self.provider_name, "early").observe(
+                        time.perf_counter() - start
+                    )
+                    sampled_logger.info("{} 流式调用成功（已提前结束）", self.config.name)
+                    return answer
+
+        # 流正常结束：与非流式一致，优先返回正式内容，为空时返回推理内容
+        answer = detector.text or "".join(reasoning_parts)
+        if not answer:
+            logger.error(f"❌ {self.config.name} 流式响应内容为空")
+            AI_ERRORS.labels(self.provider_name, "empty_response").inc()
+            return ""
+
+        AI_FIRST_ANSWER_SECONDS.labels(self.provider_name, "stream").observe(time.perf_counter() - start)
+        sampled_logger.info("{} 流式调用成功", self.config.name)
+        return answer
+
+    async def _call_google(self, prompt: str, system: Optional[str], max_tokens: int) -> str:
         """
         调用Google Gemini API
 
         Args:
-            prompt: 提示词
+            prompt: 用户消息
+            system: 系统消息
+            max_tokens: 输出token上限
 
         Returns:
             AI返回的文本
@@ -180,53 +249,61 @@ class UniversalAIProvider(BaseAIProvider):
             }],
             "generationConfig": {
                 "temperature": self.temperature,
-                "maxOutputTokens": self.max_tokens
+                "maxOutputTokens": max_tokens
             }
         }
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        if self.json_mode:
+            payload["generationConfig"]["responseMimeType"] = "application/json"
 
         # Google API URL需要包含API Key
         api_url_with_key = f"{self.api_url}?key={self.api_key}"
 
-        retry_count = 0
-        last_error = None
-
-        while retry_count < self.max_retries:
-            try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    logger.info(f"📤 调用 {self.config.name} (尝试 {retry_count + 1}/{self.max_retries})")
-                    response = await client.post(
-                        api_url_with_key,
-                        json=payload,
-                        headers={"Content-Type": "application/json"}
+        start = time.perf_counter()
+
+        async def attempt(timeout: float, deadline: float) -> str:
+            async with self.limiter.slot(deadline), httpx.AsyncClient(timeout=timeout, transport=self.transport) as client:
+                sampled_logger.debug("调用 {}", self.config.name)
+                response = await client.post(
+                    api_url_with_key,
+                    json=payload,
+                    headers={"Content-Type": "application/json"}
+                )
+                response.raise_for_status()
+
+                result = response.json()
+                if "candidates" in result and len(result["candidates"]) > 0:
+                    answer = result["candidates"][0]["content"]["parts"][0]["text"]
+                    sampled_logger.info("{} 调用成功", self.config.name)
+                    AI_FIRST_ANSWER_SECONDS.labels(self.provider_name, "full").observe(
+                        time.perf_counter() - start
                     )
-                    response.raise_for_status()
+                    return answer
+                else:
+                    logger.error(f"❌ API响应格式异常: {result}")
+                    AI_ERRORS.labels(self.provider_name, "bad_response").inc()
+                    return ""
 
-                    result = response.json()
-                    if "candidates" in result and len(result["candidates"]) > 0:
-                        answer = result["candidates"][0]["content"]["parts"][0]["text"]
-                        logger.info(f"✅ {self.config.name} 调用成功")
-                        return answer
-                    else:
-                        logger.error(f"❌ API响应格式异常: {result}")
-                        return ""
+        return await self._run_with_retry(attempt)
 
-            except httpx.TimeoutException:
-                last_error = "API请求超时"
-                logger.warning(f"⏱️  {last_error}")
-            except httpx.HTTPStatusError as e:
-                last_error = f"HTTP错误: {e.response.status_code}"
-                logger.warning(f"❌ {last_error}")
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"❌ API调用失败: {e}")
-
-            retry_count += 1
-            if retry_count < self.max_retries:
-                wait_time = min(2 ** retry_count, 10)
-                logger.info(f"⏳ {wait_time}秒后重试...")
-                await asyncio.sleep(wait_time)
-
-        logger.error(f"❌ {self.config.name} 调用失败，已达最大重试次数")
+    async def _run_with_retry(self, attempt: Callable[[float, float], Awaitable[str]]) -> str:
+        """
+        按统一的重试策略执行调用
+
+        Args:
+            attempt: 单次尝试，参数为 (本次超时秒数, 截止时间点)
+
+        Returns:
+            AI返回的文本，最终失败时返回空字符串
+        """
+        try:
+            return await self.retry_policy.run(attempt)
+        except ProviderOverloaded as e:
+            # 提供商已过载，重试只会加重排队
+            logger.warning(f"⚠️  {e}")
+        except Exception as e:
+            logger.error(f"❌ {self.config.name} 调用失败: {describe_error(e)}")
         return ""
 
     def get_model_name(self) -> str:
@@ -0,0 +1,213 @@
+"""AI调用重试策略 - 总截止时间、全抖动退避、Retry-After和错误分类"""
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+import httpx
+from app.core.config import settings
+from app.core.deadline import current_deadline
+from app.core.logger import get_logger
+from app.core.metrics import AI_ERRORS, AI_RETRIES, AI_RETRY_EXHAUSTED, classify_http_error
+from app.providers.concurrency import ProviderOverloaded
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# 可以重试的HTTP状态码（其余4xx如401/403/400重试也不会成功）
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# 剩余时间不足该值（秒）时不再发起新的尝试
+MIN_ATTEMPT_SECONDS = 0.5
+
+# 超时类错误：httpx按读写阶段计时，整次尝试的总时长由 asyncio.wait_for 兜底
+TIMEOUT_ERRORS = (httpx.TimeoutException, asyncio.TimeoutError)
+
+
+class RetryDeadlineExceeded(Exception):
+    """重试预算已用完"""
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    将异常归类为指标标签
+
+    Args:
+        error: 调用异常
+
+    Returns:
+        错误类别，如 timeout、http_429、http_5xx、connect
+    """
+    if isinstance(error, TIMEOUT_ERRORS):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return classify_http_error(error.response.status_code)
+    if isinstance(error, httpx.TransportError):
+        return "connect"
+    if isinstance(error, ProviderOverloaded):
+        return "overloaded"
+    return type(error).__name__
+
+
+def describe_error(error: BaseException) -> str:
+    """
+    生成便于阅读的错误描述
+
+    Args:
+        error: 调用异常
+
+    Returns:
+        错误描述
+    """
+    if isinstance(error, TIMEOUT_ERRORS):
+        return "API请求超时"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP错误: {error.response.status_code}"
+    return str(error) or type(error).__name__
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    判断错误是否值得重试
+
+    Args:
+        error: 调用异常
+
+    Returns:
+        超时、连接错误以及429/5xx等状态码返回True
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, TIMEOUT_ERRORS + (httpx.TransportError,))
+
+
+def parse_retry_after(error: BaseException) -> Optional[float]:
+    """
+    读取响应中的 Retry-After（秒数或HTTP日期）
+
+    Args:
+        error: 调用异常
+
+    Returns:
+        建议等待的秒数，没有时返回None
+    """
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    AI调用重试策略（所有提供商共用）
+
+    - 整个调用（含所有重试和等待）受总截止时间约束，每次尝试的超时不超过剩余时间
+    - 退避采用全抖动（0 ~ base*2^n 之间随机），服务端返回 Retry-After 时按其等待
+    - 只重试超时、连接错误和429/5xx等可恢复的错误，其余错误立即失败
+    - 剩余时间不够再等待并完成一次尝试时直接放弃
+
+    Args:
+        provider: 提供商名称（用于指标）
+        max_attempts: 最多尝试次数
+        attempt_timeout: 单次尝试的超时（秒）
+        total_timeout: 整个调用的时间预算（秒）
+        base_delay: 退避基数（秒）
+        max_delay: 单次退避上限（秒）
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_attempts: Optional[int] = None,
+        attempt_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ):
+        config = settings.ai
+        self.provider = provider
+        self.max_attempts = max(max_attempts or config.max_retries, 1)
+        self.attempt_timeout = attempt_timeout or config.timeout
+        # 默认预算容纳所有尝试各自用满单次超时，外加退避等待的余量
+        self.total_timeout = total_timeout or config.deadline or config.timeout * (config.max_retries + 1)
+        self.base_delay = config.retry_base_delay if base_delay is None else base_delay
+        self.max_delay = config.retry_max_delay if max_delay is None else max_delay
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        计算第 attempt 次失败后的等待时间
+
+        Args:
+            attempt: 已失败的次数（从1开始）
+            error: 本次失败的异常
+
+        Returns:
+            等待秒数
+        """
+        retry_after = parse_retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(
+        self,
+        attempt_fn: Callable[[float, float], Awaitable[T]],
+        deadline: Optional[float] = None,
+    ) -> T:
+        """
+        按策略执行调用
+
+        Args:
+            attempt_fn: 单次尝试，参数为 (本次超时秒数, 截止时间点 time.monotonic())
+            deadline: 调用方的截止时间点，与策略的时间预算取较早者；默认使用当前请求的截止时间
+
+        Returns:
+            attempt_fn 的返回值
+
+        Raises:
+            最后一次尝试的异常；时间预算不足以发起尝试时抛出 RetryDeadlineExceeded
+        """
+        start = time.monotonic()
+        deadline = min(start + self.total_timeout, deadline or current_deadline() or float("inf"))
+        attempt = 0
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining < MIN_ATTEMPT_SECONDS:
+                AI_RETRY_EXHAUSTED.labels(self.provider, "deadline").inc()
+                raise RetryDeadlineExceeded(f"剩余时间不足以发起AI调用（{max(remaining, 0):.1f}秒）")
+
+            attempt += 1
+            timeout = min(self.attempt_timeout, remaining)
+            try:
+                return await asyncio.wait_for(attempt_fn(timeout, deadline), timeout=timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_class = classify_error(e)
+                AI_ERRORS.labels(self.provider, error_class).inc()
+
+                if not is_retryable(e):
+                    AI_RETRY_EXHAUSTED.labels(self.provider, "fatal").inc()
+                    raise
+                if attempt >= self.max_attempts:
+                    AI_RETRY_EXHAUSTED.labels(self.provider, "attempts").inc()
+                    raise
+
+                wait_time = self.backoff(attempt, e)
+                if time.monotonic() + wait_time + MIN_ATTEMPT_SECONDS > deadline:
+                    AI_RETRY_EXHAUSTED.labels(self.provider, "deadline").inc()
+                    raise
+
+                AI_RETRIES.labels(self.provider, error_class).inc()
+                logger.info(f"⏳ {error_class}，{wait_time:.1f}秒后重试（第 {attempt + 1}/{self.max_attempts} 次）")
+                await asyncio.sleep(wait_time)
@@ -1,9 +1,8 @@
 """SiliconFlow AI服务提供商 - 使用httpx实现异步调用"""
-import asyncio
-import json
 from typing import Optional
 import httpx
-from app.providers.base import BaseAIProvider
+from app.providers.base import BaseAIProvider, build_messages
+from app.providers.retry import RetryPolicy, describe_error
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -32,22 +31,28 @@ class SiliconFlowProvider(BaseAIProvider):
         self.timeout = timeout
         self.max_retries = max_retries
         self.api_url = "https://api.siliconflow.cn/v1/chat/completions"
+        self.retry_policy = RetryPolicy("siliconflow", max_attempts=max_retries, attempt_timeout=timeout)
 
-    async def call(self, prompt: str) -> str:
+    async def call(
+        self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None, clamp: bool = True
+    ) -> str:
         """
         异步调用SiliconFlow API
 
         Args:
-            prompt: 提示词
+            prompt: 提示词（用户消息）
+            system: 系统消息
+            max_tokens: 输出token上限，默认512
+            clamp: 是否限制输出token上限（该提供商没有上限配置，忽略）
 
         Returns:
             AI返回的文本
         """
         payload = {
             "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": build_messages(prompt, system),
             "stream": False,
-            "max_tokens": 512,
+            "max_tokens": max_tokens or 512,
             "temperature": 0.1
         }
 
@@ -56,44 +61,26 @@ class SiliconFlowProvider(BaseAIProvider):
             "Content-Type": "application/json"
         }
 
-        retry_count = 0
-        last_error = None
-
-        while retry_count < self.max_retries:
-            try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    logger.info(f"📤 调用AI服务 (尝试 {retry_count + 1}/{self.max_retries})")
-                    response = await client.post(self.api_url, json=payload, headers=headers)
-                    response.raise_for_status()
-
-                    result = response.json()
-                    if "choices" in result and len(result["choices"]) > 0:
-                        answer = result["choices"][0]["message"]["content"]
-                        logger.info("✅ AI服务调用成功")
-                        return answer
-                    else:
-                        logger.error(f"❌ API响应格式异常: {result}")
-                        return ""
-
-            except httpx.TimeoutException:
-                last_error = "API请求超时"
-                logger.warning(f"⏱️ {last_error}")
-            except httpx.HTTPStatusError as e:
-                last_error = f"HTTP错误: {e.response.status_code}"
-                logger.warning(f"❌ {last_error}")
-            except Exception as e:
-                last_error = str(e)
-                logger.error(f"❌ API调用失败: {e}")
-
-            retry_count += 1
-            if retry_count < self.max_retries:
-                # 指数退避
-                wait_time = min(2 ** retry_count, 10)
-                logger.info(f"⏳ {wait_time}秒后重试...")
-                await asyncio.sleep(wait_time)
-
-        logger.error(f"❌ AI服务调用失败，已达最大重试次数")
-        return ""
+        async def attempt(timeout: float, deadline: float) -> str:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                logger.info("📤 调用AI服务")
+                response = await client.post(self.api_url, json=payload, headers=headers)
+                response.raise_for_status()
+
+                result = response.json()
+                if "choices" in result and len(result["choices"]) > 0:
+                    answer = result["choices"][0]["message"]["content"]
+                    logger.info("✅ AI服务调用成功")
+                    return answer
+                else:
+                    logger.error(f"❌ API响应格式异常: {result}")
+                    return ""
+
+        try:
+            return await self.retry_policy.run(attempt)
+        except Exception as e:
+            logger.error(f"❌ AI服务调用失败: {describe_error(e)}")
+            return ""
 
     def get_model_name(self) -> str:
         """
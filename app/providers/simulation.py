@@ -0,0 +1,218 @@
+"""模拟AI提供商 - 按配置的耗时分布和故障率生成响应，不访问网络
+
+以 httpx 传输层的形式接入 UniversalAIProvider，请求照常经过请求体构建、
+重试策略、并发限制器和流式解析，只是响应由本地生成，
+因此可以在没有网络的情况下测试和压测重试、超时、背压等机制。
+"""
+import asyncio
+import json
+import math
+import random
+import re
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+import httpx
+from app.core.config import SimulationConfig, settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
+
+# 用户消息中的题目行和选项行（由提示词模板渲染为 "问题：..." 和 "选项：..."）
+QUESTION_LINE = re.compile(r"^问题：(.+)$", re.MULTILINE)
+OPTIONS_LINE = re.compile(r"^选项：(.+)$", re.MULTILINE)
+
+# 模拟提供商未配置 api_url 时使用的地址（不会真正发出请求）
+SIMULATION_URL = "http://simulation.local/v1/chat/completions"
+
+# 流式响应每段的字符数
+STREAM_CHUNK_CHARS = 8
+
+# 无法解析的响应体（JSON被截断）
+MALFORMED_BODY = b'{"choices": [{"message": {"content": "{\\"answer\\": '
+
+_fixtures: Dict[str, Dict[str, str]] = {}
+
+
+def default_answer(user_message: str) -> str:
+    """
+    为题目生成确定的答案：有选项时返回第一个选项，否则返回"对"
+
+    Args:
+        user_message: 用户消息
+
+    Returns:
+        答案文本
+    """
+    match = OPTIONS_LINE.search(user_message)
+    if not match:
+        return "对"
+    return re.split(r"\s+(?=[A-Z][.、．])", match.group(1).strip())[0].strip()
+
+
+def load_fixtures(path: Optional[str]) -> Dict[str, str]:
+    """
+    加载答案夹具（同一文件只加载一次）
+
+    支持 {"题目": "答案"} 字典，或 [{"question": "题目", "answer": "答案"}] 列表
+
+    Args:
+        path: JSON文件路径
+
+    Returns:
+        题目到答案的映射，文件不存在或格式错误时为空
+    """
+    if not path:
+        return {}
+    if path not in _fixtures:
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            if isinstance(data, list):
+                data = {item["question"]: item["answer"] for item in data}
+            _fixtures[path] = {str(k): str(v) for k, v in data.items()}
+            logger.info(f"✅ 已加载模拟答案夹具: {path}（{len(_fixtures[path])} 道题）")
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"❌ 加载模拟答案夹具失败: {path}: {e}")
+            _fixtures[path] = {}
+    return _fixtures[path]
+
+
+class SimulationTransport(httpx.AsyncBaseTransport):
+    """
+    模拟AI服务商的 httpx 传输层
+
+    按 latency_distribution 抽样耗时，按配置的概率返回429/500、
+    一直不响应直到读超时、或返回截断的JSON；请求体 stream 为真时以SSE分段返回。
+    路径包含 generateContent 时按 Google Gemini 格式响应，否则按OpenAI兼容格式
+
+    Args:
+        config: 模拟参数
+    """
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.fixtures = load_fixtures(config.fixture_file)
+
+    def sample_latency(self) -> float:
+        """按配置的分布抽样一次响应耗时（秒）"""
+        config = self.config
+        mean, stddev = config.latency_mean, config.latency_stddev
+        distribution = config.latency_distribution.lower()
+        if distribution == "fixed" or mean <= 0:
+            latency = mean
+        elif distribution == "uniform":
+            latency = self.random.uniform(mean - stddev, mean + stddev)
+        elif distribution == "normal":
+            latency = self.random.gauss(mean, stddev)
+        else:
+            # 对数正态：由目标均值和标准差换算出底层正态分布的参数
+            sigma2 = math.log(1 + (stddev / mean) ** 2)
+            latency = self.random.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+        return max(latency, 0.0)
+
+    def answer(self, user_message: str) -> str:
+        """从夹具中查找答案，未收录时返回默认答案"""
+        match = QUESTION_LINE.search(user_message)
+        if match and match.group(1).strip() in self.fixtures:
+            return self.fixtures[match.group(1).strip()]
+        return default_answer(user_message)
+
+    def pick_fault(self) -> Optional[str]:
+        """按配置的概率抽取本次请求的故障类型"""
+        roll = self.random.random()
+        for fault, rate in (
+            ("429", self.config.error_429_rate),
+            ("500", self.config.error_500_rate),
+            ("timeout", self.config.timeout_rate),
+            ("malformed", self.config.malformed_rate),
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """生成一次模拟响应"""
+        body = json.loads(request.content or b"{}")
+        google = "generateContent" in request.url.path
+        if google:
+            user = body.get("contents", [{}])[-1].get("parts", [{}])[0].get("text", "")
+        else:
+            user = next((m["content"] for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+
+        latency = self.sample_latency()
+        fault = self.pick_fault()
+        sampled_logger.debug("模拟响应: 耗时 {:.2f}s 故障 {}", latency, fault)
+
+        if fault == "timeout":
+            read_timeout = (request.extensions.get("timeout") or {}).get("read") or settings.ai.timeout
+            await asyncio.sleep(read_timeout)
+            raise httpx.ReadTimeout("模拟请求超时", request=request)
+
+        if fault in ("429", "500"):
+            await asyncio.sleep(latency)
+            headers = {}
+            if fault == "429" and self.config.retry_after is not None:
+                headers["Retry-After"] = str(self.config.retry_after)
+            return httpx.Response(
+                int(fault), headers=headers, json={"error": {"message": f"simulated {fault}"}}, request=request,
+            )
+
+        if fault == "malformed":
+            await asyncio.sleep(latency)
+            return httpx.Response(
+                200, headers={"Content-Type": "application/json"}, content=MALFORMED_BODY, request=request,
+            )
+
+        content = json.dumps({"answer": self.answer(user)}, ensure_ascii=False)
+        if body.get("stream") and not google:
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "text/event-stream"},
+                content=self._stream(content, latency, body.get("model", "simulation")),
+                request=request,
+            )
+
+        await asyncio.sleep(latency)
+        if google:
+            return httpx.Response(
+                200, json={"candidates": [{"content": {"parts": [{"text": content}]}}]}, request=request,
+            )
+        return httpx.Response(200, json={
+            "model": body.get("model", "simulation"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }, request=request)
+
+    async def _stream(self, content: str, latency: float, model: str) -> AsyncIterator[bytes]:
+        """按首token耗时和总耗时分段输出SSE"""
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        first = min(self.config.ttft, latency)
+        await asyncio.sleep(first)
+        interval = (latency - first) / max(len(chunks) - 1, 1)
+        for index, chunk in enumerate(chunks):
+            if index:
+                await asyncio.sleep(interval)
+            event = {"model": model, "choices": [{"index": 0, "delta": {"content": chunk}}]}
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+
+_transports: Dict[str, SimulationTransport] = {}
+
+
+def get_simulation_transport(provider: str) -> SimulationTransport:
+    """
+    获取提供商的模拟传输层（同一worker内共享，随机序列连续）
+
+    Args:
+        provider: 提供商名称（settings.ai.providers 中的键）
+
+    Returns:
+        模拟传输层
+    """
+    transport = _transports.get(provider)
+    if transport is None:
+        config = settings.ai.providers[provider].simulation or SimulationConfig()
+        transport = _transports[provider] = SimulationTransport(config)
+    return transport
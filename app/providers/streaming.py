@@ -0,0 +1,89 @@
+"""流式响应解析 - SSE事件解析与答案完整性检测"""
+import json
+import re
+from typing import Optional
+
+# JSON格式的完整answer字段（右引号已出现）
+JSON_ANSWER_PATTERN = re.compile(r'"answer"\s*:\s*"((?:[^"\\]|\\.)+)"', re.IGNORECASE)
+
+# 推理结束后的最终答案行（必须以换行结束，避免截断未输出完的答案）
+ANSWER_LINE_PATTERN = re.compile(
+    r'^\s*(?:\*\*)?(?:最终答案|正确答案|答案|final answer)(?:\*\*)?[ \t]*[:：][ \t]*(.+?)\s*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# 部分模型把推理过程放在正文的 <think>...</think> 中
+THINK_END = "</think>"
+
+
+def parse_sse_line(line: str) -> Optional[dict]:
+    """
+    解析一行SSE数据
+
+    Args:
+        line: 原始行，如 'data: {...}'
+
+    Returns:
+        解析后的JSON对象；非数据行、[DONE] 或无法解析时返回None
+    """
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+class AnswerDetector:
+    """
+    增量答案检测器
+
+    每收到一段正文就调用 feed()，一旦能确定完整答案即返回答案片段，调用方可以提前关闭流：
+    - JSON中的 "answer": "..." 字段已完整输出（返回从JSON对象开头到answer字段结束的片段）
+    - 推理结束后出现以换行结尾的 "答案：..." 行
+    """
+
+    def __init__(self):
+        self.text = ""
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        追加一段正文并检测答案
+
+        Args:
+            chunk: 新收到的正文片段
+
+        Returns:
+            检测到的答案片段（可直接交给响应解析），未检测到返回None
+        """
+        if not chunk:
+            return None
+        self.text += chunk
+
+        # 只有可能结束一个答案的字符出现时才重新检测
+        if '"' not in chunk and "\n" not in chunk:
+            return None
+
+        body = self.text
+        think_end = body.rfind(THINK_END)
+        if "<think>" in body and think_end < 0:
+            # 仍在推理过程中
+            return None
+        if think_end >= 0:
+            body = body[think_end + len(THINK_END):]
+
+        match = JSON_ANSWER_PATTERN.search(body)
+        if match:
+            # 保留同一JSON对象中 answer 之前的字段（如分级回答的 confidence）
+            start = body.rfind("{", 0, match.start())
+            return body[start if start >= 0 else match.start():match.end()]
+
+        # 只检测已经以换行结束的完整行
+        complete = body[:body.rfind("\n") + 1]
+        match = ANSWER_LINE_PATTERN.search(complete)
+        if match:
+            return match.group(1)
+        return None
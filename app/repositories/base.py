@@ -102,3 +102,12 @@ class BaseRepository(Generic[ModelType]):
             logger.info(f"✅ 删除 {self.model.__name__}: {id}")
             return True
         return False
+
+    async def release(self) -> None:
+        """
+        结束当前的只读事务并把连接归还连接池
+
+        在长时间等待（如等待AI回答）前调用，避免一直占用连接，
+        以及SQLite的共享锁阻塞其他请求写入答案
+        """
+        await self.session.rollback()
@@ -0,0 +1,132 @@
+"""缓存失效广播 - 通过Redis发布/订阅让各worker的本地L1缓存保持一致"""
+import asyncio
+import json
+import uuid
+from typing import Optional
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.repositories.cache_keyspace import cache_keyspace
+from app.repositories.memory_cache import memory_cache
+
+logger = get_logger(__name__)
+
+INVALIDATION_CHANNEL = "qb:cache:invalidate"
+
+
+class CacheInvalidator:
+    """
+    L1缓存失效广播
+
+    - 删除/清空缓存时向频道发布消息，其他worker收到后清除本地L1中的对应条目
+    - 订阅连接断开期间可能漏掉消息，因此重新订阅成功后会清空整个L1
+    - sequence 在每次本地失效时递增，用于避免"读Redis期间发生失效、随后又把旧值写回L1"的竞态
+    """
+
+    def __init__(self):
+        self.instance_id = uuid.uuid4().hex
+        self.sequence = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Redis模式下才需要L1失效广播"""
+        return settings.cache.type.lower() == "redis" and settings.cache.l1_enabled
+
+    def message(self, op: str, key: Optional[str] = None) -> str:
+        """
+        构建失效消息
+
+        Args:
+            op: del 删除单个键 / clear 清空
+            key: 缓存键
+
+        Returns:
+            JSON字符串
+        """
+        return json.dumps({"src": self.instance_id, "op": op, "key": key}, ensure_ascii=False)
+
+    def invalidate_local(self, op: str, key: Optional[str] = None) -> None:
+        """
+        清除本地L1缓存
+
+        Args:
+            op: del / clear
+            key: 缓存键
+        """
+        self.sequence += 1
+        if op == "clear":
+            # 其他worker递增了代数，丢弃本地代数以便重新读取
+            cache_keyspace.reset()
+            memory_cache.clear()
+        elif key is not None:
+            memory_cache.delete(key)
+
+    def start(self) -> None:
+        """启动订阅任务"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """停止订阅任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _listen(self) -> None:
+        """订阅失效频道，断线后按指数退避重连"""
+        from app.core.redis import redis_manager
+
+        backoff = 1
+        while True:
+            pubsub = None
+            try:
+                redis = await redis_manager.get_redis()
+                if redis is None:
+                    raise ConnectionError("Redis不可用")
+
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # 断线期间可能漏掉失效消息，重新订阅后清空L1
+                self.invalidate_local("clear")
+                logger.info("✅ 已订阅缓存失效频道")
+                backoff = 1
+
+                async for message in pubsub.listen():
+                    self._handle(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️  缓存失效订阅中断: {e}，{backoff}秒后重连")
+                if redis_manager.healthy:
+                    redis_manager.report_failure(e)
+                # 无法接收失效消息时，L1可能变旧，直接清空
+                self.invalidate_local("clear")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def _handle(self, message: dict) -> None:
+        """处理一条失效消息"""
+        if message.get("type") != "message":
+            return
+        try:
+            data = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        if data.get("src") == self.instance_id:
+            return
+        self.invalidate_local(data.get("op", "del"), data.get("key"))
+
+
+# 全局失效广播实例
+cache_invalidator = CacheInvalidator()
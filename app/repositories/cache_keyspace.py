@@ -0,0 +1,306 @@
+"""缓存键空间 - 带命名空间和代数的缓存键、版本化的缓存条目编码、旧代键回收"""
+import asyncio
+import base64
+import hashlib
+import math
+import random
+import time
+import zlib
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "qb:v"
+GENERATION_KEY = "qb:gen"
+RECLAIM_LOCK_KEY = "qb:reclaim:lock"
+RECLAIM_LOCK_TTL = 60
+
+# 本地缓存的代数每隔多少秒从Redis重新读取一次（防止漏掉清空消息）
+GENERATION_REFRESH_SECONDS = 30
+
+# 缓存值编码格式：首字符为格式版本，第二个字符为编码方式
+# v1: "1" + 编码 + 正文
+# v2: "2" + 编码 + "{软过期时间戳},{重新计算耗时毫秒}|" + 正文
+PAYLOAD_VERSION = "2"
+ENCODING_RAW = "r"
+ENCODING_ZLIB = "z"
+
+
+def fingerprint(title: str) -> str:
+    """
+    计算问题文本的指纹
+
+    Args:
+        title: 问题文本
+
+    Returns:
+        32位十六进制指纹
+    """
+    return hashlib.blake2b(title.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CacheEntry:
+    """
+    缓存条目
+
+    Attributes:
+        value: 缓存值
+        soft_expires_at: 软过期时间戳，超过后仍可返回但需要刷新；0表示只有硬过期
+        delta: 重新计算该值的耗时（秒），用于提前刷新的概率计算
+    """
+
+    __slots__ = ("value", "soft_expires_at", "delta")
+
+    def __init__(self, value: str, soft_expires_at: float = 0.0, delta: float = 0.0):
+        self.value = value
+        self.soft_expires_at = soft_expires_at
+        self.delta = delta
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        """是否已超过软过期时间"""
+        return 0 < self.soft_expires_at <= (now or time.time())
+
+    def should_refresh(self, beta: float, now: Optional[float] = None) -> bool:
+        """
+        是否需要后台刷新
+
+        采用概率提前过期（XFetch）：越接近软过期、重新计算越慢，提前刷新的概率越大，
+        使同一批写入的热点键的刷新时间自然错开
+
+        Args:
+            beta: 提前刷新系数，0表示只在软过期后刷新
+            now: 当前时间戳
+
+        Returns:
+            需要刷新返回True
+        """
+        if self.soft_expires_at <= 0:
+            return False
+        now = now or time.time()
+        if beta <= 0 or self.delta <= 0:
+            return now >= self.soft_expires_at
+        return now - self.delta * beta * math.log(1.0 - random.random()) >= self.soft_expires_at
+
+
+def _compress(value: str) -> Tuple[str, str]:
+    """按需压缩，返回 (编码方式, 正文)"""
+    raw = value.encode("utf-8")
+    threshold = settings.cache.compress_min_bytes
+    if threshold > 0 and len(raw) >= threshold:
+        packed = base64.b85encode(zlib.compress(raw, 6)).decode("ascii")
+        if len(packed) < len(raw):
+            return ENCODING_ZLIB, packed
+    return ENCODING_RAW, value
+
+
+def _decompress(encoding: str, body: str) -> Optional[str]:
+    """解压正文，无法识别时返回None"""
+    if encoding == ENCODING_RAW:
+        return body
+    if encoding == ENCODING_ZLIB:
+        try:
+            return zlib.decompress(base64.b85decode(body)).decode("utf-8")
+        except (ValueError, zlib.error):
+            return None
+    return None
+
+
+def encode_entry(entry: CacheEntry) -> str:
+    """
+    编码缓存条目
+
+    较长的值使用zlib压缩（base85编码后仍比原文短时才压缩），以便存入decode_responses的Redis连接
+
+    Args:
+        entry: 缓存条目
+
+    Returns:
+        带版本号的编码字符串
+    """
+    encoding, body = _compress(entry.value)
+    return f"{PAYLOAD_VERSION}{encoding}{int(entry.soft_expires_at)},{int(entry.delta * 1000)}|{body}"
+
+
+def decode_entry(payload: Optional[str]) -> Optional[CacheEntry]:
+    """
+    解码缓存条目
+
+    兼容旧版本格式（v1没有软过期信息，只按Redis TTL过期）；
+    无法识别的格式视为未命中，不抛出异常
+
+    Args:
+        payload: Redis中存储的字符串
+
+    Returns:
+        缓存条目或None
+    """
+    if not payload or len(payload) < 2:
+        return None
+    version, encoding = payload[0], payload[1]
+
+    if version == "1":
+        value = _decompress(encoding, payload[2:])
+        return CacheEntry(value) if value is not None else None
+
+    if version == "2":
+        header, sep, body = payload[2:].partition("|")
+        soft, _, delta_ms = header.partition(",")
+        if not sep or not soft.isdigit() or not delta_ms.isdigit():
+            return None
+        value = _decompress(encoding, body)
+        if value is None:
+            return None
+        return CacheEntry(value, float(soft), int(delta_ms) / 1000)
+
+    return None
+
+
+class CacheKeyspace:
+    """
+    缓存键空间
+
+    缓存键格式为 qb:v{代数}:{指纹}。清空缓存时递增Redis中的代数，
+    旧代的键立即失效，由后台任务用SCAN分批回收，不再使用FLUSHDB。
+    """
+
+    def __init__(self):
+        self.generation: Optional[int] = None
+        self._loaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._reclaim_event: Optional[asyncio.Event] = None
+
+    def key(self, title: str, generation: Optional[int] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            title: 问题文本
+            generation: 代数，默认使用当前代数
+
+        Returns:
+            缓存键
+        """
+        if generation is None:
+            generation = self.generation or 0
+        return f"{KEY_PREFIX}{generation}:{fingerprint(title)}"
+
+    async def load(self, redis) -> int:
+        """
+        读取当前代数（本地缓存，定期刷新）
+
+        Args:
+            redis: Redis客户端
+
+        Returns:
+            当前代数
+        """
+        now = time.monotonic()
+        if self.generation is None or now - self._loaded_at > GENERATION_REFRESH_SECONDS:
+            value = await redis.get(GENERATION_KEY)
+            self.generation = int(value) if value else 0
+            self._loaded_at = now
+        return self.generation
+
+    async def bump(self, redis) -> int:
+        """
+        递增代数，使所有旧键失效
+
+        Args:
+            redis: Redis客户端
+
+        Returns:
+            新代数
+        """
+        self.generation = int(await redis.incr(GENERATION_KEY))
+        self._loaded_at = time.monotonic()
+        self.request_reclaim()
+        return self.generation
+
+    def reset(self) -> None:
+        """丢弃本地缓存的代数，下次使用时重新读取"""
+        self.generation = None
+
+    def request_reclaim(self) -> None:
+        """尽快执行一次旧代键回收"""
+        if self._reclaim_event is not None:
+            self._reclaim_event.set()
+
+    def start(self) -> None:
+        """启动旧代键回收任务（仅Redis模式）"""
+        if settings.cache.type.lower() != "redis" or settings.cache.reclaim_interval <= 0:
+            return
+        if self._task is None:
+            self._reclaim_event = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止回收任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._reclaim_event = None
+
+    async def _run(self) -> None:
+        """后台循环：定时或清空缓存后回收旧代键"""
+        while True:
+            try:
+                await asyncio.wait_for(self._reclaim_event.wait(), timeout=settings.cache.reclaim_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._reclaim_event.clear()
+            try:
+                await self.reclaim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️  旧缓存回收失败: {e}")
+
+    async def reclaim(self, batch_size: int = 500) -> int:
+        """
+        扫描并删除非当前代的缓存键
+
+        多个worker通过锁保证同一时间只有一个在扫描；锁不主动释放，
+        到期前其他worker的定时回收直接跳过，避免重复扫描整个键空间
+
+        Args:
+            batch_size: 每次SCAN和删除的键数量
+
+        Returns:
+            删除的键数量
+        """
+        from app.core.redis import redis_manager
+
+        redis = await redis_manager.get_redis()
+        if redis is None:
+            return 0
+        if not await redis.set(RECLAIM_LOCK_KEY, "1", nx=True, ex=RECLAIM_LOCK_TTL):
+            return 0
+
+        self.reset()
+        current = f"{KEY_PREFIX}{await self.load(redis)}:"
+        removed = 0
+        stale = []
+        async for key in redis.scan_iter(match=f"{KEY_PREFIX}*", count=batch_size):
+            if not key.startswith(current):
+                stale.append(key)
+            if len(stale) >= batch_size:
+                removed += await redis.unlink(*stale)
+                stale = []
+                await asyncio.sleep(0)
+        if stale:
+            removed += await redis.unlink(*stale)
+
+        if removed:
+            logger.info(f"🧹 已回收旧代缓存键: {removed} 个")
+        return removed
+
+
+# 全局缓存键空间实例
+cache_keyspace = CacheKeyspace()
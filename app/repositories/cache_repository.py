@@ -1,7 +1,12 @@
 """缓存仓储 - 支持内存和Redis缓存"""
-from typing import Optional
+import random
+import time
+from typing import Dict, Optional, Tuple
 from app.core.config import settings
 from app.core.redis import redis_manager
+from app.repositories.cache_invalidator import INVALIDATION_CHANNEL, cache_invalidator
+from app.repositories.cache_keyspace import CacheEntry, cache_keyspace, decode_entry, encode_entry
+from app.repositories.memory_cache import memory_cache
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -11,20 +16,71 @@ class CacheRepository:
     """
     缓存仓储 - 支持内存和Redis
 
-    根据配置自动选择缓存后端
+    根据配置自动选择缓存后端；内存缓存在同一worker的所有请求之间共享。
+    Redis模式下内存缓存作为L1：读取先查L1，未命中再查Redis并回填L1；
+    删除/清空时通过发布/订阅通知其他worker清除各自的L1。
+
+    调用方传入的键（问题文本）会转换为 qb:v{代数}:{指纹} 形式的缓存键，
+    Redis中的值带格式版本号并按需压缩，清空缓存时只递增代数而不执行FLUSHDB。
+
+    每个条目有软过期和硬过期：ttl 之后条目变旧但仍可返回（由调用方安排后台刷新），
+    ttl + stale_ttl 之后才真正删除。
     """
 
     def __init__(self):
-        self._memory_cache: dict = {}
+        self._memory_cache = memory_cache
         self._cache_type = settings.cache.type.lower()
         self._ttl = settings.cache.ttl
-        self._redis = None
+        self._l1_enabled = settings.cache.l1_enabled
+        self._l1_ttl = settings.cache.l1_ttl
+        self._stale_ttl = max(0, settings.cache.stale_ttl)
+        self._jitter = settings.cache.ttl_jitter
+
+    def _l1_ttl_for(self, ttl: int) -> int:
+        """L1条目的存活时间不超过Redis中的TTL"""
+        return min(ttl, self._l1_ttl) if self._l1_ttl > 0 else ttl
+
+    def _new_entry(self, value: str, ttl: int, cost: float = 0.0) -> Tuple[CacheEntry, int]:
+        """
+        创建缓存条目
+
+        软过期时间随机提前最多 ttl_jitter 比例，避免同一批写入的键同时变旧
+
+        Args:
+            value: 缓存值
+            ttl: 软过期时间（秒）
+            cost: 重新计算该值的耗时（秒）
+
+        Returns:
+            (缓存条目, 硬过期TTL秒数)
+        """
+        soft_ttl = ttl * (1 - self._jitter * random.random()) if self._jitter > 0 else ttl
+        return CacheEntry(value, time.time() + soft_ttl, cost), ttl + self._stale_ttl
 
     async def _get_redis(self):
-        """获取Redis客户端"""
-        if self._cache_type == "redis" and self._redis is None:
-            self._redis = await redis_manager.get_redis()
-        return self._redis
+        """获取Redis客户端（Redis不可用时返回None，由连接管理器在后台重连）"""
+        if self._cache_type != "redis":
+            return None
+        return await redis_manager.get_redis()
+
+    async def _prepare(self):
+        """
+        Redis模式下获取客户端并刷新当前代数
+
+        Returns:
+            Redis客户端，内存模式或Redis不可用时返回None
+        """
+        if self._cache_type != "redis":
+            return None
+        try:
+            redis = await self._get_redis()
+            if redis:
+                await cache_keyspace.load(redis)
+            return redis
+        except Exception as e:
+            logger.warning(f"⚠️  Redis连接失败: {e}，降级到内存缓存")
+            redis_manager.report_failure(e)
+            return None
 
     async def get(self, key: str) -> Optional[str]:
         """
@@ -34,27 +90,51 @@ class CacheRepository:
             key: 缓存键
 
         Returns:
-            缓存值或None
+            缓存值或None（已变旧但未硬过期的值也会返回）
         """
-        if self._cache_type == "redis":
-            try:
-                redis = await self._get_redis()
-                if redis:
-                    value = await redis.get(key)
-                    if value:
-                        logger.debug(f"✅ Redis缓存命中: {key[:50]}...")
-                    return value
-            except Exception as e:
-                logger.warning(f"⚠️  Redis读取失败: {e}，降级到内存缓存")
+        entry = await self.get_entry(key)
+        return entry.value if entry is not None else None
 
-        # 内存缓存（或Redis失败时的降级方案）
-        return self._memory_cache.get(key)
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """
+        获取缓存条目（含软过期信息）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存条目或None
+        """
+        redis = await self._prepare()
+        cache_key = cache_keyspace.key(key)
+
+        # 内存缓存 / Redis模式下的L1（Redis失败时也作为降级方案）
+        # L1中的条目已变旧时再查一次Redis，其他worker可能已经刷新
+        local = self._memory_cache.get(cache_key)
+        if redis is None or (local is not None and not local.is_stale()):
+            return local
+
+        try:
+            # 读取期间若发生失效，则不回填L1，避免把旧值写回
+            sequence = cache_invalidator.sequence
+            entry = decode_entry(await redis.get(cache_key))
+            if entry is not None:
+                logger.debug("Redis缓存命中: {}", key[:50])
+                if self._l1_enabled and cache_invalidator.sequence == sequence:
+                    self._memory_cache.set(cache_key, entry, self._l1_ttl_for(self._ttl))
+                return entry
+        except Exception as e:
+            logger.warning(f"⚠️  Redis读取失败: {e}，降级到内存缓存")
+            redis_manager.report_failure(e)
+
+        return local
 
     async def set(
         self,
         key: str,
         value: str,
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        cost: float = 0.0
     ) -> bool:
         """
         设置缓存
@@ -62,28 +142,69 @@ class CacheRepository:
         Args:
             key: 缓存键
             value: 缓存值
-            ttl: 过期时间（秒）
+            ttl: 软过期时间（秒）
+            cost: 重新计算该值的耗时（秒），越大越早开始后台刷新
 
         Returns:
             成功返回True
         """
-        ttl = ttl or self._ttl
+        entry, hard_ttl = self._new_entry(value, ttl or self._ttl, cost)
+        redis = await self._prepare()
+        cache_key = cache_keyspace.key(key)
 
-        if self._cache_type == "redis":
+        if redis is not None:
             try:
-                redis = await self._get_redis()
-                if redis:
-                    await redis.setex(key, ttl, value)
-                    logger.debug(f"📝 Redis缓存已设置: {key[:50]}...")
-                    # 同时设置内存缓存作为备份
-                    self._memory_cache[key] = value
-                    return True
+                await redis.setex(cache_key, hard_ttl, encode_entry(entry))
+                logger.debug("Redis缓存已设置: {}", key[:50])
+                if self._l1_enabled:
+                    self._memory_cache.set(cache_key, entry, self._l1_ttl_for(hard_ttl))
+                return True
             except Exception as e:
                 logger.warning(f"⚠️  Redis写入失败: {e}，使用内存缓存")
+                redis_manager.report_failure(e)
 
         # 内存缓存
-        self._memory_cache[key] = value
-        logger.debug(f"📝 内存缓存已设置: {key[:50]}...")
+        self._memory_cache.set(cache_key, entry, hard_ttl)
+        logger.debug("内存缓存已设置: {}", key[:50])
+        return True
+
+    async def set_many(
+        self,
+        items: Dict[str, str],
+        ttl: Optional[int] = None
+    ) -> bool:
+        """
+        批量设置缓存（Redis模式下使用pipeline一次往返写入）
+
+        Args:
+            items: 键值对
+            ttl: 软过期时间（秒）
+
+        Returns:
+            成功返回True
+        """
+        if not items:
+            return True
+
+        ttl = ttl or self._ttl
+        hard_ttl = ttl + self._stale_ttl
+        redis = await self._prepare()
+        keyed = {cache_keyspace.key(key): self._new_entry(value, ttl)[0] for key, value in items.items()}
+
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for cache_key, entry in keyed.items():
+                        pipe.setex(cache_key, hard_ttl, encode_entry(entry))
+                    await pipe.execute()
+                if self._l1_enabled:
+                    self._memory_cache.set_many(keyed, self._l1_ttl_for(hard_ttl))
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️  Redis批量写入失败: {e}，使用内存缓存")
+                redis_manager.report_failure(e)
+
+        self._memory_cache.set_many(keyed, hard_ttl)
         return True
 
     async def delete(self, key: str) -> bool:
@@ -97,23 +218,27 @@ class CacheRepository:
             成功返回True
         """
         success = False
+        redis = await self._prepare()
+        cache_key = cache_keyspace.key(key)
 
-        if self._cache_type == "redis":
+        if redis is not None:
             try:
-                redis = await self._get_redis()
-                if redis:
-                    result = await redis.delete(key)
-                    if result:
-                        logger.debug(f"🗑️  Redis缓存已删除: {key[:50]}...")
-                        success = True
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.delete(cache_key)
+                    pipe.publish(INVALIDATION_CHANNEL, cache_invalidator.message("del", cache_key))
+                    result, _ = await pipe.execute()
+                if result:
+                    logger.debug("Redis缓存已删除: {}", key[:50])
+                    success = True
             except Exception as e:
                 logger.warning(f"⚠️  Redis删除失败: {e}")
+                redis_manager.report_failure(e)
 
         # 同时删除内存缓存
-        if key in self._memory_cache:
-            del self._memory_cache[key]
-            logger.debug(f"🗑️  内存缓存已删除: {key[:50]}...")
+        if self._memory_cache.get(cache_key) is not None:
+            logger.debug("内存缓存已删除: {}", key[:50])
             success = True
+        cache_invalidator.invalidate_local("del", cache_key)
 
         return success
 
@@ -121,23 +246,27 @@ class CacheRepository:
         """
         清空所有缓存
 
+        Redis模式下递增代数使旧键全部失效（旧键由后台任务回收），
+        不影响同一Redis库中的其他数据
+
         Returns:
             成功返回True
         """
         success = False
+        redis = await self._prepare()
 
-        if self._cache_type == "redis":
+        if redis is not None:
             try:
-                redis = await self._get_redis()
-                if redis:
-                    await redis.flushdb()
-                    logger.info("🧹 Redis缓存已清空")
-                    success = True
+                generation = await cache_keyspace.bump(redis)
+                await redis.publish(INVALIDATION_CHANNEL, cache_invalidator.message("clear"))
+                logger.info(f"🧹 Redis缓存已清空（代数 {generation}）")
+                success = True
             except Exception as e:
                 logger.warning(f"⚠️  Redis清空失败: {e}")
+                redis_manager.report_failure(e)
 
         # 清空内存缓存
-        self._memory_cache.clear()
+        cache_invalidator.invalidate_local("clear")
         logger.info("🧹 内存缓存已清空")
         success = True
 
@@ -153,15 +282,17 @@ class CacheRepository:
         Returns:
             存在返回True
         """
-        if self._cache_type == "redis":
+        redis = await self._prepare()
+        cache_key = cache_keyspace.key(key)
+
+        if redis is not None:
             try:
-                redis = await self._get_redis()
-                if redis:
-                    return await redis.exists(key) > 0
+                return await redis.exists(cache_key) > 0
             except Exception as e:
                 logger.warning(f"⚠️  Redis检查失败: {e}")
+                redis_manager.report_failure(e)
 
-        return key in self._memory_cache
+        return cache_key in self._memory_cache
 
     async def expire(self, key: str, ttl: int) -> bool:
         """
@@ -174,14 +305,17 @@ class CacheRepository:
         Returns:
             成功返回True
         """
-        if self._cache_type == "redis":
+        redis = await self._prepare()
+        cache_key = cache_keyspace.key(key)
+
+        if redis is not None:
             try:
-                redis = await self._get_redis()
-                if redis and await redis.exists(key):
-                    await redis.expire(key, ttl)
+                if await redis.expire(cache_key, ttl):
+                    if self._l1_enabled:
+                        self._memory_cache.expire(cache_key, self._l1_ttl_for(ttl))
                     return True
             except Exception as e:
                 logger.warning(f"⚠️  Redis设置过期时间失败: {e}")
+                redis_manager.report_failure(e)
 
-        # 内存缓存暂不支持TTL，返回True避免阻塞
-        return True
+        return self._memory_cache.expire(cache_key, ttl)
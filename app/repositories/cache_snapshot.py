@@ -0,0 +1,219 @@
+"""缓存快照 - 将进程内缓存定期写入磁盘，重启后在后台分批加载"""
+import asyncio
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.repositories.cache_keyspace import CacheEntry
+from app.repositories.memory_cache import memory_cache
+
+logger = get_logger(__name__)
+
+# 文件格式：文件头 + 若干条记录
+# 文件头: 魔数(4字节) + 格式版本(uint16) + 记录数(uint32)
+# 记录:   键长度(uint16) + 值长度(uint32) + 硬过期时间(double) + 软过期时间(double) + 重新计算耗时(float)
+#         + 键(UTF-8) + 值(UTF-8)
+SNAPSHOT_MAGIC = b"QBCS"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<HIddf")
+
+# 加载时每处理多少条记录让出一次事件循环
+LOAD_BATCH_SIZE = 1000
+
+Record = Tuple[str, CacheEntry, float]
+
+
+def pack_snapshot(records: List[Record]) -> bytes:
+    """
+    序列化快照
+
+    Args:
+        records: (键, 缓存条目, 硬过期时间戳) 列表
+
+    Returns:
+        快照文件内容
+    """
+    parts = [HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(records))]
+    for key, entry, expires_at in records:
+        key_bytes = key.encode("utf-8")
+        value_bytes = entry.value.encode("utf-8")
+        parts.append(RECORD.pack(len(key_bytes), len(value_bytes), expires_at, entry.soft_expires_at, entry.delta))
+        parts.append(key_bytes)
+        parts.append(value_bytes)
+    return b"".join(parts)
+
+
+def write_snapshot(path: Path, data: bytes) -> None:
+    """先写临时文件再原子替换，避免进程中途退出留下半个文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CacheSnapshot:
+    """
+    进程内缓存快照
+
+    仅在内存缓存模式下启用（Redis模式下数据本身在Redis中，L1条目存活时间很短）。
+    启动后在后台分批加载快照，不阻塞应用启动，加载期间未命中的查询照常回源数据库；
+    运行中每隔 cache.snapshot_interval 秒（缓存有变化时）以及关闭时写入快照。
+    """
+
+    def __init__(self):
+        self.loaded = 0
+        self.saved = 0
+        self._saved_version: Optional[int] = None
+        self._load_finished = False
+        self._load_task: Optional[asyncio.Task] = None
+        self._save_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用快照"""
+        return settings.cache.type.lower() == "memory" and settings.cache.snapshot_enabled
+
+    @property
+    def path(self) -> Path:
+        """快照文件路径"""
+        return Path(settings.cache.snapshot_file)
+
+    def start(self) -> None:
+        """启动后台加载和定时保存任务"""
+        if not self.enabled or self._load_task is not None:
+            return
+        self._load_task = asyncio.create_task(self.load())
+        if settings.cache.snapshot_interval > 0:
+            self._save_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写入最终快照"""
+        if not self.enabled:
+            return
+        for task in (self._load_task, self._save_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._load_task = None
+        self._save_task = None
+        # 快照尚未加载完就关闭时不覆盖，否则未加载的条目会丢失
+        if self._load_finished:
+            await self.save()
+
+    async def _run(self) -> None:
+        """定时保存快照"""
+        while True:
+            await asyncio.sleep(settings.cache.snapshot_interval)
+            await self.save()
+
+    async def save(self) -> int:
+        """
+        写入快照（缓存自上次保存后没有变化时跳过）
+
+        Returns:
+            写入的条目数
+        """
+        version = memory_cache.version
+        if not self._load_finished or version == self._saved_version:
+            return 0
+
+        # 在事件循环中复制条目，序列化和写文件放到线程中执行
+        records = [
+            (key, entry, expires_at)
+            for key, entry, expires_at in memory_cache.items()
+            if isinstance(entry, CacheEntry)
+        ]
+        start = time.perf_counter()
+        try:
+            data = await asyncio.to_thread(pack_snapshot, records)
+            await asyncio.to_thread(write_snapshot, self.path, data)
+        except Exception as e:
+            logger.warning(f"⚠️  缓存快照写入失败: {e}")
+            return 0
+
+        self._saved_version = version
+        self.saved = len(records)
+        logger.info(
+            f"💾 缓存快照已保存: {len(records)} 条，{len(data) / 1024:.1f} KB，"
+            f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return len(records)
+
+    async def load(self) -> int:
+        """
+        从快照分批加载未过期的条目（不覆盖启动后已写入的条目）
+
+        Returns:
+            加载的条目数
+        """
+        path = self.path
+        if not path.exists() or path.stat().st_size < HEADER.size:
+            self._load_finished = True
+            return 0
+
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                magic, version, count = HEADER.unpack_from(view, 0)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    logger.warning(f"⚠️  缓存快照格式不支持，已忽略: {path}")
+                    self._load_finished = True
+                    return 0
+                await self._load_records(view, count)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 损坏的快照允许被下一次保存覆盖
+            logger.warning(f"⚠️  缓存快照加载失败: {e}")
+            self._load_finished = True
+            return self.loaded
+
+        self._load_finished = True
+
+        logger.info(
+            f"💾 缓存快照已加载: {self.loaded} 条，耗时 {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return self.loaded
+
+    async def _load_records(self, view: mmap.mmap, count: int) -> None:
+        """逐条解析记录，每批让出一次事件循环"""
+        offset = HEADER.size
+        size = len(view)
+        now = time.time()
+
+        for index in range(count):
+            if offset + RECORD.size > size:
+                raise ValueError(f"快照文件不完整（第 {index} 条记录）")
+            key_len, value_len, expires_at, soft_expires_at, delta = RECORD.unpack_from(view, offset)
+            offset += RECORD.size
+            end = offset + key_len + value_len
+            if end > size:
+                raise ValueError(f"快照文件不完整（第 {index} 条记录）")
+
+            if not expires_at or expires_at > now:
+                key = view[offset:offset + key_len].decode("utf-8")
+                if memory_cache.get(key) is None:
+                    value = view[offset + key_len:end].decode("utf-8")
+                    ttl = expires_at - now if expires_at else None
+                    memory_cache.set(key, CacheEntry(value, soft_expires_at, delta), ttl)
+                    self.loaded += 1
+            offset = end
+
+            if (index + 1) % LOAD_BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+                now = time.time()
+
+
+# 全局缓存快照实例
+cache_snapshot = CacheSnapshot()
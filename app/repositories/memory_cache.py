@@ -0,0 +1,129 @@
+"""进程内缓存 - 带TTL的有界LRU缓存，在同一worker的所有请求之间共享"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+from app.core.config import settings
+
+
+class MemoryCache:
+    """
+    进程内LRU缓存
+
+    超出容量时淘汰最久未访问的条目，过期条目在读取时惰性删除。
+    version 在每次写入/删除/清空时递增，便于快照等判断内容是否变化。
+
+    Args:
+        max_entries: 最大条目数
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.version = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        获取缓存值
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，不存在或已过期返回None
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """
+        设置缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），None或0表示不过期
+        """
+        expires_at = time.time() + ttl if ttl else 0.0
+        self.version += 1
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """
+        批量设置缓存值
+
+        Args:
+            items: 键值对
+            ttl: 过期时间（秒）
+        """
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        """
+        删除缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            存在并删除返回True
+        """
+        if self._data.pop(key, None) is None:
+            return False
+        self.version += 1
+        return True
+
+    def expire(self, key: str, ttl: int) -> bool:
+        """
+        重新设置过期时间
+
+        Args:
+            key: 缓存键
+            ttl: 过期时间（秒）
+
+        Returns:
+            键存在返回True
+        """
+        value = self.get(key)
+        if value is None:
+            return False
+        self.version += 1
+        self._data[key] = (value, time.time() + ttl)
+        return True
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self.version += 1
+        self._data.clear()
+
+    def items(self) -> Iterator[Tuple[str, Any, float]]:
+        """
+        遍历未过期的条目
+
+        Yields:
+            (键, 值, 过期时间戳)，过期时间为0表示不过期
+        """
+        now = time.time()
+        for key, (value, expires_at) in list(self._data.items()):
+            if not expires_at or expires_at > now:
+                yield key, value, expires_at
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# 全局进程内缓存实例
+memory_cache = MemoryCache(settings.cache.max_entries)
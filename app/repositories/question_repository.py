@@ -1,8 +1,10 @@
 """Question仓储 - 封装题库数据访问逻辑"""
-from typing import Optional
+from typing import List, Optional, Tuple
+from sqlalchemy import delete
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.question import Question
+from app.models.stats import QuestionAccessStats
 from app.repositories.base import BaseRepository
 from app.core.logger import get_logger
 
@@ -20,6 +22,20 @@ class QuestionRepository(BaseRepository[Question]):
     def __init__(self, session: AsyncSession):
         super().__init__(Question, session)
 
+    async def delete(self, id: int) -> bool:
+        """
+        删除题目及其访问统计
+
+        Args:
+            id: 题目ID
+
+        Returns:
+            删除成功返回True
+        """
+        # 与删除题目在同一事务中提交
+        await self.session.execute(delete(QuestionAccessStats).where(QuestionAccessStats.question_id == id))
+        return await super().delete(id)
+
     async def find_by_question(self, question: str) -> Optional[Question]:
         """
         根据问题文本查找
@@ -96,6 +112,57 @@ class QuestionRepository(BaseRepository[Question]):
         )
         return await self.create(question_obj)
 
+    async def get_recent_answers(
+        self,
+        skip: int = 0,
+        limit: int = 200
+    ) -> List[Tuple[str, str]]:
+        """
+        按创建时间倒序获取题目和答案（用于缓存预热，只查询需要的两列）
+
+        Args:
+            skip: 跳过的记录数
+            limit: 返回的记录数限制
+
+        Returns:
+            (问题, 答案) 列表
+        """
+        statement = (
+            select(Question.question, Question.answer)
+            .order_by(Question.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def get_hot_answers(
+        self,
+        skip: int = 0,
+        limit: int = 200
+    ) -> List[Tuple[str, str]]:
+        """
+        按访问次数倒序获取题目和答案（没有访问统计的按创建时间倒序排在后面）
+
+        Args:
+            skip: 跳过的记录数
+            limit: 返回的记录数限制
+
+        Returns:
+            (问题, 答案) 列表
+        """
+        from sqlmodel import func
+
+        statement = (
+            select(Question.question, Question.answer)
+            .outerjoin(QuestionAccessStats, QuestionAccessStats.question_id == Question.id)
+            .order_by(func.coalesce(QuestionAccessStats.total_hits, 0).desc(), Question.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return [(row[0], row[1]) for row in result.all()]
+
     async def get_paginated(
         self,
         skip: int = 0,
@@ -1,4 +1,5 @@
 """健康检查相关的Schema定义"""
+from typing import Any, Dict, Optional
 from pydantic import BaseModel
 
 
@@ -11,8 +12,10 @@ class HealthResponse(BaseModel):
         app_name: 应用名称
         version: 应用版本
         environment: 运行环境
+        redis: Redis连接状态（仅Redis缓存模式）
     """
     status: str
     app_name: str
     version: str
     environment: str
+    redis: Optional[Dict[str, Any]] = None
@@ -1,5 +1,5 @@
 """查询相关的Pydantic Schema定义"""
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 from enum import Enum
 
@@ -84,7 +84,35 @@ class QueryResponse(BaseModel):
     code: int = Field(description="状态码: 1-成功, 0-失败")
     data: Optional[str] = Field(None, description="答案内容")
     msg: str = Field(description="响应消息")
-    source: str = Field(description="答案来源: cache/database/ai/none")
+    source: str = Field(description="答案来源: cache/database/ai/pending/none")
+
+
+class PrefetchRequest(BaseModel):
+    """
+    预取请求Schema
+
+    Attributes:
+        questions: 需要预取答案的题目列表
+    """
+    questions: List[QueryRequest] = Field(..., min_length=1, description="题目列表")
+
+
+class PrefetchResponse(BaseModel):
+    """
+    预取响应Schema
+
+    Attributes:
+        code: 状态码（1-已受理，0-未受理）
+        msg: 响应消息
+        queued: 加入预取队列的题目数
+        skipped: 重复或已在处理中的题目数
+        dropped: 队列已满被丢弃的题目数
+    """
+    code: int = Field(description="状态码: 1-已受理, 0-未受理")
+    msg: str = Field(description="响应消息")
+    queued: int = Field(0, description="加入预取队列的题目数")
+    skipped: int = Field(0, description="重复或已在处理中的题目数")
+    dropped: int = Field(0, description="队列已满被丢弃的题目数")
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,255 @@
+"""题目访问统计服务 - 内存聚合访问计数，定时批量写入数据库"""
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.logger import get_logger
+from app.models.question import Question
+from app.models.stats import QuestionAccessStats
+
+logger = get_logger(__name__)
+
+# 支持原子累加写入（INSERT ... ON CONFLICT DO UPDATE）的数据库方言
+UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# 每批写入的题目数：每行6个参数，保证不超过旧版SQLite 999个绑定参数的限制
+WRITE_BATCH_SIZE = 150
+
+# 计入统计的答案来源及其对应的统计字段
+SOURCE_FIELDS = {
+    "cache": "cache_hits",
+    "database": "database_hits",
+    "ai": "ai_hits",
+}
+
+
+class PendingAccess:
+    """单道题目待写入的访问计数"""
+
+    __slots__ = ("cache_hits", "database_hits", "ai_hits", "last_hit_at")
+
+    def __init__(self):
+        self.cache_hits = 0
+        self.database_hits = 0
+        self.ai_hits = 0
+        self.last_hit_at: Optional[datetime] = None
+
+
+class AccessStatsService:
+    """
+    题目访问统计服务
+
+    热路径上只更新内存中的计数；后台任务每隔 stats.access_flush_interval 秒，
+    或待写入题目数达到 stats.access_max_pending 时，批量写入 question_access_stats 表。
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, PendingAccess] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_event: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+
+    def record(self, question: str, source: str) -> None:
+        """
+        记录一次访问
+
+        Args:
+            question: 问题文本
+            source: 答案来源 cache/database/ai
+        """
+        field = SOURCE_FIELDS.get(source)
+        if field is None or not settings.stats.access_enabled:
+            return
+
+        pending = self._pending.get(question)
+        if pending is None:
+            pending = self._pending[question] = PendingAccess()
+        setattr(pending, field, getattr(pending, field) + 1)
+        pending.last_hit_at = datetime.utcnow()
+
+        if self._flush_event is not None and len(self._pending) >= settings.stats.access_max_pending:
+            self._flush_event.set()
+
+    def start(self) -> None:
+        """启动后台批量写入任务"""
+        if not settings.stats.access_enabled or self._task is not None:
+            return
+        self._flush_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务，并写入剩余数据"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._flush_event = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        """后台循环：定时或积压过多时写入"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=settings.stats.access_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        将内存中的访问计数批量写入数据库
+
+        Returns:
+            更新的题目数
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+
+            try:
+                updated = await self._write(pending)
+            except Exception as e:
+                logger.warning(f"⚠️  访问统计写库失败: {e}")
+                # 写库失败时合并回内存，下次重试
+                self._merge_back(pending)
+                return 0
+
+        logger.debug("访问统计已写库: {} 道题目", updated)
+        return updated
+
+    async def _write(self, pending: Dict[str, PendingAccess]) -> int:
+        """
+        按题目批量累加统计（每批一次查询 + 一次 INSERT ... ON CONFLICT DO UPDATE）
+
+        计数在数据库中原子累加，多个worker同时写入同一道题目时不会丢失计数，
+        也不会因为并发插入同一主键而失败
+
+        Raises:
+            ValueError: 数据库不支持 ON CONFLICT 写入
+        """
+        updated = 0
+        questions = list(pending.keys())
+
+        async with async_session_maker() as session:
+            dialect = session.bind.dialect.name
+            insert = UPSERT_DIALECTS.get(dialect)
+            if insert is None:
+                raise ValueError(f"访问统计不支持数据库 {dialect}")
+
+            for i in range(0, len(questions), WRITE_BATCH_SIZE):
+                batch = questions[i:i + WRITE_BATCH_SIZE]
+                id_rows = await session.execute(
+                    select(Question.id, Question.question).where(Question.question.in_(batch))
+                )
+                ids = {row[1]: row[0] for row in id_rows.all()}
+                if not ids:
+                    continue
+
+                rows = []
+                for question, question_id in ids.items():
+                    access = pending[question]
+                    rows.append({
+                        "question_id": question_id,
+                        "cache_hits": access.cache_hits,
+                        "database_hits": access.database_hits,
+                        "ai_hits": access.ai_hits,
+                        "total_hits": access.cache_hits + access.database_hits + access.ai_hits,
+                        "last_hit_at": access.last_hit_at,
+                    })
+
+                table = QuestionAccessStats.__table__
+                statement = insert(table).values(rows)
+                excluded = statement.excluded
+                statement = statement.on_conflict_do_update(
+                    index_elements=[table.c.question_id],
+                    set_={
+                        "cache_hits": table.c.cache_hits + excluded.cache_hits,
+                        "database_hits": table.c.database_hits + excluded.database_hits,
+                        "ai_hits": table.c.ai_hits + excluded.ai_hits,
+                        "total_hits": table.c.total_hits + excluded.total_hits,
+                        # 各worker的写入顺序不确定，只保留较新的访问时间
+                        "last_hit_at": case(
+                            (table.c.last_hit_at.is_(None), excluded.last_hit_at),
+                            (excluded.last_hit_at > table.c.last_hit_at, excluded.last_hit_at),
+                            else_=table.c.last_hit_at,
+                        ),
+                    },
+                )
+                await session.execute(statement)
+                updated += len(rows)
+
+            await session.commit()
+        return updated
+
+    def _merge_back(self, pending: Dict[str, PendingAccess]) -> None:
+        """把未写入的计数合并回内存"""
+        for question, access in pending.items():
+            current = self._pending.get(question)
+            if current is None:
+                self._pending[question] = access
+                continue
+            current.cache_hits += access.cache_hits
+            current.database_hits += access.database_hits
+            current.ai_hits += access.ai_hits
+            # 内存中可能已有更新的访问，保留较新的时间
+            if access.last_hit_at and (current.last_hit_at is None or access.last_hit_at > current.last_hit_at):
+                current.last_hit_at = access.last_hit_at
+
+
+async def get_hot_questions(limit: int = 50, order_by: str = "hits") -> List[dict]:
+    """
+    查询访问最多（或最近访问）的题目
+
+    Args:
+        limit: 返回数量
+        order_by: hits 按总命中次数排序，recent 按最后访问时间排序
+
+    Returns:
+        题目及其访问统计列表
+    """
+    order_column = (
+        QuestionAccessStats.last_hit_at.desc()
+        if order_by == "recent"
+        else QuestionAccessStats.total_hits.desc()
+    )
+    statement = (
+        select(Question.id, Question.question, Question.type, QuestionAccessStats)
+        .join(QuestionAccessStats, QuestionAccessStats.question_id == Question.id)
+        .order_by(order_column)
+        .limit(limit)
+    )
+
+    async with async_session_maker() as session:
+        result = await session.execute(statement)
+        rows = result.all()
+
+    return [
+        {
+            "id": row[0],
+            "question": row[1],
+            "type": row[2],
+            "cache_hits": row[3].cache_hits,
+            "database_hits": row[3].database_hits,
+            "ai_hits": row[3].ai_hits,
+            "total_hits": row[3].total_hits,
+            "last_hit_at": row[3].last_hit_at.isoformat() if row[3].last_hit_at else None,
+        }
+        for row in rows
+    ]
+
+
+# 全局访问统计服务实例
+access_stats_service = AccessStatsService()
@@ -0,0 +1,293 @@
+"""AI微批处理 - 将短时间内的多道未命中题目合并为一次AI请求"""
+import asyncio
+import json
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from app.core.config import settings
+from app.core.deadline import Deadline, current_deadline, set_deadline
+from app.core.logger import get_logger
+from app.core.metrics import AI_BATCH_FALLBACKS, AI_BATCH_SIZE
+from app.providers.concurrency import AIPriority, current_priority, set_priority
+from app.services.prompt_templates import RenderedPrompt, estimate_tokens, prompt_templates
+
+if TYPE_CHECKING:
+    from app.services.ai_service import AIAsyncService
+
+logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
+
+TYPE_LABELS = {
+    "single": "单选题",
+    "multiple": "多选题",
+    "judgement": "判断题",
+    "fill": "填空题",
+}
+
+# 固定的系统消息，所有批次共享同一前缀
+BATCH_SYSTEM = """你是一个专业的题库系统，下面按编号给出多道题目，请逐题给出准确答案。
+- 单选题：返回正确选项的字母和内容，例如 A. 答案内容
+- 多选题：用###连接每个正确选项的字母和内容，例如 A. 答案一###C. 答案二
+- 判断题：只返回 对 或 错
+- 填空题：直接返回填空内容，有多个空时用###连接
+只输出一个JSON数组，按题目编号顺序每题一个字符串，不要输出解释，例如：["A. 答案内容", "对"]"""
+
+_ARRAY_PATTERN = re.compile(r"\[.*\]", re.DOTALL)
+
+# 提供商未配置时每道题预留的输出token数（与 AIProviderConfig.max_tokens 默认值一致）
+DEFAULT_ANSWER_TOKENS = 512
+
+
+class _Pending:
+    """等待批处理的题目"""
+
+    __slots__ = ("title", "options", "question_type", "budget", "priority", "deadline", "future")
+
+    def __init__(
+        self,
+        title: str,
+        options: str,
+        question_type: str,
+        budget: int,
+        priority: AIPriority,
+        deadline: Optional[float],
+        future: asyncio.Future,
+    ):
+        self.title = title
+        self.options = options
+        self.question_type = question_type
+        self.budget = budget
+        self.priority = priority
+        self.deadline = deadline
+        self.future = future
+
+
+def batch_deadline(batch: List[_Pending]) -> Optional[Deadline]:
+    """
+    批次的截止时间：取最晚的一道题，任意一道题不限制时整批不限制
+
+    Args:
+        batch: 同一批的题目
+
+    Returns:
+        截止时间或None
+    """
+    if any(item.deadline is None for item in batch):
+        return None
+    return Deadline(max(item.deadline for item in batch))
+
+
+def answer_budget(provider_name: str, question_type: str) -> int:
+    """
+    一道题在批量请求中预留的输出token数：与逐题调用相同，
+    使用题型模板的预算，未设置时使用提供商的 max_tokens
+
+    Args:
+        provider_name: 提供商名称
+        question_type: 题目类型
+
+    Returns:
+        输出token数
+    """
+    budget = prompt_templates.get(question_type).max_tokens
+    if budget:
+        return budget
+    provider = settings.ai.providers.get(provider_name)
+    return provider.max_tokens if provider else DEFAULT_ANSWER_TOKENS
+
+
+def build_batch_prompt(batch: List[_Pending]) -> RenderedPrompt:
+    """
+    构建批量提示词
+
+    Args:
+        batch: 同一批的题目
+
+    Returns:
+        渲染后的提示词，输出token上限为各题预算之和（调用时不受提供商 max_tokens 限制）
+    """
+    lines = []
+    for index, item in enumerate(batch, 1):
+        label = TYPE_LABELS.get(item.question_type, TYPE_LABELS["single"])
+        lines.append(f"{index}. [{label}] {item.title}")
+        if item.options:
+            lines.append(f"   选项：{item.options}")
+    user = "\n".join(lines)
+    max_tokens = sum(item.budget for item in batch)
+    return RenderedPrompt("batch", BATCH_SYSTEM, user, max_tokens, estimate_tokens(BATCH_SYSTEM) + estimate_tokens(user))
+
+
+def parse_batch_response(response: str, size: int) -> Optional[List[Optional[str]]]:
+    """
+    解析批量响应
+
+    Args:
+        response: AI返回的文本
+        size: 本批题目数
+
+    Returns:
+        与题目一一对应的答案列表（无法使用的位置为None）；整体无法解析时返回None
+    """
+    if not response:
+        return None
+    match = _ARRAY_PATTERN.search(response.split("</think>")[-1])
+    if not match:
+        return None
+    try:
+        items = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(items, list) or len(items) != size:
+        return None
+
+    answers: List[Optional[str]] = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("answer")
+        answer = str(item).strip() if isinstance(item, (str, int, float)) else ""
+        answers.append(answer or None)
+    return answers
+
+
+class AIBatcher:
+    """
+    AI请求微批处理器
+
+    同一提供商的未命中题目先等待 ai.batch.window_ms 毫秒（或凑满 ai.batch.max_size 道、
+    各题输出预算之和达到 ai.batch.max_tokens），合并为一次要求返回JSON数组的请求，
+    每道题的答案经过与逐题调用相同的解析后分发给各个等待中的请求。
+    批量请求失败或结果无法解析的题目回退为逐题调用；窗口内只有一道题时直接逐题调用。
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, List[_Pending]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用微批处理"""
+        return settings.ai.batch.enabled and settings.ai.batch.max_size > 1
+
+    async def submit(self, service: "AIAsyncService", title: str, options: str, question_type: str) -> Optional[str]:
+        """
+        提交一道题目并等待答案
+
+        Args:
+            service: 发起请求的AI服务（提供商相同的题目合并为一批）
+            title: 问题标题
+            options: 选项
+            question_type: 题目类型
+
+        Returns:
+            答案文本或None
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = service.provider_name
+        budget = answer_budget(key, question_type)
+
+        # 加入这道题会超出批量输出预算时，先发送已有的题目
+        queue = self._queues.get(key)
+        if queue and sum(item.budget for item in queue) + budget > settings.ai.batch.max_tokens:
+            self._flush(service, key)
+
+        queue = self._queues.setdefault(key, [])
+        queue.append(_Pending(title, options, question_type, budget, current_priority(), current_deadline(), future))
+
+        if len(queue) >= settings.ai.batch.max_size:
+            self._flush(service, key)
+        elif len(queue) == 1:
+            self._timers[key] = loop.call_later(settings.ai.batch.window_ms / 1000, self._flush, service, key)
+        return await future
+
+    def _flush(self, service: "AIAsyncService", key: str) -> None:
+        """发送当前批次"""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._queues.pop(key, None)
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(service, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, service: "AIAsyncService", batch: List[_Pending]) -> None:
+        """执行一个批次并分发结果"""
+        # 批次任务可能在任意一道题的上下文中创建，优先级取批内最高的一道（随各题的提升而提升），
+        # 截止时间取最晚的一道，不能让最先截止的请求拖累同批的其他题目
+        set_priority(AIPriority(members=[item.priority for item in batch]))
+        set_deadline(batch_deadline(batch))
+        answers: List[Optional[str]] = [None] * len(batch)
+        AI_BATCH_SIZE.observe(len(batch))
+        try:
+            if len(batch) > 1:
+                answers = await self._call_batch(service, batch)
+
+            # 没有拿到答案的题目逐题调用（已取消的请求跳过）
+            retry = [i for i, answer in enumerate(answers) if answer is None and not batch[i].future.done()]
+            if retry:
+                results = await asyncio.gather(
+                    *(self._answer_one(service, batch[i]) for i in retry), return_exceptions=True,
+                )
+                for i, result in zip(retry, results):
+                    answers[i] = None if isinstance(result, BaseException) else result
+        finally:
+            for item, answer in zip(batch, answers):
+                if not item.future.done():
+                    item.future.set_result(answer)
+
+    async def _answer_one(self, service: "AIAsyncService", item: _Pending) -> Optional[str]:
+        """逐题调用，使用该题自己的优先级和截止时间（在独立的任务中运行）"""
+        set_priority(item.priority)
+        set_deadline(Deadline(item.deadline) if item.deadline is not None else None)
+        return await service._answer(item.title, item.options, item.question_type)
+
+    async def _call_batch(self, service: "AIAsyncService", batch: List[_Pending]) -> List[Optional[str]]:
+        """
+        发送批量请求
+
+        Returns:
+            与题目一一对应的答案列表，失败或无法解析的位置为None
+        """
+        try:
+            response = await service._call_provider(build_batch_prompt(batch), clamp=False)
+        except Exception as e:
+            logger.warning(f"⚠️  批量AI调用失败，改为逐题调用: {e}")
+            AI_BATCH_FALLBACKS.labels("error").inc(len(batch))
+            return [None] * len(batch)
+
+        answers = parse_batch_response(response, len(batch))
+        if answers is None:
+            logger.warning(f"⚠️  批量AI响应无法解析，改为逐题调用（{len(batch)} 道）")
+            AI_BATCH_FALLBACKS.labels("parse").inc(len(batch))
+            return [None] * len(batch)
+
+        # 与逐题调用相同的解析（去掉"答案是："等前缀、提取JSON中的answer）
+        answers = [service._parse_response(answer) if answer else None for answer in answers]
+        missing = answers.count(None)
+        if missing:
+            AI_BATCH_FALLBACKS.labels("missing").inc(missing)
+        sampled_logger.info("批量AI调用完成: {} 道题", len(batch))
+        return answers
+
+    async def stop(self) -> None:
+        """取消未发送和进行中的批次，等待中的请求得到None"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for batch in self._queues.values():
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_result(None)
+        self._queues.clear()
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# 全局AI微批处理器实例
+ai_batcher = AIBatcher()
@@ -1,13 +1,33 @@
 """AI异步服务 - 封装AI调用逻辑和响应解析"""
 import json
 import re
+import time
 from typing import Optional
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.metrics import (
+    AI_ERRORS,
+    AI_ESTIMATED_TOKENS,
+    AI_IN_FLIGHT,
+    AI_REQUEST_SECONDS,
+    AI_TEMPLATE_SECONDS,
+    AI_TIER_ANSWERS,
+    AI_TIER_ESCALATIONS,
+)
+from app.core.timeseries import query_timeseries
 from app.providers.multi_provider import UniversalAIProvider
 from app.providers.mock_provider import MockAIProvider
+from app.services.ai_batcher import ai_batcher
+from app.services.prompt_templates import RenderedPrompt, estimate_tokens, prompt_templates
+from app.utils.helpers import match_option
 
 logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
+
+CONFIDENCE_PATTERN = re.compile(r'"confidence"\s*:\s*"?(\d+(?:\.\d+)?)')
+
+# 选项中的字母前缀，如 "A." "B、"
+OPTION_LETTER_PATTERN = re.compile(r'(?:^|\s)([A-Z])[.、．]')
 
 
 class AIAsyncService:
@@ -34,11 +54,21 @@ class AIAsyncService:
         else:
             try:
                 self.provider = UniversalAIProvider(self.provider_name)
-                logger.info(f"✅ AI服务已初始化: {provider_config.name}")
+                sampled_logger.debug("AI服务已初始化: {}", provider_config.name)
             except Exception as e:
                 logger.error(f"❌ 初始化AI提供商失败: {e}")
                 self.provider = MockAIProvider()
 
+        # 分级回答：先问快速模型，把握不足时再问本提供商
+        self.fast_service: Optional[AIAsyncService] = None
+        tiering = settings.ai.tiering
+        if tiering.enabled and tiering.fast_provider != self.provider_name:
+            fast_config = settings.ai.providers.get(tiering.fast_provider)
+            if fast_config and fast_config.enabled:
+                self.fast_service = AIAsyncService(tiering.fast_provider)
+            else:
+                logger.warning(f"⚠️  快速模型提供商 {tiering.fast_provider} 未配置或未启用，不使用分级回答")
+
     async def get_answer(
         self,
         title: str,
@@ -57,79 +87,183 @@ class AIAsyncService:
             答案文本或None
         """
         try:
-            # 构建提示词
-            prompt = self._build_prompt(title, options, question_type)
-
-            # 调用AI
-            response = await self.provider.call(prompt)
-
-            # 解析响应
-            answer = self._parse_response(response)
+            if self.fast_service is not None:
+                # 分级回答逐题判断是否升级，不参与微批
+                answer = await self._answer_tiered(title, options, question_type)
+            elif ai_batcher.enabled:
+                answer = await ai_batcher.submit(self, title, options, question_type)
+            else:
+                answer = await self._answer(title, options, question_type)
 
             if answer:
-                logger.info(f"✅ AI返回答案: {title[:50]}... -> {answer[:50]}...")
+                sampled_logger.info("AI返回答案: {} -> {}", title[:50], answer[:50])
             else:
-                logger.warning(f"⚠️ AI未返回有效答案: {title[:50]}...")
+                logger.warning("AI未返回有效答案: {}", title[:50])
 
             return answer
 
         except Exception as e:
-            logger.error(f"❌ AI服务调用失败: {e}")
+            logger.error("AI服务调用失败: {}", e)
             return None
 
+    async def _answer(self, title: str, options: str, question_type: str) -> Optional[str]:
+        """
+        单独调用AI获取一道题的答案
+
+        Args:
+            title: 问题标题
+            options: 选项
+            question_type: 题目类型
+
+        Returns:
+            答案文本或None
+        """
+        # 构建提示词
+        prompt = self._build_prompt(title, options, question_type)
+
+        # 调用AI
+        response = await self._call_provider(prompt)
+
+        # 解析响应
+        return self._parse_response(response)
+
+    async def _answer_tiered(self, title: str, options: str, question_type: str) -> Optional[str]:
+        """
+        分级获取答案：快速模型给出答案和自评置信度，
+        置信度低于阈值或答案匹配不到任何选项时升级到强模型
+
+        Args:
+            title: 问题标题
+            options: 选项
+            question_type: 题目类型
+
+        Returns:
+            答案文本或None
+        """
+        prompt = self._build_prompt(title, options, question_type, confidence=True)
+        try:
+            response = await self.fast_service._call_provider(prompt)
+        except Exception as e:
+            logger.warning(f"⚠️  快速模型调用失败: {e}")
+            response = ""
+
+        fast_answer = self._parse_response(response)
+        if not fast_answer:
+            reason = "empty"
+        elif (self._parse_confidence(response) or 0.0) < settings.ai.tiering.confidence_threshold:
+            reason = "low_confidence"
+        elif not self._matches_options(fast_answer, options):
+            reason = "no_match"
+        else:
+            AI_TIER_ANSWERS.labels("fast").inc()
+            return fast_answer
+
+        AI_TIER_ESCALATIONS.labels(reason).inc()
+        sampled_logger.info("快速模型答案不可用({})，升级到 {}: {}", reason, self.provider_name, title[:50])
+        answer = await self._answer(title, options, question_type)
+        if answer:
+            AI_TIER_ANSWERS.labels("strong").inc()
+            return answer
+        if fast_answer:
+            AI_TIER_ANSWERS.labels("fast_fallback").inc()
+        return fast_answer
+
+    async def _call_provider(self, prompt: RenderedPrompt, clamp: bool = True) -> str:
+        """
+        调用AI提供商并记录耗时、并发和估算token指标
+
+        Args:
+            prompt: 渲染后的提示词
+            clamp: 是否把输出token上限限制在提供商的 max_tokens 以内
+
+        Returns:
+            AI返回的文本
+        """
+        in_flight = AI_IN_FLIGHT.labels(self.provider_name)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            response = await self.provider.call(
+                prompt.user, system=prompt.system, max_tokens=prompt.max_tokens, clamp=clamp
+            )
+        except Exception as e:
+            AI_ERRORS.labels(self.provider_name, type(e).__name__).inc()
+            query_timeseries.record_ai_call(failed=True)
+            raise
+        else:
+            query_timeseries.record_ai_call(failed=not response)
+            AI_ESTIMATED_TOKENS.labels(prompt.template, "completion").inc(estimate_tokens(response))
+            return response
+        finally:
+            in_flight.dec()
+            elapsed = time.perf_counter() - start
+            AI_REQUEST_SECONDS.labels(self.provider_name, self.provider.get_model_name()).observe(elapsed)
+            AI_TEMPLATE_SECONDS.labels(prompt.template).observe(elapsed)
+            AI_ESTIMATED_TOKENS.labels(prompt.template, "prompt").inc(prompt.prompt_tokens)
+
     def _build_prompt(
         self,
         title: str,
         options: str,
-        question_type: str
-    ) -> str:
+        question_type: str,
+        confidence: bool = False
+    ) -> RenderedPrompt:
         """
-        构建AI提示词
+        按题目类型的模板构建AI提示词
 
         Args:
             title: 问题标题
             options: 选项
             question_type: 题目类型
+            confidence: 是否要求模型同时输出置信度（分级回答的快速模型）
 
         Returns:
-            完整的提示词
+            渲染后的提示词（固定的系统消息 + 简短的用户消息 + 输出token上限）
         """
-        # 根据题目类型提供更详细的说明
-        type_instructions = {
-            "single": "单选题：返回完整答案，包括字母和内容，例如：'A. 答案内容' 或 'A'。",
-            "multiple": "多选题：如果有多个正确答案，用###连接每个完整答案，包括字母，例如：'A. 答案一###C. 答案二'。",
-            "judgement": "判断题：直接返回'对'或'错'。",
-            "fill": "填空题：直接返回填空内容，如果有多个空，用###连接。"
-        }
-        
-        instruction = type_instructions.get(question_type, type_instructions["single"])
-        
-        # 如果有选项，添加示例说明
-        options_help = ""
-        if options:
-            options_help = f"""
-重要：必须返回完整答案格式！
-- 如果答案是A选项，必须返回"A. 选项内容"
-- 不能只返回"选项内容"或"A"
-- 必须包含字母和完整文字
-
-示例：
-问题：Access数据库的特点是？
-选项：A. 关系模型 B. 层次模型 C. 网状模型 D. 面向对象模型
-正确答案：A. 关系模型  （而不是只返回"关系模型"）
-"""
-        
-        base_prompt = f'''你是一个专业的题库系统，请根据问题提供准确的答案。
+        return prompt_templates.get(question_type).render(title, options, confidence)
 
-{instruction}
-{options_help}
+    def _parse_confidence(self, response: str) -> Optional[float]:
+        """
+        解析AI自评的置信度
 
-问题：{title}'''
+        Args:
+            response: AI返回的原始文本
 
-        if options:
-            base_prompt += f'\n选项：{options}'
+        Returns:
+            0~1之间的置信度，没有给出时返回None（百分数自动换算）
+        """
+        match = CONFIDENCE_PATTERN.search(response or "")
+        if not match:
+            return None
+        confidence = float(match.group(1))
+        if confidence > 1:
+            confidence /= 100
+        return min(confidence, 1.0)
 
-        return base_prompt
+    def _matches_options(self, answer: str, options: str) -> bool:
+        """
+        检查答案能否通过 match_option 对应到选项（多选题的每个答案都要对应上）
+
+        Args:
+            answer: 解析出的答案
+            options: 选项
+
+        Returns:
+            能对应到选项，或选项没有字母前缀（判断题、填空题）无法校验时返回True
+        """
+        letters = set(OPTION_LETTER_PATTERN.findall(options or ""))
+        if not letters:
+            return True
+        raw_options = set(options.split())
+        for part in answer.split("###"):
+            matched = match_option(part.strip(), options)
+            prefix = re.match(r'^([A-Z])[.、]\s', matched)
+            if prefix:
+                if prefix.group(1) not in letters:
+                    return False
+            elif matched not in raw_options:
+                return False
+        return True
 
     def _parse_response(self, response: str) -> Optional[str]:
         """
@@ -152,7 +286,7 @@ class AIAsyncService:
             json_match = re.search(r'"answer"\s*:\s*"([^"]+)"', response, re.IGNORECASE)
             if json_match:
                 answer = json_match.group(1)
-                logger.info(f"✅ JSON格式解析成功: {answer[:50]}...")
+                sampled_logger.debug("JSON格式解析成功: {}", answer[:50])
                 return self._format_answer(answer, response)
             
             # 方法2: 如果有选项，尝试匹配选项
@@ -165,14 +299,14 @@ class AIAsyncService:
             cleaned = cleaned.strip()
             
             if cleaned and len(cleaned) > 0:
-                logger.info(f"✅ 直接使用清理后的答案: {cleaned[:50]}...")
+                sampled_logger.debug("直接使用清理后的答案: {}", cleaned[:50])
                 return cleaned
             
-            logger.warning(f"⚠️ 无法解析AI响应: {response[:100]}")
+            logger.warning("无法解析AI响应: {}", response[:100])
             return None
 
         except Exception as e:
-            logger.error(f"❌ 解析响应失败: {e}")
+            logger.error("解析响应失败: {}", e)
             return None
     
     def _format_answer(self, answer: str, full_response: str) -> str:
@@ -0,0 +1,198 @@
+"""AI答案任务 - 按题目去重的AI调用任务，客户端超时后继续在后台完成"""
+import asyncio
+import time
+from typing import Dict, Optional, Set
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.deadline import set_deadline
+from app.core.logger import get_logger
+from app.core.metrics import AI_BACKGROUND_COMPLETIONS
+from app.providers.concurrency import PRIORITY_LIVE, AIPriority, set_priority
+from app.repositories.question_repository import QuestionRepository
+from app.schemas.query import QueryRequest
+from app.services.ai_service import AIAsyncService
+from app.services.cache_service import CacheService
+
+logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
+
+
+class AnswerTaskService:
+    """
+    AI答案任务管理
+
+    每道题同一时间只有一个AI调用任务，超时后重试的客户端直接等待同一个任务。
+    任务拿到答案后用独立的数据库会话写库并写入缓存，不依赖发起请求的会话，
+    因此客户端超时离开后（query.background_completion）任务可以继续完成，下次查询直接命中。
+    每个任务有自己的排队优先级，后台（预取）任务被实时查询加入时提升为实时优先级。
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._priorities: Dict[asyncio.Task, AIPriority] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._detached: Set[asyncio.Task] = set()
+        self._late: Set[asyncio.Task] = set()
+
+    def get(self, title: str) -> Optional[asyncio.Task]:
+        """
+        获取题目正在进行的AI任务
+
+        Args:
+            title: 问题标题
+
+        Returns:
+            进行中的任务或None
+        """
+        return self._tasks.get(title)
+
+    def start(self, request: QueryRequest, ai_service: AIAsyncService, priority: int = PRIORITY_LIVE) -> asyncio.Task:
+        """
+        启动（或加入）题目的AI任务
+
+        任务不继承发起请求的截止时间，AI调用只受 ai.deadline 约束。
+        允许后台完成且后台任务未超过上限时，等待者全部超时后任务继续在后台完成；
+        否则最后一个等待者超时离开时取消任务
+
+        Args:
+            request: 查询请求
+            ai_service: AI服务
+            priority: AI调用的排队优先级，加入已有任务时实时优先级会提升该任务
+
+        Returns:
+            AI任务，结果为答案文本或None
+        """
+        task = self._tasks.get(request.title)
+        if task is not None:
+            if priority == PRIORITY_LIVE:
+                self.promote(task)
+            return task
+
+        background = (
+            settings.query.background_completion
+            and len(self._tasks) < settings.query.max_background_tasks
+        )
+        priority_ref = AIPriority(priority)
+        task = asyncio.create_task(self._run(request, ai_service, background, priority_ref))
+        self._tasks[request.title] = task
+        self._priorities[task] = priority_ref
+        task.add_done_callback(lambda t: self._discard(request.title, t))
+        if background:
+            task.add_done_callback(self._detached.discard)
+            self._detached.add(task)
+        return task
+
+    def promote(self, task: asyncio.Task) -> None:
+        """
+        实时查询加入任务时，把任务的AI调用提升为实时优先级
+
+        Args:
+            task: AI任务
+        """
+        priority = self._priorities.get(task)
+        if priority is not None and priority.promote():
+            sampled_logger.debug("后台AI任务已提升为实时优先级")
+
+    def can_detach(self, task: asyncio.Task) -> bool:
+        """任务在客户端超时后是否可以继续在后台完成"""
+        return task in self._detached
+
+    def _discard(self, title: str, task: asyncio.Task) -> None:
+        """任务结束后移除"""
+        if self._tasks.get(title) is task:
+            del self._tasks[title]
+        self._priorities.pop(task, None)
+
+    async def _run(
+        self, request: QueryRequest, ai_service: AIAsyncService, background: bool, priority: AIPriority
+    ) -> Optional[str]:
+        """调用AI并保存答案"""
+        # 优先级和截止时间只由本任务决定，不继承发起任务的上下文：
+        # 任务被多个截止时间不同的请求共享，不能在发起者超时时停止
+        set_priority(priority)
+        set_deadline(None)
+
+        start = time.perf_counter()
+        answer = await ai_service.get_answer(
+            title=request.title,
+            options=request.options,
+            question_type=request.type.value
+        )
+        cost = time.perf_counter() - start
+        if not answer:
+            return None
+
+        try:
+            async with async_session_maker() as session:
+                await QuestionRepository(session).create_question(
+                    question=request.title,
+                    answer=answer,
+                    options=request.options,
+                    question_type=request.type.value
+                )
+            await CacheService().set(request.title, answer, cost=cost)
+            sampled_logger.info("AI答案已保存: {}", request.title[:50])
+        except Exception as e:
+            logger.error("保存AI答案失败: {}", e)
+        return answer
+
+    async def wait(self, task: asyncio.Task, timeout: Optional[float]) -> Optional[str]:
+        """
+        在时间预算内等待AI任务
+
+        同一任务可能有多个等待者（重试的客户端、预取），截止时间各不相同。
+        超时后可以后台完成的任务继续运行，否则在最后一个等待者离开时取消
+
+        Args:
+            task: AI任务
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            答案文本；超时或失败时返回None
+
+        Raises:
+            asyncio.TimeoutError: 超出时间预算
+        """
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        done = set()
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+        finally:
+            waiters = self._waiters[task] - 1
+            if waiters:
+                self._waiters[task] = waiters
+            else:
+                del self._waiters[task]
+                if not done and not self.can_detach(task):
+                    # 最后一个等待者离开（超时或请求被取消），没有人需要这个答案了
+                    task.cancel()
+
+        if not done:
+            if self.can_detach(task) and task not in self._late:
+                self._late.add(task)
+                task.add_done_callback(self._late.discard)
+                task.add_done_callback(_record_background)
+            raise asyncio.TimeoutError()
+        if task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+
+    async def stop(self) -> None:
+        """取消所有进行中的AI任务"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _record_background(task: asyncio.Task) -> None:
+    """记录客户端超时后在后台完成的任务结果"""
+    if task.cancelled() or task.exception() is not None:
+        AI_BACKGROUND_COMPLETIONS.labels("error").inc()
+    else:
+        AI_BACKGROUND_COMPLETIONS.labels("ok" if task.result() else "empty").inc()
+
+
+# 全局AI答案任务实例
+answer_task_service = AnswerTaskService()
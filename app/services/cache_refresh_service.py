@@ -0,0 +1,101 @@
+"""缓存刷新服务 - 在后台从数据库刷新变旧的缓存，避免热点键过期时集中回源"""
+import asyncio
+import time
+from typing import Set
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.logger import get_logger
+from app.core.metrics import CACHE_REFRESHES
+from app.repositories.cache_keyspace import fingerprint
+from app.repositories.question_repository import QuestionRepository
+from app.services.cache_service import CacheService
+
+logger = get_logger(__name__)
+
+# Redis模式下同一个键在锁有效期内只由一个worker刷新
+REFRESH_LOCK_PREFIX = "qb:refresh:"
+REFRESH_LOCK_TTL = 30
+
+
+class CacheRefreshService:
+    """
+    缓存后台刷新服务
+
+    查询命中已变旧（或按概率需要提前刷新）的缓存时，先返回旧值，
+    再由这里安排一个后台任务从数据库读取最新答案写回缓存。
+    同一worker内按问题去重，多worker之间通过Redis NX锁去重。
+    """
+
+    def __init__(self):
+        self._inflight: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, title: str) -> bool:
+        """
+        安排后台刷新
+
+        Args:
+            title: 问题文本
+
+        Returns:
+            已安排返回True，已在刷新或超出并发上限返回False
+        """
+        if title in self._inflight or len(self._inflight) >= settings.cache.refresh_max_inflight:
+            return False
+
+        self._inflight.add(title)
+        task = asyncio.create_task(self._refresh(title))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def stop(self) -> None:
+        """取消尚未完成的刷新任务"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _refresh(self, title: str) -> None:
+        """从数据库读取最新答案并写回缓存"""
+        try:
+            if not await self._acquire(title):
+                return
+
+            start = time.perf_counter()
+            async with async_session_maker() as session:
+                question = await QuestionRepository(session).find_by_question(title)
+            cost = time.perf_counter() - start
+
+            cache_service = CacheService()
+            if question:
+                await cache_service.set(title, question.answer, cost=cost)
+                CACHE_REFRESHES.labels("ok").inc()
+                logger.debug("缓存已刷新: {}", title[:50])
+            else:
+                # 数据库中已没有该题目，不再继续返回旧答案
+                await cache_service.delete(title)
+                CACHE_REFRESHES.labels("missing").inc()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            CACHE_REFRESHES.labels("error").inc()
+            logger.warning(f"⚠️  缓存刷新失败: {e}")
+        finally:
+            self._inflight.discard(title)
+
+    async def _acquire(self, title: str) -> bool:
+        """Redis模式下获取刷新锁（不主动释放，锁有效期内其他worker跳过）"""
+        if settings.cache.type.lower() != "redis":
+            return True
+
+        from app.core.redis import redis_manager
+        redis = await redis_manager.get_redis()
+        if redis is None:
+            return True
+        return bool(await redis.set(REFRESH_LOCK_PREFIX + fingerprint(title), "1", nx=True, ex=REFRESH_LOCK_TTL))
+
+
+# 全局缓存刷新服务实例
+cache_refresh_service = CacheRefreshService()
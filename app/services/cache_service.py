@@ -1,5 +1,6 @@
 """缓存服务 - 封装缓存操作"""
 from app.repositories.cache_repository import CacheRepository
+from app.repositories.cache_keyspace import CacheEntry
 from app.core.logger import get_logger
 
 logger = get_logger(__name__)
@@ -26,11 +27,24 @@ class CacheService:
         """
         return await self.cache_repo.get(key)
 
+    async def get_entry(self, key: str) -> CacheEntry | None:
+        """
+        获取缓存条目（含软过期信息，用于判断是否需要后台刷新）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存条目或None
+        """
+        return await self.cache_repo.get_entry(key)
+
     async def set(
         self,
         key: str,
         value: str,
-        ttl: int | None = None
+        ttl: int | None = None,
+        cost: float = 0.0
     ) -> bool:
         """
         设置缓存
@@ -39,11 +53,29 @@ class CacheService:
             key: 缓存键
             value: 缓存值
             ttl: 过期时间
+            cost: 重新计算该值的耗时（秒）
+
+        Returns:
+            成功返回True
+        """
+        return await self.cache_repo.set(key, value, ttl, cost)
+
+    async def set_many(
+        self,
+        items: dict[str, str],
+        ttl: int | None = None
+    ) -> bool:
+        """
+        批量设置缓存
+
+        Args:
+            items: 键值对
+            ttl: 过期时间
 
         Returns:
             成功返回True
         """
-        return await self.cache_repo.set(key, value, ttl)
+        return await self.cache_repo.set_many(items, ttl)
 
     async def delete(self, key: str) -> bool:
         """
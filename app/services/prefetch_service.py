@@ -0,0 +1,142 @@
+"""预取服务 - 在后台为整张试卷的题目提前生成答案并写入缓存"""
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.logger import get_logger
+from app.core.metrics import PREFETCH_JOBS, PREFETCH_QUEUE_DEPTH
+from app.middleware.rate_limit import RateLimitExceeded, check_ai_quota, current_client
+from app.providers.concurrency import PRIORITY_BACKGROUND
+from app.repositories.question_repository import QuestionRepository
+from app.schemas.query import QueryRequest
+from app.services.ai_service import AIAsyncService
+from app.services.answer_task_service import answer_task_service
+from app.services.cache_service import CacheService
+
+logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
+
+PrefetchJob = Tuple[QueryRequest, Optional[str]]
+
+
+class PrefetchService:
+    """
+    整卷预取服务
+
+    提交的题目进入有界队列，由少量后台worker逐题处理：缓存命中跳过，
+    数据库命中写入缓存，都未命中时调用AI并写入数据库和缓存。
+    预取的AI调用以后台优先级排队，提供商并发名额紧张时让给实时查询；
+    AI额度仍按提交预取的客户端计算。
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: Set[str] = set()
+
+    @property
+    def running(self) -> bool:
+        """预取worker是否在运行"""
+        return bool(self._workers)
+
+    def start(self) -> None:
+        """启动预取worker"""
+        if not settings.prefetch.enabled or self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.prefetch.queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(settings.prefetch.workers, 1))]
+
+    async def stop(self) -> None:
+        """停止预取worker，丢弃未处理的题目"""
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._pending.clear()
+        PREFETCH_QUEUE_DEPTH.set(0)
+
+    def submit(self, requests: List[QueryRequest], client: Optional[str]) -> Dict[str, int]:
+        """
+        提交预取题目（立即返回，不等待处理）
+
+        Args:
+            requests: 题目列表
+            client: 提交预取的客户端标识，未命中的题目按该客户端计算AI额度
+
+        Returns:
+            统计字典: queued 入队数 / skipped 重复或处理中 / dropped 队列已满丢弃
+        """
+        result = {"queued": 0, "skipped": 0, "dropped": 0}
+        for request in requests:
+            if request.title in self._pending or answer_task_service.get(request.title) is not None:
+                result["skipped"] += 1
+                continue
+            try:
+                self._queue.put_nowait((request, client))
+            except asyncio.QueueFull:
+                result["dropped"] += 1
+                continue
+            self._pending.add(request.title)
+            result["queued"] += 1
+
+        if result["dropped"]:
+            PREFETCH_JOBS.labels("dropped").inc(result["dropped"])
+            logger.warning(f"⚠️  预取队列已满，丢弃 {result['dropped']} 道题")
+        PREFETCH_QUEUE_DEPTH.set(self._queue.qsize())
+        return result
+
+    async def _worker(self) -> None:
+        """逐题处理预取队列"""
+        while True:
+            request, client = await self._queue.get()
+            PREFETCH_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                result = await self._prefetch(request, client)
+                PREFETCH_JOBS.labels(result).inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                PREFETCH_JOBS.labels("failed").inc()
+                logger.warning(f"⚠️  预取失败: {e}")
+            finally:
+                self._pending.discard(request.title)
+                self._queue.task_done()
+
+    async def _prefetch(self, request: QueryRequest, client: Optional[str]) -> str:
+        """
+        预取一道题
+
+        Returns:
+            结果: cached/database/ai/failed/quota
+        """
+        cache_service = CacheService()
+        if await cache_service.get(request.title) is not None:
+            return "cached"
+
+        async with async_session_maker() as session:
+            question = await QuestionRepository(session).find_by_question(request.title)
+        if question:
+            await cache_service.set(request.title, question.answer)
+            return "database"
+
+        task = answer_task_service.get(request.title)
+        if task is None:
+            token = current_client.set(client)
+            try:
+                await check_ai_quota()
+            except RateLimitExceeded:
+                return "quota"
+            finally:
+                current_client.reset(token)
+            # 预取的AI调用以后台优先级排队；实时查询加入同一任务时会被提升
+            task = answer_task_service.start(request, AIAsyncService(), priority=PRIORITY_BACKGROUND)
+
+        answer = await answer_task_service.wait(task, None)
+        sampled_logger.debug("预取完成: {}", request.title[:50])
+        return "ai" if answer else "failed"
+
+
+# 全局预取服务实例
+prefetch_service = PrefetchService()
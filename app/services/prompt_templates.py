@@ -0,0 +1,182 @@
+"""提示词模板 - 按题目类型预编译的系统消息、用户消息和输出token预算"""
+import re
+from string import Formatter
+from typing import Dict, NamedTuple, Optional
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TEMPLATE = "single"
+
+# 用户消息模板允许的占位符
+USER_FIELDS = {"title", "options"}
+DEFAULT_USER_TEMPLATE = "问题：{title}{options}"
+
+OUTPUT_FORMAT = '只输出一行JSON，不要输出解释：{"answer": "答案"}'
+
+# 分级回答时附加在系统消息末尾，要求快速模型自评置信度
+# confidence 必须在 answer 之前输出：流式响应在 answer 字段完整时就会提前结束
+CONFIDENCE_FORMAT = (
+    '同时在JSON中先给出 "confidence" 字段，表示你对答案的把握（0到1之间的小数），再给出 answer，'
+    '例如 {"confidence": 0.9, "answer": "答案"}'
+)
+
+OPTIONS_EXAMPLE = """必须返回完整答案格式：包含选项字母和完整文字，不能只返回"选项内容"或"A"。
+示例：
+问题：Access数据库的特点是？
+选项：A. 关系模型 B. 层次模型 C. 网状模型 D. 面向对象模型
+输出：{"answer": "A. 关系模型"}"""
+
+# 内置模板：(题型说明, 是否附带选项示例)
+# 内置模板不限制输出token数（使用提供商的 max_tokens）：推理模型先输出思考过程，
+# 按题型压缩的预算会在给出答案前被截断。需要时通过 ai.prompts 按题型设置 max_tokens
+BUILTIN_TEMPLATES = {
+    "single": ("单选题：返回正确选项的字母和内容，例如 A. 答案内容。", True),
+    "multiple": ("多选题：用###连接每个正确选项的字母和内容，例如 A. 答案一###C. 答案二。", True),
+    "judgement": ("判断题：只返回 对 或 错。", False),
+    "fill": ("填空题：直接返回填空内容，有多个空时用###连接。", False),
+}
+
+# 中日韩文字和全角标点大约各占1个token，其余字符大约4个占1个token
+_WIDE_CHARS = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数（不依赖具体模型的分词器）
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的token数
+    """
+    if not text:
+        return 0
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + (len(text) - wide + 3) // 4
+
+
+class RenderedPrompt(NamedTuple):
+    """渲染后的提示词"""
+    template: str
+    system: str
+    user: str
+    max_tokens: Optional[int]  # None 表示使用提供商的 max_tokens
+    prompt_tokens: int
+
+
+class PromptTemplate:
+    """
+    预编译的提示词模板
+
+    系统消息对同一题型固定不变，放在请求最前面，服务商可以缓存这段前缀；
+    每次请求只渲染较短的用户消息。分级回答使用的附带置信度要求的系统消息同样预先生成
+
+    Args:
+        name: 模板名称（题目类型）
+        system: 系统消息
+        user: 用户消息模板
+        max_tokens: 输出token上限，None表示使用提供商的 max_tokens
+    """
+
+    __slots__ = ("name", "system", "user", "max_tokens", "system_tokens", "confidence_system", "confidence_tokens")
+
+    def __init__(self, name: str, system: str, user: str, max_tokens: Optional[int] = None):
+        fields = {field for _, field, _, _ in Formatter().parse(user) if field is not None}
+        unknown = fields - USER_FIELDS
+        if unknown:
+            raise ValueError(f"提示词模板 {name} 包含未知占位符: {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.system = system
+        self.user = user
+        self.max_tokens = max_tokens
+        self.system_tokens = estimate_tokens(system)
+        self.confidence_system = f"{system}\n{CONFIDENCE_FORMAT}"
+        self.confidence_tokens = estimate_tokens(self.confidence_system)
+
+    def render(self, title: str, options: str = "", confidence: bool = False) -> RenderedPrompt:
+        """
+        渲染提示词
+
+        Args:
+            title: 问题标题
+            options: 选项（为空时不输出选项行）
+            confidence: 是否要求模型同时输出置信度
+
+        Returns:
+            渲染后的提示词
+        """
+        user = self.user.format(title=title, options=f"\n选项：{options}" if options else "")
+        if confidence:
+            system, system_tokens = self.confidence_system, self.confidence_tokens
+        else:
+            system, system_tokens = self.system, self.system_tokens
+        return RenderedPrompt(self.name, system, user, self.max_tokens, system_tokens + estimate_tokens(user))
+
+
+def _builtin(name: str) -> PromptTemplate:
+    """构建内置模板"""
+    instruction, with_options = BUILTIN_TEMPLATES[name]
+    parts = ["你是一个专业的题库系统，请根据问题提供准确的答案。", instruction]
+    if with_options:
+        parts.append(OPTIONS_EXAMPLE)
+    parts.append(OUTPUT_FORMAT)
+    return PromptTemplate(name, "\n".join(parts), DEFAULT_USER_TEMPLATE)
+
+
+class PromptTemplates:
+    """
+    提示词模板集合
+
+    首次使用时按 ai.prompts 配置覆盖内置模板并预编译，配置有误的模板回退到内置模板
+    """
+
+    def __init__(self):
+        self._templates: Optional[Dict[str, PromptTemplate]] = None
+
+    def _compile(self) -> Dict[str, PromptTemplate]:
+        """编译所有模板"""
+        templates = {}
+        names = set(BUILTIN_TEMPLATES) | set(settings.ai.prompts)
+        for name in names:
+            base = _builtin(name if name in BUILTIN_TEMPLATES else DEFAULT_TEMPLATE)
+            override = settings.ai.prompts.get(name)
+            if override is None:
+                templates[name] = base
+                continue
+            try:
+                templates[name] = PromptTemplate(
+                    name,
+                    override.system or base.system,
+                    override.user or base.user,
+                    override.max_tokens or base.max_tokens,
+                )
+            except ValueError as e:
+                logger.error(f"❌ {e}，使用内置模板")
+                templates[name] = PromptTemplate(name, base.system, base.user, base.max_tokens)
+        return templates
+
+    def get(self, question_type: str) -> PromptTemplate:
+        """
+        获取题目类型对应的模板
+
+        Args:
+            question_type: 题目类型，未知类型使用单选题模板
+
+        Returns:
+            提示词模板
+        """
+        if self._templates is None:
+            self._templates = self._compile()
+        return self._templates.get(question_type) or self._templates[DEFAULT_TEMPLATE]
+
+    def reload(self) -> None:
+        """丢弃已编译的模板，下次使用时按当前配置重新编译"""
+        self._templates = None
+
+
+# 全局提示词模板实例
+prompt_templates = PromptTemplates()
@@ -1,11 +1,24 @@
 """查询服务 - 协调数据库、缓存、AI服务的核心业务逻辑"""
+import asyncio
+import time
+from typing import Optional
 from app.repositories.question_repository import QuestionRepository
 from app.services.cache_service import CacheService
+from app.services.cache_refresh_service import cache_refresh_service
 from app.services.ai_service import AIAsyncService
+from app.services.answer_task_service import answer_task_service
 from app.schemas.query import QueryRequest, QueryResponse
+from app.core.config import settings
+from app.core.deadline import Deadline, reset_deadline, set_deadline
 from app.core.logger import get_logger
+from app.core.metrics import QUERY_TOTAL, QUERY_DEADLINE_EXCEEDED, CACHE_REQUESTS, DB_LOOKUP_SECONDS
+from app.core.timeseries import query_timeseries
+from app.services.access_stats_service import access_stats_service
+from app.middleware.timing import stage_timer
+from app.middleware.rate_limit import RateLimitExceeded, check_ai_quota
 
 logger = get_logger(__name__)
+sampled_logger = get_logger(__name__, sampled=True)
 
 
 class QueryService:
@@ -28,39 +41,78 @@ class QueryService:
         self.cache_service = cache_service
         self.ai_service = ai_service
 
-    async def query(self, request: QueryRequest) -> QueryResponse:
+    async def query(self, request: QueryRequest, deadline: Optional[Deadline] = None) -> QueryResponse:
         """
         查询问题答案
 
         查询策略:
         1. 尝试从缓存获取
         2. 从数据库查询
-        3. 调用AI服务
+        3. 调用AI服务（只等待剩余的时间预算）
         4. 保存到数据库和缓存
 
         Args:
             request: 查询请求
+            deadline: 客户端的截止时间，None表示不限制
 
         Returns:
             查询响应
         """
-        # 1. 尝试从缓存获取
-        cached_answer = await self.cache_service.get(request.title)
-        if cached_answer:
-            logger.info(f"✅ 缓存命中: {request.title[:50]}...")
+        start = time.perf_counter()
+        token = set_deadline(deadline)
+        try:
+            response = await self._resolve(request, deadline)
+        except RateLimitExceeded:
+            # 限流是对客户端的正常拒绝，不计为查询错误
+            raise
+        except Exception:
+            query_timeseries.record_error()
+            raise
+        finally:
+            reset_deadline(token)
+
+        QUERY_TOTAL.labels(response.source).inc()
+        query_timeseries.record_query(response.source, (time.perf_counter() - start) * 1000)
+        access_stats_service.record(request.title, response.source)
+        return response
+
+    async def _resolve(self, request: QueryRequest, deadline: Optional[Deadline]) -> QueryResponse:
+        """
+        按 缓存 -> 数据库 -> AI 的顺序查找答案
+
+        Args:
+            request: 查询请求
+            deadline: 客户端的截止时间
+
+        Returns:
+            查询响应
+        """
+        # 1. 尝试从缓存获取（已变旧的答案照常返回，由后台任务刷新）
+        with stage_timer("cache"):
+            cached = await self.cache_service.get_entry(request.title)
+        if cached is not None and cached.value:
+            CACHE_REQUESTS.labels("stale" if cached.is_stale() else "hit").inc()
+            if cached.should_refresh(settings.cache.early_refresh_beta):
+                cache_refresh_service.schedule(request.title)
+            sampled_logger.info("缓存命中: {}", request.title[:50])
             return QueryResponse(
                 code=1,
-                data=cached_answer,
+                data=cached.value,
                 msg="缓存命中",
                 source="cache"
             )
+        CACHE_REQUESTS.labels("miss").inc()
 
         # 2. 查询数据库
-        db_question = await self.question_repo.find_by_question(request.title)
+        db_start = time.perf_counter()
+        with stage_timer("db"), DB_LOOKUP_SECONDS.time():
+            db_question = await self.question_repo.find_by_question(request.title)
+        db_cost = time.perf_counter() - db_start
         if db_question:
-            logger.info(f"✅ 数据库命中: {request.title[:50]}...")
+            sampled_logger.info("数据库命中: {}", request.title[:50])
             # 更新缓存
-            await self.cache_service.set(request.title, db_question.answer)
+            with stage_timer("cache"):
+                await self.cache_service.set(request.title, db_question.answer, cost=db_cost)
             return QueryResponse(
                 code=1,
                 data=db_question.answer,
@@ -68,29 +120,35 @@ class QueryService:
                 source="database"
             )
 
-        # 3. 调用AI服务
-        logger.info(f"🤖 调用AI服务: {request.title[:50]}...")
-        ai_answer = await self.ai_service.get_answer(
-            title=request.title,
-            options=request.options,
-            question_type=request.type.value
-        )
+        # 等待AI期间不再使用本请求的数据库会话，答案由AI任务用独立会话写入
+        await self.question_repo.release()
 
-        if ai_answer:
-            # 保存到数据库
+        # 3. 调用AI服务（单独的AI额度，超出时抛出 RateLimitExceeded）
+        #    同一道题已有AI任务在进行时直接等待该任务，不重复调用也不重复计额度
+        task = answer_task_service.get(request.title)
+        if task is None:
+            await check_ai_quota()
+            sampled_logger.info("调用AI服务: {}", request.title[:50])
+            task = answer_task_service.start(request, self.ai_service)
+        else:
+            # 加入的可能是预取发起的后台任务，实时查询在等待，提升其优先级
+            answer_task_service.promote(task)
+
+        with stage_timer("ai"):
             try:
-                await self.question_repo.create_question(
-                    question=request.title,
-                    answer=ai_answer,
-                    options=request.options,
-                    question_type=request.type.value
+                ai_answer = await answer_task_service.wait(task, deadline.remaining() if deadline else None)
+            except asyncio.TimeoutError:
+                background = answer_task_service.can_detach(task)
+                QUERY_DEADLINE_EXCEEDED.labels("background" if background else "cancelled").inc()
+                logger.warning("AI回答超出客户端时间预算: {}", request.title[:50])
+                return QueryResponse(
+                    code=0,
+                    data=None,
+                    msg="AI回答超时，答案生成后重试即可获取" if background else "AI回答超时",
+                    source="pending" if background else "none"
                 )
-                # 更新缓存
-                await self.cache_service.set(request.title, ai_answer)
-                logger.info(f"✅ AI答案已保存: {request.title[:50]}...")
-            except Exception as e:
-                logger.error(f"❌ 保存AI答案失败: {e}")
 
+        if ai_answer:
             return QueryResponse(
                 code=1,
                 data=ai_answer,
@@ -99,7 +157,7 @@ class QueryService:
             )
 
         # 4. 未找到答案
-        logger.warning(f"❌ 未找到答案: {request.title[:50]}...")
+        logger.warning("未找到答案: {}", request.title[:50])
         return QueryResponse(
             code=0,
             data=None,
@@ -0,0 +1,153 @@
+"""流量统计服务 - 分钟级统计的定时汇总写库与历史查询"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlmodel import select
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.logger import get_logger
+from app.core.timeseries import SOURCES, query_timeseries
+from app.models.stats import QueryStatsMinute
+
+logger = get_logger(__name__)
+
+
+class StatsRollupService:
+    """
+    分钟级统计汇总服务
+
+    定时将环形缓冲区中已结束的分钟写入 query_stats_minute 表，
+    每个分钟只写一次，写库失败的分钟会在下次重试。
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._last_minute = int(time.time() // 60) - 1
+
+    def start(self) -> None:
+        """启动后台汇总任务"""
+        if not settings.stats.rollup_enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"📊 流量统计汇总已启动，间隔 {settings.stats.rollup_interval} 秒")
+
+    async def stop(self) -> None:
+        """停止后台任务，并写入剩余数据"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        """后台循环"""
+        while True:
+            await asyncio.sleep(settings.stats.rollup_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        将已结束的分钟统计写入数据库
+
+        Returns:
+            写入的行数
+        """
+        buckets = query_timeseries.completed_buckets(self._last_minute)
+        if not buckets:
+            return 0
+
+        worker = os.getpid()
+        rows = []
+        for bucket in buckets:
+            data = bucket.to_dict()
+            rows.append(QueryStatsMinute(
+                minute=datetime.utcfromtimestamp(data["minute"]),
+                worker=worker,
+                total=data["total"],
+                cache_hits=data["sources"]["cache"],
+                database_hits=data["sources"]["database"],
+                ai_answers=data["sources"]["ai"],
+                pending=data["sources"]["pending"],
+                misses=data["sources"]["none"],
+                p50_ms=data["p50_ms"],
+                p95_ms=data["p95_ms"],
+                ai_calls=data["ai_calls"],
+                ai_errors=data["ai_errors"],
+                errors=data["errors"],
+            ))
+
+        try:
+            async with async_session_maker() as session:
+                session.add_all(rows)
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"⚠️  流量统计写库失败: {e}")
+            return 0
+
+        self._last_minute = buckets[-1].minute
+        logger.debug("流量统计已写库: {} 分钟", len(rows))
+        return len(rows)
+
+
+async def get_history(minutes: int = 1440) -> List[dict]:
+    """
+    从数据库读取历史分钟统计（合并所有worker）
+
+    百分位数无法精确合并，这里取各worker中的最大值作为近似。
+
+    Args:
+        minutes: 最近的分钟数
+
+    Returns:
+        每分钟一条的字典列表（按时间升序）
+    """
+    since = datetime.utcfromtimestamp((int(time.time() // 60) - minutes) * 60)
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(QueryStatsMinute)
+            .where(QueryStatsMinute.minute > since)
+            .order_by(QueryStatsMinute.minute)
+        )
+        rows = result.scalars().all()
+
+    merged: dict = {}
+    for row in rows:
+        point = merged.get(row.minute)
+        if point is None:
+            point = merged[row.minute] = {
+                "minute": int(row.minute.replace(tzinfo=timezone.utc).timestamp()),
+                "total": 0,
+                "sources": dict.fromkeys(SOURCES, 0),
+                "p50_ms": 0.0,
+                "p95_ms": 0.0,
+                "ai_calls": 0,
+                "ai_errors": 0,
+                "errors": 0,
+            }
+        point["total"] += row.total
+        point["sources"]["cache"] += row.cache_hits
+        point["sources"]["database"] += row.database_hits
+        point["sources"]["ai"] += row.ai_answers
+        point["sources"]["pending"] += row.pending
+        point["sources"]["none"] += row.misses
+        point["p50_ms"] = max(point["p50_ms"], row.p50_ms)
+        point["p95_ms"] = max(point["p95_ms"], row.p95_ms)
+        point["ai_calls"] += row.ai_calls
+        point["ai_errors"] += row.ai_errors
+        point["errors"] += row.errors
+
+    points = list(merged.values())
+    for point in points:
+        hits = point["sources"]["cache"] + point["sources"]["database"]
+        point["hit_ratio"] = round(hits / point["total"], 4) if point["total"] else 0.0
+    return points
+
+
+# 全局汇总服务实例
+stats_rollup_service = StatsRollupService()
@@ -0,0 +1,126 @@
+"""缓存预热服务 - 启动时从数据库分批加载热门题目到缓存"""
+import asyncio
+import time
+from typing import Optional
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.logger import get_logger
+from app.repositories.question_repository import QuestionRepository
+from app.services.cache_service import CacheService
+
+logger = get_logger(__name__)
+
+# Redis模式下只需一个worker执行预热，其余worker等待完成标记
+WARMUP_LOCK_KEY = "qb:warmup:lock"
+WARMUP_DONE_KEY = "qb:warmup:done"
+WARMUP_LOCK_TTL = 300
+
+
+class CacheWarmupService:
+    """
+    缓存预热服务
+
+    在后台分批加载题目到缓存，不阻塞应用启动；
+    预热完成前 ready 为False，/ready 端点返回503，便于负载均衡等待。
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.loaded = 0
+        self.duration: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """启动后台预热任务"""
+        if not settings.cache.warmup_enabled or settings.cache.warmup_limit <= 0:
+            self.ready = True
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """取消尚未完成的预热任务"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def status(self) -> dict:
+        """获取预热状态"""
+        return {
+            "ready": self.ready,
+            "loaded": self.loaded,
+            "target": settings.cache.warmup_limit,
+            "duration_seconds": round(self.duration, 3) if self.duration is not None else None,
+        }
+
+    async def _run(self) -> None:
+        """后台预热流程"""
+        start = time.perf_counter()
+        try:
+            redis = await self._get_redis()
+            if redis is not None and not await redis.set(WARMUP_LOCK_KEY, "1", nx=True, ex=WARMUP_LOCK_TTL):
+                await self._wait_for_other_worker(redis)
+                return
+
+            await self._load()
+
+            if redis is not None:
+                await redis.set(WARMUP_DONE_KEY, "1", ex=settings.cache.ttl)
+                await redis.delete(WARMUP_LOCK_KEY)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️  缓存预热失败: {e}")
+        finally:
+            self.duration = time.perf_counter() - start
+            self.ready = True
+
+        logger.info(f"🔥 缓存预热完成: {self.loaded} 道题目，耗时 {self.duration:.2f}s")
+
+    async def _get_redis(self):
+        """Redis缓存模式下返回Redis客户端，否则返回None"""
+        if settings.cache.type.lower() != "redis":
+            return None
+        from app.core.redis import redis_manager
+        return await redis_manager.get_redis()
+
+    async def _wait_for_other_worker(self, redis) -> None:
+        """等待持有锁的worker完成预热（锁过期视为对方已退出）"""
+        logger.info("🔥 其他worker正在预热Redis缓存，等待完成...")
+        while not await redis.exists(WARMUP_DONE_KEY) and await redis.exists(WARMUP_LOCK_KEY):
+            await asyncio.sleep(1)
+
+    async def _load(self) -> None:
+        """分批从数据库读取题目并写入缓存"""
+        limit = settings.cache.warmup_limit
+        batch_size = max(1, settings.cache.warmup_batch_size)
+        cache_service = CacheService()
+
+        hot = settings.cache.warmup_strategy == "hot"
+
+        logger.info(
+            f"🔥 开始缓存预热: 目标 {limit} 道{'热门' if hot else '最新'}题目，每批 {batch_size} 道"
+        )
+
+        while self.loaded < limit:
+            async with async_session_maker() as session:
+                repo = QuestionRepository(session)
+                load_batch = repo.get_hot_answers if hot else repo.get_recent_answers
+                rows = await load_batch(skip=self.loaded, limit=min(batch_size, limit - self.loaded))
+            if not rows:
+                break
+
+            await cache_service.set_many(dict(rows))
+            self.loaded += len(rows)
+            logger.debug("缓存预热进度: {}/{}", self.loaded, limit)
+
+            # 让出事件循环，避免影响已经进来的请求
+            await asyncio.sleep(0)
+
+
+# 全局预热服务实例
+cache_warmup_service = CacheWarmupService()
@@ -3,7 +3,7 @@ import re
 from typing import Optional
 from app.core.logger import get_logger
 
-logger = get_logger(__name__)
+logger = get_logger(__name__, sampled=True)
 
 
 def match_option(answer: str, options: str) -> str:
@@ -44,22 +44,22 @@ def match_option(answer: str, options: str) -> str:
     # 1. 尝试结构化选项精确匹配
     for option in option_list:
         if answer == option['content']:
-            logger.info(f"✅ 精确匹配: '{answer}' -> '{option['full']}'")
+            logger.debug("精确匹配: '{}' -> '{}'", answer, option['full'])
             return option['full']
     
     # 2. 尝试结构化选项包含匹配
     for option in option_list:
         if option['content'] in answer or answer in option['content']:
-            logger.info(f"✅ 包含匹配: '{answer}' -> '{option['full']}'")
+            logger.debug("包含匹配: '{}' -> '{}'", answer, option['full'])
             return option['full']
             
     # 3. 如果没有结构化选项或匹配失败，尝试原始选项匹配 (针对判断题/简单选项)
     if answer in raw_options:
-        logger.info(f"✅ 原始选项匹配: '{answer}'")
+        logger.debug("原始选项匹配: '{}'", answer)
         return answer
     
     # 如果都匹配不上，返回原答案
-    logger.warning(f"⚠️ 无法匹配答案: {answer} (选项: {options})")
+    logger.warning("无法匹配答案: {} (选项: {})", answer, options)
     return answer
 
 
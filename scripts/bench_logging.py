@@ -0,0 +1,75 @@
+"""日志吞吐量基准测试 - 对比同步即时格式化与异步队列+延迟格式化+采样
+
+用法:
+    uv run python scripts/bench_logging.py --requests 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger  # noqa: E402
+from app.core.logger import LogFilter, setup_logger  # noqa: E402
+
+FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} | {message}"
+TITLE = "计算机网络中，TCP协议属于OSI参考模型的哪一层？请从下列选项中选择正确答案" * 2
+ANSWER = "D. 传输层"
+
+
+def run_baseline(log_file: str, requests: int) -> float:
+    """旧方案：同步文件sink + f-string即时格式化，每个请求都写日志"""
+    logger.remove()
+    logger.add(log_file, level="INFO", format=FORMAT)
+    log = logger.bind(name="bench")
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        log.info(f"🤖 调用AI服务: {TITLE[:50]}...")
+        log.info(f"✅ AI返回答案: {TITLE[:50]}... -> {ANSWER[:50]}...")
+        log.info(f"✅ AI答案已保存: {TITLE[:50]}...")
+        log.debug(f"📝 内存缓存已设置: {TITLE[:50]}...")
+    logger.complete()
+    return time.perf_counter() - start
+
+
+def run_optimized(log_file: str, requests: int, per_second: int) -> float:
+    """新方案：异步队列sink + 延迟格式化 + 按调用点限流"""
+    logger.remove()
+    log_filter = LogFilter("INFO", {}, sample_rate=1.0, per_second=per_second)
+    logger.add(log_file, level=log_filter.min_level, filter=log_filter, format=FORMAT, enqueue=True)
+    log = logger.bind(name="bench", sampled=True)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        log.info("调用AI服务: {}", TITLE[:50])
+        log.info("AI返回答案: {} -> {}", TITLE[:50], ANSWER[:50])
+        log.info("AI答案已保存: {}", TITLE[:50])
+        log.debug("内存缓存已设置: {}", TITLE[:50])
+    logger.complete()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志吞吐量基准测试")
+    parser.add_argument("--requests", type=int, default=20000, help="模拟的请求数")
+    parser.add_argument("--per-second", type=int, default=20, help="每个调用点每秒最多输出条数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = run_baseline(str(Path(tmp) / "baseline.log"), args.requests)
+        optimized = run_optimized(str(Path(tmp) / "optimized.log"), args.requests, args.per_second)
+
+    # 恢复应用默认日志配置
+    setup_logger()
+
+    print(f"请求数: {args.requests}")
+    print(f"同步+即时格式化:   {baseline:.3f}s  ({args.requests / baseline:,.0f} req/s)")
+    print(f"异步队列+采样限流: {optimized:.3f}s  ({args.requests / optimized:,.0f} req/s)")
+    print(f"加速比: {baseline / optimized:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""AI服务商并发基准测试 - 报告p50/p90/p99延迟、首token耗时、吞吐量、错误率和token用量
+
+用法:
+    uv run python scripts/bench_providers.py --providers siliconflow,zhipu --requests 100 --concurrency 10
+    uv run python scripts/bench_providers.py --stub --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.benchmark.provider_bench import run_benchmark  # noqa: E402
+from app.benchmark.stub import serve_stub  # noqa: E402
+from app.core.config import AIProviderConfig, settings  # noqa: E402
+
+STUB_PROVIDER = "stub"
+
+
+def print_report(report: dict) -> None:
+    """输出一个服务商的报告"""
+    if "error" in report:
+        print(f"[{report['provider']}] ❌ {report['error']}")
+        return
+    latency, ttft, tokens = report["latency_ms"], report["ttft_ms"], report["tokens"]
+    print(f"[{report['provider']}] {report['name']} ({report['model']})")
+    print(f"  请求: {report['requests']}  并发: {report['concurrency']}  流式: {report['stream']}  耗时: {report['duration']}s")
+    print(f"  延迟(ms):    p50 {latency['p50']:>9}  p90 {latency['p90']:>9}  p99 {latency['p99']:>9}  max {latency['max']:>9}")
+    print(f"  首token(ms): p50 {ttft['p50']:>9}  p90 {ttft['p90']:>9}  p99 {ttft['p99']:>9}")
+    print(f"  吞吐量: {report['throughput']} req/s  错误率: {report['error_rate']:.2%}  {report['errors_by_type'] or ''}")
+    print(f"  token: prompt {tokens['prompt']}  completion {tokens['completion']}  ({tokens['completion_per_second']}/s)")
+
+
+async def run(args: argparse.Namespace) -> list:
+    """运行基准测试，--stub 时先启动本地桩服务"""
+    providers = [p for p in args.providers.split(",") if p] if args.providers else []
+    if not args.stub:
+        return await run_benchmark(providers, args.requests, args.concurrency, not args.no_stream, args.timeout)
+
+    async with serve_stub(latency=args.stub_latency, jitter=args.stub_latency / 2,
+                          error_rate=args.stub_error_rate) as url:
+        settings.ai.providers[STUB_PROVIDER] = AIProviderConfig(
+            name="本地桩服务", api_key="stub", api_url=url, model="stub-model",
+        )
+        return await run_benchmark(
+            providers + [STUB_PROVIDER], args.requests, args.concurrency, not args.no_stream, args.timeout,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI服务商并发基准测试")
+    parser.add_argument("--providers", default="", help="服务商标识符，逗号分隔（config.json 中 ai.providers 的键）")
+    parser.add_argument("--requests", "-n", type=int, default=50, help="每个服务商的请求数")
+    parser.add_argument("--concurrency", "-c", type=int, default=5, help="并发数")
+    parser.add_argument("--no-stream", action="store_true", help="使用非流式请求（首token耗时等于总耗时）")
+    parser.add_argument("--timeout", type=float, default=None, help="单次请求超时（秒），默认 ai.timeout")
+    parser.add_argument("--stub", action="store_true", help="同时测试本地OpenAI兼容桩服务")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="桩服务平均耗时（秒）")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="桩服务返回500的概率")
+    parser.add_argument("--output", help="把报告保存为JSON文件")
+    args = parser.parse_args()
+
+    if not args.providers and not args.stub:
+        parser.error("请指定 --providers 或 --stub")
+
+    reports = asyncio.run(run(args))
+    for report in reports:
+        print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"报告已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
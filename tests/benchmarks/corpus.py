@@ -0,0 +1,45 @@
+"""微基准测试语料 - 接近真实查询的题目、选项和AI响应"""
+
+LONG_OPTIONS = " ".join(
+    f"{letter}. 在分布式数据库系统中，为了保证事务的原子性和持久性，通常采用两阶段提交协议并配合预写日志第{index}种实现方式"
+    for index, letter in enumerate("ABCDEFGH", start=1)
+)
+
+# (用例名, 答案, 选项)
+MATCH_CASES = [
+    ("prefixed", "B. 传输层", "A. 网络层 B. 传输层 C. 会话层 D. 应用层"),
+    ("content", "传输层", "A.网络层 B.传输层 C.会话层 D.应用层"),
+    ("contains", "采用两阶段提交协议并配合预写日志第7种实现方式", LONG_OPTIONS),
+    ("judgement", "对", "对 错"),
+    ("unmatched", "以上都不对", "A.网络层 B.传输层 C.会话层 D.应用层"),
+]
+
+REASONING = "。".join(
+    f"第{i}步：分析题干中的关键词，排除与OSI参考模型第{i}层无关的选项，并核对教材中的定义" for i in range(1, 41)
+)
+
+# (用例名, AI原始响应)
+PARSE_CASES = [
+    ("json", '{"answer": "B. 传输层"}'),
+    ("multiple", '{"answer": "A. 封装###B. 继承###C. 多态"}'),
+    ("markdown", '根据题意分析如下：\n```json\n{"answer": "A. 关系模型"}\n```\n以上为最终答案。'),
+    ("reasoning", f'<think>{REASONING}</think>\n{{"answer": "B. 传输层"}}'),
+    ("plain", "答案是：对"),
+]
+
+LONG_TITLE = "阅读下面的材料并回答问题：" + "我国在推进高水平科技自立自强的过程中，坚持创新在现代化建设全局中的核心地位，" * 10
+
+# (用例名, 题目, 选项, 题型)
+PROMPT_CASES = [
+    ("single", "计算机网络中，TCP协议属于OSI参考模型的哪一层？", "A. 网络层 B. 传输层 C. 会话层 D. 应用层", "single"),
+    ("multiple", "以下属于面向对象程序设计基本特征的有？", "A. 封装 B. 继承 C. 多态 D. 编译", "multiple"),
+    ("judgement", "HTTP是无状态协议。", "", "judgement"),
+    ("long", LONG_TITLE, LONG_OPTIONS, "single"),
+]
+
+# (用例名, 请求参数)
+REQUEST_CASES = [
+    ("short", {"title": "中国的首都是哪里？", "options": "A. 北京 B. 上海 C. 广州", "type": "single"}),
+    ("long", {"title": f"  {LONG_TITLE[:490]}  ", "options": LONG_OPTIONS[:1000], "type": "multiple"}),
+    ("defaults", {"title": "HTTP是无状态协议。"}),
+]
@@ -0,0 +1,74 @@
+"""
+热点函数微基准测试 - 每次查询都会执行的解析和匹配函数
+
+运行:
+    pytest tests/benchmarks                                  # 运行并检查回归阈值
+    pytest tests/benchmarks --benchmark-autosave             # 保存本次结果到 .benchmarks/
+    pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+                                                             # 与上次保存的结果对比，均值变慢超过20%时失败
+
+REGRESSION_THRESHOLDS 是单次调用平均耗时的上限（微秒），
+按开发机上各函数最慢用例的实测值留出约10倍余量，只用于拦截数量级的退化；
+细粒度的对比请使用 --benchmark-compare。
+未安装 pytest-benchmark 时整个模块跳过。
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.schemas.query import QueryRequest  # noqa: E402
+from app.services.ai_service import AIAsyncService  # noqa: E402
+from app.utils.helpers import match_option  # noqa: E402
+from tests.benchmarks.corpus import MATCH_CASES, PARSE_CASES, PROMPT_CASES, REQUEST_CASES  # noqa: E402
+
+# 单次调用平均耗时上限（微秒）
+REGRESSION_THRESHOLDS = {
+    "match_option": 500,
+    "parse_response": 50,
+    "build_prompt": 1500,
+    "query_request": 50,
+}
+
+
+@pytest.fixture(scope="module")
+def ai_service() -> AIAsyncService:
+    """只使用解析和提示词构建，不会发出请求"""
+    return AIAsyncService()
+
+
+def check_threshold(benchmark, name: str):
+    """检查平均耗时是否超过回归阈值（--benchmark-disable 时只执行一次，没有统计数据）"""
+    if benchmark.disabled:
+        return
+    mean_us = benchmark.stats.stats.mean * 1_000_000
+    assert mean_us < REGRESSION_THRESHOLDS[name], (
+        f"{name} 平均耗时 {mean_us:.1f}µs 超过阈值 {REGRESSION_THRESHOLDS[name]}µs"
+    )
+
+
+@pytest.mark.parametrize("answer,options", [c[1:] for c in MATCH_CASES], ids=[c[0] for c in MATCH_CASES])
+def test_match_option(benchmark, answer, options):
+    result = benchmark(match_option, answer, options)
+    assert result
+    check_threshold(benchmark, "match_option")
+
+
+@pytest.mark.parametrize("response", [c[1] for c in PARSE_CASES], ids=[c[0] for c in PARSE_CASES])
+def test_parse_response(benchmark, ai_service, response):
+    result = benchmark(ai_service._parse_response, response)
+    assert result
+    check_threshold(benchmark, "parse_response")
+
+
+@pytest.mark.parametrize("title,options,question_type", [c[1:] for c in PROMPT_CASES], ids=[c[0] for c in PROMPT_CASES])
+def test_build_prompt(benchmark, ai_service, title, options, question_type):
+    prompt = benchmark(ai_service._build_prompt, title, options, question_type)
+    assert title in prompt.user
+    check_threshold(benchmark, "build_prompt")
+
+
+@pytest.mark.parametrize("payload", [c[1] for c in REQUEST_CASES], ids=[c[0] for c in REQUEST_CASES])
+def test_query_request_validation(benchmark, payload):
+    request = benchmark(QueryRequest.model_validate, payload)
+    assert request.title == payload["title"].strip()
+    check_threshold(benchmark, "query_request")
@@ -0,0 +1,28 @@
+"""测试公共配置 - 使用临时SQLite数据库和内存缓存，不依赖本地 config.json 和 Redis"""
+import os
+import tempfile
+from pathlib import Path
+
+# 数据库引擎在导入 app.core.db 时创建，必须在导入应用模块之前设置
+_workdir = Path(tempfile.mkdtemp(prefix="ocs-tiku-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_workdir / 'test.db'}"
+os.environ.pop("REDIS_HOST", None)
+
+import pytest  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+settings.cache.type = "memory"
+settings.cache.snapshot_enabled = False
+
+
+@pytest.fixture
+async def database():
+    """建表，测试结束后删表并释放连接（每个测试使用独立的事件循环）"""
+    from sqlmodel import SQLModel
+    from app.core.db import engine, init_db
+
+    await init_db()
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    await engine.dispose()
@@ -0,0 +1,264 @@
+"""查询链路端到端压测 - 进程内启动应用和本地AI桩服务，按固定并发发送混合流量
+
+流量由四类请求组成：
+    cache      已缓存的热门题目
+    database   题库中有、缓存中没有的题目（每题只查一次）
+    ai         题库中没有的新题目（由本地桩服务回答）
+    duplicate  同一道新题目的多个并发请求（验证AI调用去重）
+
+报告按答案来源和请求类别统计RPS与延迟分位数，保存为JSON便于不同版本对比。
+本文件不以 test_ 开头，不会被 pytest 收集。
+
+用法:
+    uv run python -m tests.load.run_load --bank-size 5000 --requests 2000 --concurrency 50 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.core.config import settings  # noqa: E402
+
+CATEGORIES = ("cache", "database", "ai", "duplicate")
+
+OPTIONS = [
+    "A. 传输层 B. 网络层 C. 会话层 D. 应用层",
+    "A. 关系模型 B. 层次模型 C. 网状模型 D. 面向对象模型",
+    "A. 封装 B. 继承 C. 多态 D. 编译",
+    "",
+]
+TYPES = ["single", "single", "multiple", "judgement"]
+
+
+class Planned(NamedTuple):
+    """计划发送的请求"""
+    category: str
+    title: str
+    options: str
+    type: str
+
+
+class Result(NamedTuple):
+    """单个请求的结果"""
+    category: str
+    source: str
+    status: int
+    latency: float
+
+
+def synthetic_question(index: int, prefix: str = "压测题目") -> Planned:
+    """生成第 index 道合成题目"""
+    kind = index % len(OPTIONS)
+    title = f"{prefix}{index:06d}：下列关于计算机网络与数据库系统的说法中，哪一项是正确的？"
+    return Planned("", title, OPTIONS[kind], TYPES[kind])
+
+
+def configure(workdir: Path, stub_url: str, args: argparse.Namespace) -> None:
+    """把应用配置指向临时数据库和本地桩服务（必须在导入应用模块之前调用）"""
+    from app.core.config import AIProviderConfig
+
+    settings.database.url = f"sqlite+aiosqlite:///{workdir / 'load.db'}"
+    settings.cache.type = "memory"
+    settings.cache.warmup_enabled = False
+    settings.cache.snapshot_enabled = False
+    settings.cache.max_entries = max(settings.cache.max_entries, args.bank_size + args.requests)
+    settings.rate_limit.enabled = False
+    settings.prefetch.enabled = False
+    settings.logging.level = "WARNING"
+    settings.logging.file = str(workdir / "load.log")
+    settings.ai.providers["stub"] = AIProviderConfig(
+        name="本地桩服务", api_key="stub", api_url=stub_url, model="stub-model",
+    )
+    settings.ai.default_provider = "stub"
+
+    from app.core.logger import setup_logger
+    setup_logger()
+
+
+async def seed_bank(size: int) -> List[Planned]:
+    """建表并写入 size 道合成题目"""
+    from app.core.db import async_session_maker, init_db
+    from app.models.question import Question
+
+    await init_db()
+    bank = [synthetic_question(i) for i in range(size)]
+    async with async_session_maker() as session:
+        for start in range(0, size, 1000):
+            session.add_all([
+                Question(question=q.title, answer=q.options.split(" B.")[0] or "对", options=q.options, type=q.type)
+                for q in bank[start:start + 1000]
+            ])
+            await session.commit()
+    return bank
+
+
+def build_plan(bank: List[Planned], args: argparse.Namespace) -> List[Planned]:
+    """
+    按流量比例生成请求计划（固定随机种子，结果可复现）
+
+    database 类请求依次使用未缓存的题库题目，用完后退化为缓存命中；
+    duplicate 类请求成组相邻出现，保证同一题目的请求并发到达
+    """
+    rng = random.Random(args.seed)
+    hot = bank[:args.hot_size]
+    cold = iter(bank[args.hot_size:])
+    weights = [args.cache_ratio, args.db_ratio, args.ai_ratio, args.duplicate_ratio]
+
+    plan: List[Planned] = []
+    new_index = 0
+    while len(plan) < args.requests:
+        category = rng.choices(CATEGORIES, weights)[0]
+        if category == "cache":
+            q = rng.choice(hot)
+            plan.append(q._replace(category=category))
+        elif category == "database":
+            q = next(cold, None) or rng.choice(hot)
+            plan.append(q._replace(category=category))
+        else:
+            q = synthetic_question(new_index, prefix="新题")._replace(category=category)
+            new_index += 1
+            copies = args.duplicate_factor if category == "duplicate" else 1
+            plan.extend([q] * copies)
+    return plan[:args.requests]
+
+
+async def drive(client, plan: List[Planned], concurrency: int) -> List[Result]:
+    """以固定并发发送请求"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(q: Planned) -> Result:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(
+                    "/api/v1/query", params={"title": q.title, "options": q.options, "type": q.type},
+                )
+                source = response.json().get("source", "error") if response.status_code == 200 else "error"
+                return Result(q.category, source, response.status_code, time.perf_counter() - start)
+            except Exception:
+                return Result(q.category, "error", 0, time.perf_counter() - start)
+
+    return list(await asyncio.gather(*(send(q) for q in plan)))
+
+
+def summarize(results: List[Result], duration: float) -> Dict:
+    """统计总体、按答案来源和按请求类别的RPS与延迟分位数（毫秒）"""
+    from app.core.timeseries import percentile
+
+    def stats(items: List[Result]) -> Dict:
+        latencies = sorted(r.latency * 1000 for r in items)
+        return {
+            "count": len(items),
+            "rps": round(len(items) / duration, 2) if duration else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p90": round(percentile(latencies, 90), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        }
+
+    by_source, by_category = defaultdict(list), defaultdict(list)
+    for r in results:
+        by_source[r.source].append(r)
+        by_category[r.category].append(r)
+
+    return {
+        "overall": {**stats(results), "errors": sum(1 for r in results if r.status != 200)},
+        "by_source": {source: stats(items) for source, items in sorted(by_source.items())},
+        "by_category": {category: stats(items) for category, items in sorted(by_category.items())},
+    }
+
+
+def git_revision() -> str:
+    """当前代码版本（不在git仓库中时为空）"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    """启动桩服务和应用，写入题库，预热热门题目后发送压测流量"""
+    from app.benchmark.stub import serve_stub
+
+    with tempfile.TemporaryDirectory() as tmp:
+        async with serve_stub(latency=args.ai_latency, jitter=args.ai_latency / 4) as stub_url:
+            configure(Path(tmp), stub_url, args)
+
+            import httpx
+            from app.main import app
+
+            bank = await seed_bank(args.bank_size)
+            plan = build_plan(bank, args)
+
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+                    # 预热：热门题目各查一次写入缓存
+                    await drive(client, [q._replace(category="warmup") for q in bank[:args.hot_size]], args.concurrency)
+
+                    start = time.perf_counter()
+                    results = await drive(client, plan, args.concurrency)
+                    duration = time.perf_counter() - start
+
+    report = summarize(results, duration)
+    report["meta"] = {
+        "version": settings.app.version,
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "duration": round(duration, 3),
+        "args": vars(args),
+    }
+    return report
+
+
+def print_report(report: Dict) -> None:
+    """输出压测结果表格"""
+    overall = report["overall"]
+    print(f"总计: {overall['count']} 个请求，{report['meta']['duration']}s，"
+          f"{overall['rps']} req/s，错误 {overall['errors']}")
+    for title, key in (("按答案来源", "by_source"), ("按请求类别", "by_category")):
+        print(f"\n{title}:")
+        print(f"  {'':<10}{'count':>8}{'rps':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+        for name, s in report[key].items():
+            print(f"  {name:<10}{s['count']:>8}{s['rps']:>10}{s['p50']:>10}{s['p90']:>10}{s['p99']:>10}{s['max']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询链路端到端压测")
+    parser.add_argument("--bank-size", type=int, default=2000, help="合成题库的题目数")
+    parser.add_argument("--hot-size", type=int, default=100, help="预先缓存的热门题目数")
+    parser.add_argument("--requests", "-n", type=int, default=1000, help="压测请求总数")
+    parser.add_argument("--concurrency", "-c", type=int, default=20, help="并发数")
+    parser.add_argument("--cache-ratio", type=float, default=0.6, help="缓存命中类请求占比")
+    parser.add_argument("--db-ratio", type=float, default=0.2, help="数据库命中类请求占比")
+    parser.add_argument("--ai-ratio", type=float, default=0.1, help="AI类请求占比")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="重复并发请求组的占比")
+    parser.add_argument("--duplicate-factor", type=int, default=5, help="每组重复请求的个数")
+    parser.add_argument("--ai-latency", type=float, default=0.3, help="桩服务平均响应耗时（秒）")
+    parser.add_argument("--seed", type=int, default=42, help="流量计划的随机种子")
+    parser.add_argument("--output", help="把结果保存为JSON文件")
+    args = parser.parse_args()
+    args.hot_size = max(1, min(args.hot_size, args.bank_size))
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""题目访问统计批量写库测试"""
+import asyncio
+from datetime import timedelta
+from sqlmodel import select
+from app.core.db import async_session_maker
+from app.models.question import Question
+from app.models.stats import QuestionAccessStats
+from app.repositories.question_repository import QuestionRepository
+from app.services.access_stats_service import AccessStatsService
+
+
+async def add_questions(*titles: str) -> dict:
+    async with async_session_maker() as session:
+        questions = [Question(question=title, answer="对") for title in titles]
+        session.add_all(questions)
+        await session.commit()
+        return {q.question: q.id for q in questions}
+
+
+async def load_stats(question_id: int) -> QuestionAccessStats:
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(QuestionAccessStats).where(QuestionAccessStats.question_id == question_id)
+        )
+        return result.scalar_one()
+
+
+async def test_flush_accumulates_across_services(database):
+    ids = await add_questions("题目一", "题目二")
+    # 两个实例相当于两个worker，各自都不知道对方已经插入过统计行
+    first, second = AccessStatsService(), AccessStatsService()
+    first.record("题目一", "cache")
+    first.record("题目一", "ai")
+    second.record("题目一", "cache")
+    second.record("题目二", "database")
+    second.record("未收录的题目", "cache")
+
+    assert await first.flush() == 1
+    assert await second.flush() == 2
+
+    stats = await load_stats(ids["题目一"])
+    assert (stats.cache_hits, stats.database_hits, stats.ai_hits, stats.total_hits) == (2, 0, 1, 3)
+    assert stats.last_hit_at is not None
+    stats = await load_stats(ids["题目二"])
+    assert (stats.cache_hits, stats.database_hits, stats.total_hits) == (0, 1, 1)
+
+
+async def test_concurrent_flushes_lose_no_hits(database):
+    ids = await add_questions("并发题目")
+    services = [AccessStatsService() for _ in range(4)]
+    for service in services:
+        for _ in range(5):
+            service.record("并发题目", "cache")
+
+    await asyncio.gather(*(service.flush() for service in services))
+    # 写库冲突失败的实例会把计数合并回内存，再次写入后总数不变
+    for service in services:
+        await service.flush()
+
+    stats = await load_stats(ids["并发题目"])
+    assert stats.cache_hits == 20
+    assert stats.total_hits == 20
+
+
+async def test_failed_flush_keeps_latest_hit_time(database, monkeypatch):
+    service = AccessStatsService()
+    service.record("题目", "cache")
+    newest = service._pending["题目"].last_hit_at
+
+    async def fail(pending):
+        # 写库期间又有一次访问，其时间早于失败批次（例如时钟回拨）
+        service.record("题目", "ai")
+        service._pending["题目"].last_hit_at = newest - timedelta(seconds=5)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(service, "_write", fail)
+    assert await service.flush() == 0
+
+    pending = service._pending["题目"]
+    assert (pending.cache_hits, pending.ai_hits) == (1, 1)
+    assert pending.last_hit_at == newest
+
+
+async def test_delete_question_removes_stats(database):
+    ids = await add_questions("待删除的题目")
+    service = AccessStatsService()
+    service.record("待删除的题目", "cache")
+    await service.flush()
+
+    async with async_session_maker() as session:
+        assert await QuestionRepository(session).delete(ids["待删除的题目"])
+        result = await session.execute(select(QuestionAccessStats))
+        assert result.scalars().all() == []
@@ -0,0 +1,40 @@
+"""题库管理接口的缓存失效测试"""
+from app.api.v1.endpoints.admin.questions import update_question
+from app.core.db import async_session_maker
+from app.models.question import QuestionUpdate
+from app.repositories.question_repository import QuestionRepository
+from app.services.cache_service import CacheService
+
+
+async def test_update_title_invalidates_old_and_new_keys(database):
+    cache_service = CacheService()
+    await cache_service.clear()
+    async with async_session_maker() as session:
+        repo = QuestionRepository(session)
+        question = await repo.create_question(question="旧标题", answer="A. 旧答案", options="", question_type="")
+        await cache_service.set("旧标题", "A. 旧答案")
+        await cache_service.set("新标题", "B. 之前AI给出的答案")
+        await cache_service.set("其他题目", "错")
+
+        updated = await update_question(question.id, QuestionUpdate(question="新标题", answer="C. 新答案"), repo, cache_service)
+
+    assert updated.question == "新标题"
+    assert await cache_service.get("旧标题") is None
+    assert await cache_service.get("新标题") is None
+    # 改名只删除新旧两个键，不清空整个缓存
+    assert await cache_service.get("其他题目") == "错"
+
+
+async def test_update_answer_invalidates_title(database):
+    cache_service = CacheService()
+    async with async_session_maker() as session:
+        repo = QuestionRepository(session)
+        question = await repo.create_question(question="题目", answer="对", options="", question_type="")
+        await cache_service.set("题目", "对")
+        await cache_service.set("其他题目", "错")
+
+        await update_question(question.id, QuestionUpdate(answer="错"), repo, cache_service)
+
+    assert await cache_service.get("题目") is None
+    # 只改答案时不清空其他题目的缓存
+    assert await cache_service.get("其他题目") == "错"
@@ -0,0 +1,84 @@
+"""AI微批处理测试"""
+import asyncio
+import json
+import time
+import pytest
+from app.core.config import AIProviderConfig, settings
+from app.core.deadline import Deadline, current_deadline, set_deadline
+from app.services.ai_batcher import AIBatcher
+from app.services.ai_service import AIAsyncService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    providers = dict(settings.ai.providers)
+    providers["batch-test"] = AIProviderConfig(name="批量测试", enabled=False, model="test", max_tokens=512)
+    monkeypatch.setattr(settings.ai, "providers", providers)
+    monkeypatch.setattr(settings.ai, "prompts", {})
+    monkeypatch.setattr(settings.ai.batch, "enabled", True)
+    monkeypatch.setattr(settings.ai.batch, "window_ms", 20)
+    monkeypatch.setattr(settings.ai.batch, "max_size", 8)
+    monkeypatch.setattr(settings.ai.batch, "max_tokens", 4096)
+
+    service = AIAsyncService("batch-test")
+    service.calls = []
+
+    async def call_provider(prompt, clamp=True):
+        service.calls.append((prompt, clamp))
+        size = prompt.user.count("\n") + 1 - prompt.user.count("\n   选项")
+        return json.dumps([service.reply] * size, ensure_ascii=False)
+
+    service.reply = "A. 甲"
+    monkeypatch.setattr(service, "_call_provider", call_provider)
+    return service
+
+
+async def submit_all(batcher, service, count):
+    return await asyncio.gather(*(
+        batcher.submit(service, f"题目{i}", "A. 甲 B. 乙", "single") for i in range(count)
+    ))
+
+
+async def test_batch_budget_exceeds_provider_limit(service):
+    answers = await submit_all(AIBatcher(), service, 8)
+    assert answers == ["A. 甲"] * 8
+    assert len(service.calls) == 1
+    prompt, clamp = service.calls[0]
+    # 每道题预留与逐题调用相同的预算，批量请求不受提供商 max_tokens 限制
+    assert prompt.max_tokens == 8 * 512
+    assert clamp is False
+
+
+async def test_batch_split_by_token_budget(service):
+    settings.ai.batch.max_tokens = 1024
+    await submit_all(AIBatcher(), service, 4)
+    assert [prompt.max_tokens for prompt, _ in service.calls] == [1024, 1024]
+
+
+async def test_batched_answers_use_single_parse_path(service):
+    service.reply = "答案是：A. 甲"
+    answers = await submit_all(AIBatcher(), service, 2)
+    assert answers == ["A. 甲", "A. 甲"]
+
+
+async def test_batch_uses_latest_member_deadline(service, monkeypatch):
+    deadlines = []
+
+    async def call_provider(prompt, clamp=True):
+        deadlines.append(current_deadline())
+        return json.dumps(["A. 甲", "A. 甲"], ensure_ascii=False)
+
+    monkeypatch.setattr(service, "_call_provider", call_provider)
+    batcher = AIBatcher()
+
+    async def submit(title: str, seconds: float):
+        set_deadline(Deadline.after(seconds))
+        return await batcher.submit(service, title, "A. 甲 B. 乙", "single")
+
+    # 截止最早的请求触发发送，批次仍按最晚的截止时间调用
+    patient = asyncio.create_task(submit("题目1", 30))
+    await asyncio.sleep(0)
+    settings.ai.batch.max_size = 2
+    hasty = asyncio.create_task(submit("题目2", 1))
+    assert await asyncio.gather(patient, hasty) == ["A. 甲", "A. 甲"]
+    assert deadlines[0] - time.monotonic() > 25
@@ -0,0 +1,76 @@
+"""分级回答测试 - 流式快速模型提前结束时仍能读到置信度"""
+import json
+from typing import Optional
+import httpx
+import pytest
+from app.core.config import AIProviderConfig, settings
+from app.providers.streaming import AnswerDetector
+from app.services.ai_service import AIAsyncService
+
+OPTIONS = "A. 北京 B. 上海"
+
+
+class CountingProvider:
+    """记录调用次数的强模型"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def call(self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None,
+                   clamp: bool = True) -> str:
+        self.calls += 1
+        return '{"answer": "B. 上海"}'
+
+    def get_model_name(self) -> str:
+        return "strong"
+
+
+def sse(content: str) -> bytes:
+    """把正文按几个字符一段拆成SSE事件"""
+    events = [
+        {"choices": [{"index": 0, "delta": {"content": content[i:i + 6]}}]}
+        for i in range(0, len(content), 6)
+    ]
+    lines = [f"data: {json.dumps(event, ensure_ascii=False)}\n\n" for event in events]
+    return ("".join(lines) + "data: [DONE]\n\n").encode()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fast = AIProviderConfig(name="快速", type="simulation", model="fast", stream=True)
+    strong = AIProviderConfig(name="强", type="simulation", model="strong")
+    monkeypatch.setattr(settings.ai, "providers", {"tier-fast": fast, "tier-strong": strong})
+    monkeypatch.setattr(settings.ai.tiering, "enabled", True)
+    monkeypatch.setattr(settings.ai.tiering, "fast_provider", "tier-fast")
+    monkeypatch.setattr(settings.ai.tiering, "confidence_threshold", 0.8)
+    monkeypatch.setattr(settings.ai.batch, "enabled", False)
+
+    service = AIAsyncService("tier-strong")
+    service.provider = CountingProvider()
+    return service
+
+
+def stream_fast(service: AIAsyncService, content: str) -> None:
+    service.fast_service.provider.transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=sse(content))
+    )
+
+
+async def test_streamed_confident_answer_is_kept(service):
+    stream_fast(service, '{"confidence": 0.95, "answer": "A. 北京", "explanation": "首都是北京"}')
+
+    assert await service.get_answer("中国的首都是哪里？", OPTIONS, "single") == "A. 北京"
+    assert service.provider.calls == 0
+
+
+async def test_streamed_low_confidence_escalates(service):
+    stream_fast(service, '{"confidence": 0.3, "answer": "A. 北京"}')
+
+    assert await service.get_answer("中国的首都是哪里？", OPTIONS, "single") == "B. 上海"
+    assert service.provider.calls == 1
+
+
+def test_detector_keeps_fields_before_answer():
+    detector = AnswerDetector()
+    assert detector.feed('好的 {"confidence": 0.9, ') is None
+    assert detector.feed('"answer": "A. 北京"') == '{"confidence": 0.9, "answer": "A. 北京"'
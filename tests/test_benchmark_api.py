@@ -0,0 +1,56 @@
+"""管理后台服务商基准测试接口测试"""
+import asyncio
+import httpx
+import pytest
+from app.core.config import AIProviderConfig, SimulationConfig, settings
+from app.benchmark.provider_bench import benchmark_jobs
+from app.main import app
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    simulation = AIProviderConfig(
+        name="模拟", type="simulation", model="simulation",
+        simulation=SimulationConfig(latency_distribution="fixed", latency_mean=0.001, ttft=0.0, seed=1),
+    )
+    real = AIProviderConfig(name="真实", api_key="sk-test", api_url="https://example.invalid/v1", model="m")
+    monkeypatch.setattr(settings.ai, "providers", {"bench-sim": simulation, "bench-real": real})
+    monkeypatch.setattr(settings.ai.benchmark, "enabled", True)
+    monkeypatch.setattr(settings.ai.benchmark, "simulation_only", True)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    await benchmark_jobs.stop()
+
+
+async def test_disabled_by_default(client, monkeypatch):
+    monkeypatch.setattr(settings.ai.benchmark, "enabled", False)
+    response = await client.post("/api/v1/admin/ai/benchmark", json={"providers": ["bench-sim"]})
+    assert response.status_code == 403
+
+
+async def test_real_providers_rejected(client):
+    response = await client.post("/api/v1/admin/ai/benchmark", json={"providers": ["bench-sim", "bench-real"]})
+    assert response.status_code == 403
+    assert "bench-real" in response.json()["detail"]
+
+
+async def test_runs_in_background_and_polls(client):
+    body = {"providers": ["bench-sim"], "requests": 8, "concurrency": 4}
+    response = await client.post("/api/v1/admin/ai/benchmark", json=body)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "running"
+
+    # 同一时间只允许一个任务
+    assert (await client.post("/api/v1/admin/ai/benchmark", json=body)).status_code == 409
+
+    for _ in range(200):
+        job = (await client.get(f"/api/v1/admin/ai/benchmark/{job['id']}")).json()
+        if job["status"] != "running":
+            break
+        await asyncio.sleep(0.01)
+
+    assert job["status"] == "done"
+    assert job["reports"][0]["provider"] == "bench-sim"
+    assert job["reports"][0]["requests"] == 8
+    assert (await client.get("/api/v1/admin/ai/benchmark/missing")).status_code == 404
@@ -0,0 +1,49 @@
+"""AI提供商并发限制器的优先级测试"""
+import asyncio
+import pytest
+from app.core.config import settings
+from app.providers.concurrency import (
+    PRIORITY_BACKGROUND, PRIORITY_LIVE, AIPriority, _limiters, get_limiter, set_priority,
+)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings.ai.limiter, "enabled", True)
+    monkeypatch.setattr(settings.ai.limiter, "initial_limit", 1)
+    monkeypatch.setattr(settings.ai.limiter, "min_limit", 1)
+    monkeypatch.setattr(settings.ai.limiter, "max_queue_wait", 5.0)
+    limiter = get_limiter("priority-test")
+    yield limiter
+    _limiters.pop("priority-test", None)
+
+
+async def test_promoted_waiter_moves_ahead(limiter):
+    await limiter.acquire()
+    order = []
+
+    async def wait(name: str, priority: AIPriority):
+        set_priority(priority)
+        await limiter.acquire()
+        order.append(name)
+        limiter.release(0.01, "ok")
+
+    first, second = AIPriority(PRIORITY_BACKGROUND), AIPriority(PRIORITY_BACKGROUND)
+    tasks = [asyncio.create_task(wait("first", first))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(wait("second", second)))
+    await asyncio.sleep(0)
+
+    assert second.promote()
+    limiter.release(0.01, "ok")
+    await asyncio.gather(*tasks)
+    assert order == ["second", "first"]
+
+
+def test_batch_priority_follows_members():
+    items = [AIPriority(PRIORITY_BACKGROUND), AIPriority(PRIORITY_BACKGROUND)]
+    batch = AIPriority(members=items)
+    assert batch.value == PRIORITY_BACKGROUND
+    items[1].promote()
+    assert batch.value == PRIORITY_LIVE
+    assert not batch.promote()
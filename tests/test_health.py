@@ -0,0 +1,28 @@
+"""健康检查端点测试"""
+import httpx
+import pytest
+from app.core.config import settings
+from app.core.redis import redis_manager
+from app.main import app
+
+
+@pytest.fixture
+def redis_down(monkeypatch):
+    monkeypatch.setattr(settings.cache, "type", "redis")
+    monkeypatch.setattr(redis_manager, "status", lambda: {"healthy": False, "failures": 3})
+
+
+@pytest.mark.parametrize("path", ["/health", "/api/v1/health"])
+async def test_health_reports_degraded_redis(redis_down, path):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(path)
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
+    assert response.json()["redis"]["healthy"] is False
+
+
+async def test_health_memory_cache():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/health")
+    assert response.json()["status"] == "healthy"
+    assert response.json()["redis"] is None
@@ -0,0 +1,23 @@
+"""生产模式worker数量测试"""
+from app.launcher import resolve_workers
+
+
+def test_env_overrides_config(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert resolve_workers(8, "sqlite+aiosqlite:///./data/tiku.db") == 3
+
+
+def test_configured_workers(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert resolve_workers(4, "sqlite+aiosqlite:///./data/tiku.db") == 4
+
+
+def test_auto_single_worker_on_sqlite(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert resolve_workers(0, "sqlite+aiosqlite:///./data/tiku.db") == 1
+
+
+def test_auto_cpu_count(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setattr("os.cpu_count", lambda: 6)
+    assert resolve_workers(0, "postgresql+asyncpg://localhost/tiku") == 6
@@ -0,0 +1,96 @@
+"""整卷预取的AI额度和优先级测试"""
+import asyncio
+from typing import Optional
+import httpx
+import pytest
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.deadline import Deadline
+from app.main import app
+from app.middleware.rate_limit import MemoryTokenBucket, RateLimitExceeded, rate_limiter
+from app.providers.concurrency import PRIORITY_BACKGROUND, PRIORITY_LIVE, current_priority
+from app.repositories.question_repository import QuestionRepository
+from app.schemas.query import QueryRequest
+from app.services.answer_task_service import answer_task_service
+from app.services.cache_service import CacheService
+from app.services.prefetch_service import prefetch_service
+from app.services.query_service import QueryService
+
+
+class RecordingAI:
+    """记录调用和调用时优先级的AI服务，放行前一直等待"""
+
+    provider_name = "recording"
+
+    def __init__(self, blocking: bool = False):
+        self.release = asyncio.Event()
+        if not blocking:
+            self.release.set()
+        self.calls = 0
+        self.priority = None
+
+    async def get_answer(self, title: str, options: str = "", question_type: str = "") -> Optional[str]:
+        self.calls += 1
+        self.priority = current_priority()
+        await self.release.wait()
+        return "A. 北京"
+
+
+@pytest.fixture
+async def prefetch(database, monkeypatch):
+    monkeypatch.setattr(settings.rate_limit, "enabled", True)
+    monkeypatch.setattr(settings.rate_limit, "backend", "memory")
+    monkeypatch.setattr(settings.rate_limit, "key_by", "ip")
+    monkeypatch.setattr(settings.rate_limit, "trust_forwarded", False)
+    monkeypatch.setattr(settings.rate_limit, "per_minute", 1000)
+    monkeypatch.setattr(settings.rate_limit, "ai_per_minute", 1)
+    monkeypatch.setattr(settings.rate_limit, "ai_burst", 1)
+    monkeypatch.setattr(settings.prefetch, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "_memory", MemoryTokenBucket())
+    await CacheService().clear()
+
+    ai = RecordingAI()
+    monkeypatch.setattr("app.services.prefetch_service.AIAsyncService", lambda: ai)
+    prefetch_service.start()
+    yield ai
+    await prefetch_service.stop()
+    await answer_task_service.stop()
+
+
+@pytest.mark.parametrize("paths", [["/api/v1/query", "/api/v1/prefetch"], ["/api/v1/query"]])
+async def test_prefetch_charges_submitter_ai_quota(prefetch, monkeypatch, paths):
+    # 即使预取路径不在 rate_limit.paths 中，也按提交者计算AI额度
+    monkeypatch.setattr(settings.rate_limit, "paths", paths)
+    questions = [{"title": f"预取题目{i}", "options": "A. 北京 B. 上海"} for i in range(3)]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/v1/prefetch", json={"questions": questions})
+    assert response.json()["queued"] == 3
+    await prefetch_service._queue.join()
+
+    # 额度只有1次：只有一道题调用了AI，提交者的额度已用完
+    assert prefetch.calls == 1
+    with pytest.raises(RateLimitExceeded):
+        await rate_limiter.hit("ai", "ip:127.0.0.1", 1, 1)
+
+
+async def test_live_query_promotes_prefetch_task(database, monkeypatch):
+    monkeypatch.setattr(settings.query, "background_completion", True)
+    await CacheService().clear()
+    ai = RecordingAI(blocking=True)
+    request = QueryRequest(title="中国的首都是哪里？", options="A. 北京 B. 上海")
+    task = answer_task_service.start(request, ai, priority=PRIORITY_BACKGROUND)
+    await asyncio.sleep(0)
+    assert ai.priority.value == PRIORITY_BACKGROUND
+
+    async with async_session_maker() as session:
+        service = QueryService(QuestionRepository(session), CacheService(), ai)
+        live = asyncio.create_task(service.query(request, Deadline.after(5)))
+        await asyncio.sleep(0.05)
+        assert ai.priority.value == PRIORITY_LIVE
+        ai.release.set()
+        response = await live
+
+    assert response.source == "ai"
+    assert ai.calls == 1
+    await task
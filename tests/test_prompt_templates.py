@@ -0,0 +1,25 @@
+"""提示词模板的输出token预算测试"""
+import pytest
+from app.core.config import PromptTemplateConfig, settings
+from app.services.prompt_templates import prompt_templates
+
+
+@pytest.fixture
+def templates(monkeypatch):
+    monkeypatch.setattr(settings.ai, "prompts", {})
+    prompt_templates.reload()
+    yield prompt_templates
+    prompt_templates.reload()
+
+
+@pytest.mark.parametrize("question_type", ["single", "multiple", "judgement", "fill", "unknown"])
+def test_builtin_templates_use_provider_budget(templates, question_type):
+    prompt = templates.get(question_type).render("HTTP是无状态协议。", "对 错")
+    assert prompt.max_tokens is None
+
+
+def test_configured_budget_is_opt_in(templates, monkeypatch):
+    monkeypatch.setattr(settings.ai, "prompts", {"judgement": PromptTemplateConfig(max_tokens=64)})
+    templates.reload()
+    assert templates.get("judgement").render("HTTP是无状态协议。").max_tokens == 64
+    assert templates.get("single").render("题目", "A. 甲 B. 乙").max_tokens is None
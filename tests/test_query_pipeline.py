@@ -0,0 +1,124 @@
+"""查询流程中AI任务的超时、去重、取消和后台完成测试"""
+import asyncio
+from typing import Optional
+import pytest
+from app.api.v1.endpoints.query import resolve_deadline
+from app.core.config import settings
+from app.core.db import async_session_maker
+from app.core.deadline import Deadline
+from app.repositories.question_repository import QuestionRepository
+from app.schemas.query import QueryRequest
+from app.services.answer_task_service import answer_task_service
+from app.services.cache_service import CacheService
+from app.services.query_service import QueryService
+
+
+class BlockingAI:
+    """在测试放行前一直不返回答案的AI服务"""
+
+    provider_name = "blocking"
+
+    def __init__(self, answer: str = "A. 北京"):
+        self.answer = answer
+        self.release = asyncio.Event()
+        self.calls = 0
+        self.cancelled = 0
+
+    async def get_answer(self, title: str, options: str = "", question_type: str = "") -> Optional[str]:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.answer
+
+
+@pytest.fixture
+async def ai(database, monkeypatch):
+    monkeypatch.setattr(settings.query, "background_completion", True)
+    monkeypatch.setattr(settings.query, "max_background_tasks", 200)
+    await CacheService().clear()
+    ai = BlockingAI()
+    yield ai
+    await answer_task_service.stop()
+
+
+async def query(ai: BlockingAI, title: str, timeout: Optional[float]):
+    async with async_session_maker() as session:
+        service = QueryService(QuestionRepository(session), CacheService(), ai)
+        request = QueryRequest(title=title, options="A. 北京 B. 上海")
+        return await service.query(request, Deadline.after(timeout) if timeout is not None else None)
+
+
+async def test_timeout_returns_pending_and_keeps_running(ai):
+    response = await query(ai, "中国的首都是哪里？", timeout=0.05)
+
+    assert response.code == 0
+    assert response.source == "pending"
+    task = answer_task_service.get("中国的首都是哪里？")
+    assert task is not None and not task.done()
+
+
+async def test_retry_joins_running_task(ai):
+    first = await query(ai, "中国的首都是哪里？", timeout=0.05)
+    assert first.source == "pending"
+
+    retry = asyncio.create_task(query(ai, "中国的首都是哪里？", timeout=5))
+    await asyncio.sleep(0.05)
+    ai.release.set()
+    second = await retry
+
+    assert second.source == "ai"
+    assert second.data == "A. 北京"
+    assert ai.calls == 1
+
+
+async def test_timeout_cancels_when_detaching_disabled(ai, monkeypatch):
+    monkeypatch.setattr(settings.query, "background_completion", False)
+
+    response = await query(ai, "中国的首都是哪里？", timeout=0.05)
+    await asyncio.sleep(0)
+
+    assert response.source == "none"
+    assert ai.cancelled == 1
+    assert answer_task_service.get("中国的首都是哪里？") is None
+
+
+async def test_shared_task_survives_shortest_waiter(ai, monkeypatch):
+    monkeypatch.setattr(settings.query, "background_completion", False)
+
+    patient = asyncio.create_task(query(ai, "中国的首都是哪里？", timeout=5))
+    await asyncio.sleep(0.01)
+    hasty = await query(ai, "中国的首都是哪里？", timeout=0.05)
+    assert hasty.source == "none"
+    assert ai.cancelled == 0
+
+    ai.release.set()
+    response = await patient
+    assert response.source == "ai"
+    assert ai.calls == 1
+
+
+def test_no_client_timeout_waits_for_ai(monkeypatch):
+    monkeypatch.setattr(settings.query, "default_timeout", None)
+    assert resolve_deadline(None) is None
+    assert resolve_deadline(3000).remaining() <= 3
+
+
+async def test_answer_persisted_after_client_leaves(ai):
+    response = await query(ai, "中国的首都是哪里？", timeout=0.05)
+    assert response.source == "pending"
+
+    task = answer_task_service.get("中国的首都是哪里？")
+    ai.release.set()
+    assert await task == "A. 北京"
+
+    async with async_session_maker() as session:
+        saved = await QuestionRepository(session).find_by_question("中国的首都是哪里？")
+    assert saved is not None and saved.answer == "A. 北京"
+    assert await CacheService().get("中国的首都是哪里？") == "A. 北京"
+
+    again = await query(ai, "中国的首都是哪里？", timeout=0.05)
+    assert again.source == "cache"
+    assert ai.calls == 1
@@ -0,0 +1,38 @@
+"""限流中间件的客户端标识测试"""
+import pytest
+from app.core.config import settings
+from app.middleware.rate_limit import get_client_key
+
+
+def make_scope(forwarded: str = None, client: str = "10.0.0.1") -> dict:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return {"type": "http", "headers": headers, "client": (client, 12345), "query_string": b""}
+
+
+@pytest.fixture
+def trust_forwarded(monkeypatch):
+    monkeypatch.setattr(settings.rate_limit, "key_by", "ip")
+    monkeypatch.setattr(settings.rate_limit, "trust_forwarded", True)
+    monkeypatch.setattr(settings.rate_limit, "forwarded_hops", 1)
+
+
+def test_forwarded_ignored_by_default(monkeypatch):
+    monkeypatch.setattr(settings.rate_limit, "key_by", "ip")
+    monkeypatch.setattr(settings.rate_limit, "trust_forwarded", False)
+    assert get_client_key(make_scope("1.1.1.1")) == "ip:10.0.0.1"
+
+
+def test_forwarded_uses_rightmost_entry(trust_forwarded):
+    # 客户端伪造的最左侧地址不能决定限流桶
+    assert get_client_key(make_scope("6.6.6.6, 203.0.113.7")) == "ip:203.0.113.7"
+
+
+def test_forwarded_hops(trust_forwarded, monkeypatch):
+    monkeypatch.setattr(settings.rate_limit, "forwarded_hops", 2)
+    assert get_client_key(make_scope("6.6.6.6, 203.0.113.7, 172.16.0.2")) == "ip:203.0.113.7"
+    # 地址数少于代理层数时取最左侧的地址
+    assert get_client_key(make_scope("203.0.113.7")) == "ip:203.0.113.7"
+
+
+def test_empty_forwarded_falls_back_to_peer(trust_forwarded):
+    assert get_client_key(make_scope(" , ")) == "ip:10.0.0.1"
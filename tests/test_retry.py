@@ -0,0 +1,18 @@
+"""AI调用重试策略的时间预算测试"""
+from app.core.config import settings
+from app.providers.retry import RetryPolicy
+
+
+def test_default_budget_covers_every_attempt(monkeypatch):
+    monkeypatch.setattr(settings.ai, "deadline", None)
+    monkeypatch.setattr(settings.ai, "timeout", 30)
+    monkeypatch.setattr(settings.ai, "max_retries", 3)
+    policy = RetryPolicy("retry-test")
+    # 单次请求用满超时后仍有时间重试
+    assert policy.total_timeout == 120
+    assert policy.total_timeout > policy.attempt_timeout
+
+
+def test_configured_budget(monkeypatch):
+    monkeypatch.setattr(settings.ai, "deadline", 45.0)
+    assert RetryPolicy("retry-test").total_timeout == 45.0
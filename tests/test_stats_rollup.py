@@ -0,0 +1,28 @@
+"""分钟级流量统计汇总测试"""
+import time
+from app.core.timeseries import QueryTimeSeries
+from app.services import stats_service
+from app.services.stats_service import StatsRollupService, get_history
+
+
+async def test_rollup_keeps_every_source(database, monkeypatch):
+    series = QueryTimeSeries(60)
+    monkeypatch.setattr(stats_service, "query_timeseries", series)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now - 120)
+    rollup = StatsRollupService()
+
+    monkeypatch.setattr(time, "time", lambda: now - 60)
+    for source in ("cache", "ai", "pending", "pending", "none"):
+        series.record_query(source, 10.0)
+    live = series._bucket(int((now - 60) // 60)).to_dict()
+
+    monkeypatch.setattr(time, "time", lambda: now)
+    assert await rollup.flush() == 1
+    [point] = await get_history(10)
+
+    # 写库后与内存中的统计一致，超时转后台的查询不会丢失
+    assert point["sources"] == live["sources"]
+    assert point["sources"]["pending"] == 2
+    assert point["total"] == live["total"] == 5
+    assert point["hit_ratio"] == live["hit_ratio"]
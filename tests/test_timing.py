@@ -0,0 +1,36 @@
+"""请求耗时中间件的访问日志测试"""
+import httpx
+import pytest
+from loguru import logger
+from app.core.config import settings
+from app.main import app
+
+
+@pytest.fixture
+def access_logs():
+    records = []
+    sink = logger.add(
+        lambda message: records.append(message.record),
+        filter=lambda record: record["message"].startswith("access "),
+    )
+    yield records
+    logger.remove(sink)
+
+
+async def get(path: str) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path)
+
+
+async def test_fast_requests_use_sampled_log(access_logs):
+    response = await get("/health")
+    assert "Server-Timing" in response.headers
+    [record] = access_logs
+    assert record["extra"].get("sampled") is True
+
+
+async def test_slow_requests_always_logged(access_logs, monkeypatch):
+    monkeypatch.setattr(settings.logging, "slow_request_ms", 0.0)
+    await get("/health")
+    [record] = access_logs
+    assert "sampled" not in record["extra"]